@@ -0,0 +1,6 @@
+__all__ = ["generateOpeningsFile", "generatePGNFile", "runBenchmarks",
+					 "compareReports", "BenchmarkReport", "MemorySink", "PostgresSink"]
+
+from Benchmarks.syntheticData import generateOpeningsFile, generatePGNFile
+from Benchmarks.runBenchmarks import (runBenchmarks, compareReports,
+																			BenchmarkReport, MemorySink, PostgresSink)
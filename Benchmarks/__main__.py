@@ -0,0 +1,91 @@
+import argparse
+import logging
+import os
+from json import load
+
+import pandas as pd
+
+from Benchmarks import *
+
+from DataCollection import validate_and_extract_params, setMaxCores
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# Set up argument parser
+parser = argparse.ArgumentParser(
+	description="Benchmark every stage of the pipeline on seeded synthetic data "
+							"and output the measurements to JSON."
+)
+parser.add_argument("output", type=str,
+										help="Path to the output JSON report (required).")
+parser.add_argument("-g", "--games", type=int, default=10000,
+										help="Number of synthetic games (optional, default = "
+												 "10000).")
+parser.add_argument("-s", "--seed", type=int, default=0,
+										help="Seed of the synthetic data (optional, default = 0).")
+parser.add_argument("--workdir", type=str,
+										help="Directory in which to keep the synthetic files between"
+												 " runs (optional, default = temporary directory).")
+parser.add_argument("--database", type=str,
+										help="JSON file with the connection parameters to a local "
+												 "postgreSQL server, on which a throwaway database is "
+												 "created and loaded (optional, default = in-memory "
+												 "sink).")
+parser.add_argument("--chunk_size", type=int, default=100000,
+										help="Number of games per chunk (optional, default = "
+												 "100000).")
+parser.add_argument("--cores", type=int,
+										help="Number of worker processes (optional).")
+parser.add_argument("-l", "--layout", type=str,
+										choices=["spring", "kamada", "force", "none"],
+										default="spring",
+										help="Layout to benchmark (optional, default = spring).")
+parser.add_argument("--iterations", type=int, default=50,
+										help="Iterations of the spring or force layout (optional, "
+												 "default = 50).")
+parser.add_argument("--min_count", type=int, default=5,
+										help="Minimum amount of games played by a player in an "
+												 "opening to be included in the graph (optional, "
+												 "default = 5).")
+parser.add_argument("--min_percent", type=float, default=0.01,
+										help="Minimum percentage of games played in an opening by a "
+												 "player to be included in the graph (optional, "
+												 "default = 0.01).")
+parser.add_argument("--compare", type=str,
+										help="Report of a previous run to compare the results with "
+												 "(optional).")
+
+# Parse arguments
+args = parser.parse_args()
+
+db_params = None
+if args.database is not None:
+	if not os.path.isfile(args.database):
+		raise ValueError(f"File {args.database} does not exist.")
+	with open(args.database, "r") as file:
+		db_params = validate_and_extract_params(
+			load(file), ["dbname", "user", "host", "port"],
+			["password", "sslmode", "sslkey", "sslcert", "sslrootcert"])
+
+if args.cores is not None:
+	setMaxCores(args.cores)
+
+report = runBenchmarks(
+	games=args.games, seed=args.seed, workdir=args.workdir, db_params=db_params,
+	chunk_size=args.chunk_size, max_workers=args.cores,
+	layout=None if args.layout == "none" else args.layout,
+	iterations=args.iterations, min_count=args.min_count,
+	min_percent=args.min_percent)
+report.save(args.output)
+
+with pd.option_context("display.width", 200, "display.max_columns", None):
+	if args.compare is not None:
+		with open(args.compare, "r") as file:
+			print(compareReports(load(file), report.toDict()).to_string(index=False))
+	else:
+		print(pd.DataFrame(report.toDict()["stages"]).T.drop(
+			columns="latency_seconds").to_string())
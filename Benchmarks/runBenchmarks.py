@@ -0,0 +1,391 @@
+import io
+import json
+import logging
+import os
+import platform
+import re
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import psycopg
+
+import DataCollection
+from DataCollection import (PGNtoDataFrame, PlayerIdCache,
+														createGamesDataFrame, createInsertExecutor,
+														createOpeningsDataFrame, createPlayersDataFrame,
+														insertDataToPostgres)
+from Louvain import detectCommunities, forceLayout, getCompactGraph
+from Benchmarks.syntheticData import generateOpeningsFile, generatePGNFile
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(DataCollection.__file__),
+													 "createChessDatabase.sql")
+
+
+class BenchmarkReport:
+	"""
+	Measurements of the stages of a benchmark run: wall and CPU time, rows and
+	bytes processed, latency of each call and high-water mark of the resident
+	memory of the process (and of its terminated worker processes) after the
+	stage.
+	"""
+
+	def __init__(self, **metadata):
+		"""
+		:param metadata: Parameters of the run, saved along with the measurements.
+		"""
+		self.metadata = metadata
+		self.stages = {}
+
+	@contextmanager
+	def stage(self, name: str) -> Iterator[dict]:
+		"""
+		Measure one call of a stage, calls of the same stage are accumulated.
+		:param name: Name of the stage.
+		:return: Dictionary in which the "rows" and "bytes" processed by the call
+		are to be added.
+		"""
+		counts = {"rows": 0, "bytes": 0}
+		wall, cpu = time.perf_counter(), time.process_time()
+		yield counts
+		wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+		stage = self.stages.setdefault(name, {"seconds": 0.0, "cpu_seconds": 0.0,
+																					"rows": 0, "bytes": 0,
+																					"latencies": []})
+		stage["seconds"] += wall
+		stage["cpu_seconds"] += cpu
+		stage["rows"] += counts["rows"]
+		stage["bytes"] += counts["bytes"]
+		stage["latencies"].append(wall)
+		# ru_maxrss is in kilobytes on Linux
+		stage["peak_rss_mb"] = resource.getrusage(
+			resource.RUSAGE_SELF).ru_maxrss / 1024
+		stage["peak_children_rss_mb"] = resource.getrusage(
+			resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+	def toDict(self) -> dict:
+		"""
+		Summarize the measurements.
+		:return: JSON-serializable report.
+		"""
+		stages = {}
+		for name, stage in self.stages.items():
+			latencies = np.array(stage["latencies"])
+			stages[name] = {
+				"seconds": round(stage["seconds"], 4),
+				"cpu_seconds": round(stage["cpu_seconds"], 4),
+				"rows": stage["rows"],
+				"bytes": stage["bytes"],
+				"rows_per_second": round(stage["rows"] / stage["seconds"], 1)
+				if stage["seconds"] else None,
+				"mb_per_second": round(stage["bytes"] / 2 ** 20 / stage["seconds"], 2)
+				if stage["seconds"] else None,
+				"calls": len(latencies),
+				"latency_seconds": {
+					"p50": round(float(np.percentile(latencies, 50)), 4),
+					"p95": round(float(np.percentile(latencies, 95)), 4),
+					"max": round(float(latencies.max()), 4)
+				},
+				"peak_rss_mb": round(stage["peak_rss_mb"], 1),
+				"peak_children_rss_mb": round(stage["peak_children_rss_mb"], 1)
+			}
+		return {"metadata": self.metadata, "stages": stages}
+
+	def save(self, path: str) -> None:
+		"""
+		Save the report as JSON.
+		:param path: Path to the output JSON file.
+		"""
+		with open(path, "w") as f:
+			json.dump(self.toDict(), f, indent=2)
+		logger.info(f"Benchmark report saved to {path}")
+
+
+class MemorySink:
+	"""
+	In-memory stand-in for the database: DataFrames are serialized to CSV as
+	they would be for a COPY, and only the volume is kept.
+	"""
+
+	def __init__(self):
+		self.rows = {}
+		self.bytes = {}
+
+	def __enter__(self) -> "MemorySink":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		pass
+
+	def insert(self, table_name: str, dataframe: pd.DataFrame) -> int:
+		"""
+		Serialize a DataFrame as if loading it into a table.
+		:param table_name: Name of the table.
+		:param dataframe: DataFrame to load.
+		:return: Number of bytes produced.
+		"""
+		buffer = io.StringIO()
+		dataframe.to_csv(buffer, index=False, header=False)
+		size = buffer.tell()
+		self.rows[table_name] = self.rows.get(table_name, 0) + len(dataframe)
+		self.bytes[table_name] = self.bytes.get(table_name, 0) + size
+		return size
+
+
+class PostgresSink:
+	"""
+	Throwaway PostgreSQL database created for the benchmark on a local server
+	with the schema of createChessDatabase.sql, loaded with
+	insertDataToPostgres and dropped afterwards.
+	"""
+
+	def __init__(self, db_params: dict):
+		"""
+		:param db_params: Connection parameters to the server, the user must be
+		allowed to create databases.
+		"""
+		self.server_params = db_params
+		self.db_params = {**db_params,
+											"dbname": f"analyzers_benchmark_{os.getpid()}"}
+		self.__executor = None
+
+	def __enter__(self) -> "PostgresSink":
+		with psycopg.connect(**self.server_params, autocommit=True) as connection:
+			connection.execute(psycopg.sql.SQL("create database {database}").format(
+				database=psycopg.sql.Identifier(self.db_params["dbname"])))
+		with open(SCHEMA_FILE, "r") as f:
+			# Ownership changes only apply to the production database
+			schema = re.sub(r"ALTER TABLE \w+\s+OWNER TO \w+;", "", f.read())
+		with psycopg.connect(**self.db_params, autocommit=True) as connection:
+			connection.execute(schema)
+		self.__executor = createInsertExecutor(self.db_params)
+		logger.info(f"Created benchmark database {self.db_params['dbname']}")
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.__executor.shutdown()
+		with psycopg.connect(**self.server_params, autocommit=True) as connection:
+			connection.execute(psycopg.sql.SQL(
+				"drop database if exists {database} with (force)").format(
+				database=psycopg.sql.Identifier(self.db_params["dbname"])))
+		logger.info(f"Dropped benchmark database {self.db_params['dbname']}")
+
+	def insert(self, table_name: str, dataframe: pd.DataFrame) -> int:
+		"""
+		Load a DataFrame into a table of the benchmark database.
+		:param table_name: Name of the table.
+		:param dataframe: DataFrame to load.
+		:return: Number of bytes produced (unknown, 0).
+		"""
+		insertDataToPostgres(self.db_params, table_name, dataframe,
+												 executor=self.__executor)
+		return 0
+
+
+def __player_openings(
+		counts: pd.DataFrame, names: dict, min_games: int, min_percent: float
+) -> pd.DataFrame:
+	"""
+	Compute the player-opening data of getPlayersOpenings from the games loaded.
+	:param counts: Number of games ("times_played") and max ELO ("player_elo")
+	per "player" ID and "opening" name.
+	:param names: Mapping of player IDs to names.
+	:param min_games: Minimum number of games of a player in an opening.
+	:param min_percent: Minimum share of the games of a player in an opening.
+	:return: DataFrame in the format returned by getPlayersOpenings.
+	"""
+	counts = counts.groupby(["player", "opening"], as_index=False).agg(
+		times_played=("times_played", "sum"), player_elo=("player_elo", "max"))
+	total = counts.groupby("player")["times_played"].transform("sum")
+	counts["percentage_played"] = (counts["times_played"] / total).round(2)
+	elo = counts.groupby("player")["player_elo"].transform("max")
+	data = pd.DataFrame({
+		"player_name": counts["player"].map(names),
+		"player_elo": elo.astype(float),
+		"opening_name": counts["opening"],
+		"times_played": counts["times_played"],
+		"percentage_played": counts["percentage_played"]
+	})
+	return data[(counts["times_played"] >= min_games)
+							& (counts["times_played"] / total >= min_percent)
+							].reset_index(drop=True)
+
+
+def __commit() -> str | None:
+	"""
+	Get the commit of the benchmarked code.
+	:return: Commit hash, None outside of a git repository.
+	"""
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+			cwd=os.path.dirname(SCHEMA_FILE)).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+@contextmanager
+def __existing_directory(path: str) -> Iterator[str]:
+	"""
+	Use an existing directory where a temporary one would be created.
+	:param path: Path to the directory, created if missing.
+	:return: Path to the directory.
+	"""
+	os.makedirs(path, exist_ok=True)
+	yield path
+
+
+def runBenchmarks(
+		games: int = 10000, seed: int = 0, workdir: str = None,
+		db_params: dict = None, chunk_size: int = 100000,
+		max_workers: int = None, layout: str = "spring", iterations: int = 50,
+		min_count: int = 5, min_percent: float = 0.01
+) -> BenchmarkReport:
+	"""
+	Run every stage of the pipeline on synthetic data: generation, parsing,
+	creation of the DataFrames, loading, graph creation, layout and Louvain
+	partitioning.
+	:param games: Number of synthetic games.
+	:param seed: Seed of the synthetic data and of the Louvain partitioning.
+	:param workdir: Directory of the synthetic files (defaults to a temporary
+	directory). Existing files generated with the same parameters are reused.
+	:param db_params: Connection parameters to a local PostgreSQL server to load
+	a throwaway database, the data is serialized in memory otherwise.
+	:param chunk_size: Number of games per chunk.
+	:param max_workers: Number of worker processes (defaults to
+	DataCollection's).
+	:param layout: "spring", "kamada", "force" or None to skip the layout.
+	:param iterations: Iterations of the spring or force layout.
+	:param min_count: Minimum number of games of a player in an opening for the
+	graph.
+	:param min_percent: Minimum share of the games of a player in an opening for
+	the graph.
+	:return: Benchmark report.
+	"""
+	report = BenchmarkReport(
+		games=games, seed=seed, chunk_size=chunk_size, layout=layout,
+		iterations=iterations, min_count=min_count, min_percent=min_percent,
+		sink="postgres" if db_params else "memory", commit=__commit(),
+		python=platform.python_version(), machine=platform.machine(),
+		cpu_count=os.cpu_count(), max_workers=max_workers or DataCollection.MAX_CORES,
+		time=time.strftime("%Y-%m-%dT%H:%M:%S%z"))
+
+	with (tempfile.TemporaryDirectory() if workdir is None else
+				__existing_directory(workdir)) as directory:
+		openings_file = os.path.join(directory, f"openings_{seed}.tsv")
+		pgn_file = os.path.join(directory, f"games_{games}_{seed}.pgn")
+		with report.stage("generate") as counts:
+			openings = generateOpeningsFile(openings_file, seed=seed)
+			if not os.path.isfile(pgn_file):
+				generatePGNFile(pgn_file, games, openings, seed)
+			counts["rows"] = games
+			counts["bytes"] = os.path.getsize(pgn_file)
+
+		with (PostgresSink(db_params) if db_params else MemorySink()) as sink, \
+				ProcessPoolExecutor(max_workers=max_workers or
+															DataCollection.MAX_CORES) as executor:
+			with report.stage("openings") as counts:
+				openings = createOpeningsDataFrame([openings_file], deterministic_ids=True)
+				counts["rows"] = len(openings)
+			with report.stage("load") as counts:
+				counts["bytes"] += sink.insert("openings", openings)
+				counts["rows"] += len(openings)
+
+			cache = PlayerIdCache()
+			names = {}
+			player_openings = []
+			chunks = PGNtoDataFrame([pgn_file], chunk_size, max_workers)
+			while True:
+				with report.stage("parse") as counts:
+					rawPGN = next(chunks, None)
+					counts["rows"] = 0 if rawPGN is None else len(rawPGN)
+				if rawPGN is None:
+					break
+
+				with report.stage("players") as counts:
+					players = createPlayersDataFrame(rawPGN, cache, deterministic_ids=True,
+																					 executor=executor)
+					cache.update(players.get("name", []), players.get("id", []))
+					counts["rows"] = len(rawPGN)
+				names.update(zip(players.get("id", []), players.get("name", [])))
+
+				with report.stage("games") as counts:
+					games_data = createGamesDataFrame(
+						rawPGN,
+						cache.toDataFrame(pd.concat([rawPGN["White"], rawPGN["Black"]],
+																				ignore_index=True)),
+						openings, deterministic_ids=True)
+					counts["rows"] = len(games_data)
+
+				with report.stage("load") as counts:
+					if not players.empty:
+						counts["bytes"] += sink.insert("players", players)
+					counts["bytes"] += sink.insert("games", games_data)
+					counts["rows"] += len(players) + len(games_data)
+
+				player_openings.append(games_data.assign(
+					opening=games_data["opening"].map(openings.set_index("id")["name"]))
+					.groupby(["white", "opening"], as_index=False)
+					.agg(times_played=("id", "size"), player_elo=("white_elo", "max"))
+					.rename(columns={"white": "player"}))
+
+		with report.stage("graph") as counts:
+			data = __player_openings(pd.concat(player_openings, ignore_index=True),
+															 names, min_count, min_percent)
+			graph = getCompactGraph(data, False)
+			counts["rows"] = graph.numberOfNodes()
+
+		if layout is not None:
+			with report.stage(f"layout_{layout}") as counts:
+				if layout == "kamada":
+					nx.kamada_kawai_layout(graph.toNetworkx(attributes=False))
+				elif layout == "force":
+					forceLayout(graph, iterations=iterations, seed=seed)
+				else:
+					nx.spring_layout(graph.toNetworkx(attributes=False),
+											 iterations=iterations, seed=seed)
+				counts["rows"] = graph.numberOfNodes()
+
+		with report.stage("louvain") as counts:
+			detectCommunities(graph, seed=seed)
+			counts["rows"] = graph.numberOfNodes()
+
+	return report
+
+
+def compareReports(baseline: dict, current: dict) -> pd.DataFrame:
+	"""
+	Compare the throughput of the stages of two benchmark reports.
+	:param baseline: Report of the reference run.
+	:param current: Report of the run to compare.
+	:return: DataFrame of the time and throughput of each stage in both runs,
+	with the speedup of the current run.
+	"""
+	rows = []
+	for name in dict.fromkeys([*baseline["stages"], *current["stages"]]):
+		old = baseline["stages"].get(name, {})
+		new = current["stages"].get(name, {})
+		rows.append({
+			"stage": name,
+			"baseline_seconds": old.get("seconds"),
+			"current_seconds": new.get("seconds"),
+			"baseline_rows_per_second": old.get("rows_per_second"),
+			"current_rows_per_second": new.get("rows_per_second"),
+			"speedup": round(old["seconds"] / new["seconds"], 2)
+			if old.get("seconds") and new.get("seconds") else None,
+			"current_peak_rss_mb": new.get("peak_rss_mb")
+		})
+	return pd.DataFrame(rows)
@@ -0,0 +1,163 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MOVES = ["e4", "e5", "d4", "d5", "Nf3", "Nc6", "c4", "c5", "Bc4", "Bb5", "Nc3",
+				 "Nf6", "g3", "g6", "Bg2", "Bg7", "O-O", "e6", "c6", "d6", "b3", "Bb7"]
+RESULTS = np.array(["1-0", "0-1", "1/2-1/2"])
+RESULT_WEIGHTS = [0.46, 0.44, 0.10]
+TIME_CONTROLS = np.array(["60+0", "180+0", "180+2", "300+0", "300+3", "600+0"])
+TITLES = np.array(["GM", "IM", "FM", "NM"])
+START_TIME = np.datetime64("2024-01-01T00:00:00")
+
+
+def generateOpeningsFile(
+		path: str, families: int = 40, variations: int = 12, seed: int = 0
+) -> pd.DataFrame:
+	"""
+	Write a synthetic opening TSV file in the format of the lichess opening
+	database: each family has a main line and variations named "<family>: ...".
+	:param path: Path to the output TSV file.
+	:param families: Number of opening families.
+	:param variations: Number of variations per family.
+	:param seed: Seed of the random generator.
+	:return: DataFrame of the openings written.
+	"""
+	rng = np.random.default_rng(seed)
+	rows = []
+	for family in range(families):
+		name = f"Synthetic Opening {family}"
+		moves = rng.choice(MOVES, size=2)
+		eco = f"{'ABCDE'[family % 5]}{family % 100:02d}"
+		rows.append((eco, name, f"1. {moves[0]} {moves[1]}"))
+		for variation in range(variations):
+			more = rng.choice(MOVES, size=2)
+			rows.append((eco, f"{name}: Variation {variation}",
+									 f"1. {moves[0]} {moves[1]} 2. {more[0]} {more[1]}"))
+
+	openings = pd.DataFrame(rows, columns=["eco", "name", "pgn"])
+	openings.to_csv(path, sep="\t", index=False)
+	logger.info(f"Generated {len(openings)} openings in {path}")
+	return openings
+
+
+def __player_pool(players: int, rng: np.random.Generator) -> pd.DataFrame:
+	"""
+	Draw the synthetic players: a skewed activity, a rating, a favourite opening
+	family and a title for a few of them.
+	:param players: Number of players.
+	:param rng: Random generator.
+	:return: DataFrame of the players.
+	"""
+	activity = 1 / np.arange(1, players + 1) ** 0.8
+	titled = rng.random(players) < 0.01
+	return pd.DataFrame({
+		"name": [f"player{index}" for index in range(players)],
+		"weight": activity / activity.sum(),
+		"elo": rng.normal(1600, 350, players).clip(600, 3200).astype(int),
+		"family": rng.integers(0, 1 << 30, players),
+		"title": np.where(titled, rng.choice(TITLES, players), None)
+	})
+
+
+def __format_games(block: dict[str, np.ndarray]) -> str:
+	"""
+	Format a block of synthetic games as PGN text.
+	:param block: Columns of the games.
+	:return: PGN text of the games.
+	"""
+	return "".join(
+		f'[Event "Rated Blitz game"]\n'
+		f'[Site "https://lichess.org/{site:010x}"]\n'
+		f'[White "{white}"]\n[Black "{black}"]\n[Result "{result}"]\n'
+		f'[UTCDate "{date}"]\n[UTCTime "{time}"]\n'
+		f'[WhiteElo "{white_elo}"]\n[BlackElo "{black_elo}"]\n'
+		+ (f'[WhiteTitle "{white_title}"]\n' if white_title else "")
+		+ (f'[BlackTitle "{black_title}"]\n' if black_title else "")
+		+ f'[ECO "{eco}"]\n[Opening "{opening}"]\n'
+			f'[TimeControl "{time_control}"]\n[Termination "Normal"]\n\n'
+			f'{moves} {result}\n\n'
+		for site, white, black, result, date, time, white_elo, black_elo,
+		white_title, black_title, eco, opening, time_control, moves in zip(
+			*(block[key] for key in [
+				"site", "white", "black", "result", "date", "time", "white_elo",
+				"black_elo", "white_title", "black_title", "eco", "opening",
+				"time_control", "moves"])))
+
+
+def generatePGNFile(
+		path: str, games: int, openings: pd.DataFrame, seed: int = 0,
+		players: int = None, block_size: int = 100000
+) -> int:
+	"""
+	Write a synthetic PGN file in the format of the lichess database. Players
+	have a skewed activity and mostly play the variations of a favourite opening
+	family, so that the player-opening graph has communities to find. The file is
+	written in blocks, which keeps the memory bounded for any number of games.
+	:param path: Path to the output PGN file.
+	:param games: Number of games.
+	:param openings: Openings to play, see generateOpeningsFile.
+	:param seed: Seed of the random generator.
+	:param players: Number of players (defaults to one per 20 games).
+	:param block_size: Number of games generated at once.
+	:return: Size of the file in bytes.
+	"""
+	rng = np.random.default_rng(seed)
+	pool = __player_pool(players or max(games // 20, 100), rng)
+	names = pool["name"].to_numpy()
+	titles = pool["title"].to_numpy()
+
+	families = openings["name"].str.split(":", n=1).str[0]
+	family_codes, _ = pd.factorize(families)
+	family_count = family_codes.max() + 1
+	by_family = [np.flatnonzero(family_codes == family)
+							 for family in range(family_count)]
+	favourite = pool["family"].to_numpy() % family_count
+
+	size = 0
+	elapsed = 0
+	with open(path, "w", encoding="utf-8") as f:
+		for start in range(0, games, block_size):
+			count = min(block_size, games - start)
+			white = rng.choice(len(pool), count, p=pool["weight"].to_numpy())
+			black = rng.choice(len(pool), count, p=pool["weight"].to_numpy())
+			black = np.where(black == white, (black + 1) % len(pool), black)
+
+			# Most games are a variation of the white player's favourite family
+			family = np.where(rng.random(count) < 0.7, favourite[white],
+												rng.integers(0, family_count, count))
+			opening = np.array([by_family[code][index % len(by_family[code])]
+													for code, index in
+													zip(family, rng.integers(0, 1 << 30, count))])
+
+			seconds = elapsed + np.cumsum(rng.integers(1, 30, count))
+			elapsed = int(seconds[-1])
+			timestamps = (START_TIME + seconds.astype("timedelta64[s]")).astype(str)
+
+			block = {
+				"site": np.arange(start, start + count) + (seed << 32),
+				"white": names[white], "black": names[black],
+				"result": rng.choice(RESULTS, count, p=RESULT_WEIGHTS),
+				"date": np.char.replace(np.char.partition(
+					timestamps, "T")[:, 0], "-", "."),
+				"time": np.char.partition(timestamps, "T")[:, 2],
+				"white_elo": pool["elo"].to_numpy()[white]
+										 + rng.integers(-50, 50, count),
+				"black_elo": pool["elo"].to_numpy()[black]
+										 + rng.integers(-50, 50, count),
+				"white_title": titles[white], "black_title": titles[black],
+				"eco": openings["eco"].to_numpy()[opening],
+				"opening": openings["name"].to_numpy()[opening],
+				"time_control": rng.choice(TIME_CONTROLS, count),
+				"moves": openings["pgn"].to_numpy()[opening]
+			}
+			size += f.write(__format_games(block))
+
+	logger.info(f"Generated {games} games in {path} ({size / 2 ** 20:.1f} MiB)")
+	return size
@@ -2,17 +2,41 @@ __author__ = "agueguen-lr"
 __all__ = ["setMaxCores", "addOpeningsToDatabase", "addNewPGNtoDatabase",
 					 "insertDataToPostgres", "createOpeningsDataFrame",
 					 "createGamesDataFrame", "createPlayersDataFrame",
-					 "updatePlayersElo", "PGNtoDataFrame", "validate_and_extract_params"]
-
+					 "updatePlayersElo", "PGNtoDataFrame", "validate_and_extract_params",
+					 "copyToPostgres", "PlayerIdCache", "deterministicIds",
+					 "createInsertExecutor", "IngestionManifest", "RunMetrics",
+					 "enableMetrics", "getMetrics", "measureStage", "addMetrics",
+					 "OpeningTrie", "PGNtoParquet", "addParquetToDatabase",
+					 "writeParquetStore", "readParquetStore"]
+
+import itertools
 import multiprocessing
-from typing import Iterator
+import os
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 import psycopg
 import uuid
 import logging
+import time
 from tqdm import tqdm
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.reduction import ForkingPickler
+
+from DataCollection.manifest import IngestionManifest
+from DataCollection.metrics import (RunMetrics, enableMetrics, getMetrics,
+																		measureStage, addMetrics, timedCall,
+																		collectTimes)
+from DataCollection.openingTrie import OpeningTrie
+from DataCollection.parquetStore import readParquetStore, writeParquetStore
+from DataCollection.playerCache import PlayerIdCache
+from DataCollection.readPGN import MOVES_COLUMN, NAT, UNLIMITED_TIME, \
+	compactGameInfo, readPGNFiles
+from DataCollection.sharedMemory import SharedArrays, attachArrays
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO,
@@ -25,6 +49,23 @@ MAX_CORES = max(multiprocessing.cpu_count() // 5 * 4,
 
 global_connection = None
 
+# Positions of the hexadecimal digits in the text form of a UUID
+UUID_DIGITS = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+
+# Game results as stored in the games table
+RESULT_CODES = pd.Series({"1-0": "W", "0-1": "B", "1/2-1/2": "D"})
+
+# Sentinel of the compact game columns
+MISSING_ELO = np.iinfo(np.int32).min
+
+# Namespaces of the IDs derived from natural keys (deterministic ID mode)
+PLAYERS_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL,
+															 "https://www.shallowview.fr/players")
+OPENINGS_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL,
+																"https://www.shallowview.fr/openings")
+GAMES_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL,
+														 "https://www.shallowview.fr/games")
+
 
 def __connection_initializer(connection_params: dict) -> None:
 	"""
@@ -33,6 +74,9 @@ def __connection_initializer(connection_params: dict) -> None:
 	"""
 	global global_connection
 	global_connection = psycopg.connect(**connection_params)
+	# Timestamps are sent in UTC, whatever the type of the column
+	global_connection.execute("set time zone 'UTC'")
+	global_connection.commit()
 
 
 def setMaxCores(cores: int = MAX_CORES) -> None:
@@ -48,77 +92,158 @@ def setMaxCores(cores: int = MAX_CORES) -> None:
 		logger.warning("Invalid core count. Using default value.")
 
 
-def PGNtoDataFrame(files: list[str], chunk_size : int = 500000) -> Iterator[
-	pd.DataFrame]:
+def PGNtoDataFrame(
+		files: list[str], chunk_size: int = 500000, max_workers: int = None,
+		resume: dict[str, tuple[int, int, int]] = None
+) -> Iterator[pd.DataFrame]:
 	"""
 	Process PGN files and yield DataFrames of games.
+	The files are memory-mapped and split into byte ranges aligned on game
+	headers, which are parsed in parallel.
 	:param files: List of paths to the PGN files.
 	:param chunk_size: Number of games to output per Dataframe.
-	:return: DataFrame containing games from the PGN file.
+	:param max_workers: Number of parser processes (defaults to MAX_CORES).
+	:param resume: Positions to resume some files from, see readPGNFiles.
+	:return: DataFrame containing games from the PGN file, with its position in
+	the file in attrs.
 	"""
 	try:
-		games = []
-		dic = {}
-		for file in files:
-			with open(file, "r") as f:
-				for line in f:
-					if line.startswith("["):
-						try:
-							header, value = line[1:-2].split(" ", 1)
-							dic[header] = value.strip('"')
-						except ValueError as e:
-							logger.error(f"Error parsing header line: {line.strip()} - {e}")
-					elif line.startswith("1") and dic:
-						games.append(dic)
-						dic = {}
-					if len(games) >= chunk_size:
-						yield pd.DataFrame(games)
-						games = []
-			yield pd.DataFrame(games)
-	except FileNotFoundError as e:
-		logger.error(f"File not found")
+		yield from readPGNFiles(files, chunk_size, max_workers or MAX_CORES,
+														resume=resume)
 	except Exception as e:
 		logger.error(f"Unexpected error while processing PGN file: {e}")
 	return None
 
-def __process_players_chunk(
-		chunk: pd.DataFrame,
-		DBPlayers: pd.DataFrame
-) -> pd.DataFrame:
+
+def PGNtoParquet(
+		files: list[str], directory: str, chunk_size: int = 500000,
+		max_workers: int = None
+) -> int:
 	"""
-	Process a chunk of the gameInfo DataFrame to extract player information.
-	:param chunk: Chunk of the gameInfo DataFrame.
-	:param DBPlayers: DataFrame containing player names and ID from the
-	PostgreSQL database.
-	:return: DataFrame containing player information for the chunk.
+	Parse PGN files once into a Parquet store, which addParquetToDatabase loads
+	without parsing them again.
+	:param files: List of paths to the PGN files.
+	:param directory: Directory of the Parquet store, see writeParquetStore.
+	:param chunk_size: Number of games per chunk.
+	:param max_workers: Number of parser processes (defaults to MAX_CORES).
+	:return: Number of games written.
+	"""
+	try:
+		return writeParquetStore(files, directory, chunk_size,
+														 max_workers or MAX_CORES)
+	except Exception as e:
+		logger.error(f"Unexpected error while writing the Parquet store: {e}")
+		return 0
+
+
+def randomIds(count: int) -> np.ndarray:
 	"""
-	names = pd.melt(chunk, value_vars=["White", "Black"], var_name="Color",
-									value_name="name")
-	titles = pd.melt(chunk, value_vars=["WhiteTitle", "BlackTitle"],
-									 var_name="Color", value_name="title")
-	players = pd.DataFrame({"name": names["name"], "title": titles["title"]})
+	Generate random (version 4) UUIDs in bulk.
+	:param count: Number of IDs to generate.
+	:return: Array of UUID strings.
+	"""
+	raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(
+		count, 16).copy()
+	raw[:, 6] = raw[:, 6] & 0x0F | 0x40  # Version 4
+	raw[:, 8] = raw[:, 8] & 0x3F | 0x80  # RFC 4122 variant
+	digits = np.frombuffer(raw.tobytes().hex().encode(), dtype="S1").reshape(
+		count, 32)
+	text = np.full((count, 36), b"-", dtype="S1")
+	text[:, UUID_DIGITS] = digits
+	return text.view("S36").ravel().astype("U36").astype(object)
+
+
+def deterministicIds(namespace: uuid.UUID, keys: pd.Series) -> pd.Series:
+	"""
+	Derive UUIDv5 IDs from natural keys, hashing each distinct key only once.
+	:param namespace: Namespace of the IDs.
+	:param keys: Natural keys of the rows.
+	:return: Series of IDs aligned on the keys, None where the key is missing.
+	"""
+	codes, uniques = pd.factorize(keys)
+	ids = np.array([str(uuid.uuid5(namespace, str(key))) for key in uniques]
+								 + [None], dtype=object)
+	return pd.Series(ids[codes], index=keys.index)  # Code -1 selects None
+
+
+def __factorize_columns(
+		frame: pd.DataFrame, columns: list[str]
+) -> tuple[np.ndarray, pd.Index]:
+	"""
+	Encode several columns with codes shared between them. The codes of
+	categorical columns are reused, only their categories being merged.
+	:param frame: DataFrame containing the columns.
+	:param columns: Names of the columns to encode.
+	:return: Codes of shape (len(columns), len(frame)), -1 for missing values,
+	and the distinct values they refer to.
+	"""
+	if all(isinstance(frame[column].dtype, pd.CategoricalDtype)
+				 for column in columns):
+		uniques = pd.Index(np.concatenate(
+			[frame[column].cat.categories.to_numpy(dtype=object)
+			 for column in columns]), dtype=object).unique()
+		return np.stack([
+			np.append(uniques.get_indexer(frame[column].cat.categories), -1).astype(
+				np.int32)[frame[column].cat.codes.to_numpy()]
+			for column in columns]).reshape(len(columns), len(frame)), uniques
+
+	codes, uniques = pd.factorize(
+		pd.concat([frame[column] for column in columns], ignore_index=True))
+	return (codes.astype(np.int32).reshape(len(columns), len(frame)),
+					pd.Index(uniques, dtype=object))
+
+
+def __first_players(
+		arrays: dict[str, np.ndarray], start: int = 0, end: int = None
+) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Find the first occurrence of each player in a range of games, white players
+	of the range first.
+	:param arrays: Codes of the "names" and "titles" of the players, of shape
+	(2, number of games).
+	:param start: First game of the range.
+	:param end: End of the range (defaults to the last game).
+	:return: Name codes of the players and title codes at their first occurrence.
+	"""
+	names = arrays["names"][:, start:end].ravel()
+	codes, first = np.unique(names, return_index=True)
+	known = codes >= 0
+	return codes[known], arrays["titles"][:, start:end].ravel()[first[known]]
 
-	players = players.drop_duplicates(subset=["name"]).reset_index(drop=True)
-	# Filter out players already in the database
-	if not DBPlayers.empty:
-		players = players[~players["name"].isin(DBPlayers["name"])]
 
-	players["id"] = [str(uuid.uuid4()) for _ in range(len(players))]
-	return players
+def __process_players_shared(
+		descriptor: dict, start: int, end: int
+) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Find the first occurrence of each player in a range of games published in
+	shared memory.
+	:param descriptor: Descriptor of the shared player codes.
+	:param start: First game of the range.
+	:param end: End of the range.
+	:return: Name codes of the players and title codes at their first occurrence.
+	"""
+	return __first_players(attachArrays(descriptor), start, end)
 
 
 def createPlayersDataFrame(
-		gameInfo: pd.DataFrame, DBPlayers: pd.DataFrame,
-		chunk_size: int = 10000
+		gameInfo: pd.DataFrame, DBPlayers: pd.DataFrame | PlayerIdCache,
+		chunk_size: int = 10000, deterministic_ids: bool = False,
+		executor: Executor = None
 ) -> pd.DataFrame:
 	"""
 	Create a DataFrame of players from the raw PGN DataFrame using
 	multiprocessing.
-	:param gameInfo: DataFrame containing raw PGN information.
+	The player columns are encoded once and published in shared memory, the
+	workers only return the codes of the distinct players of their chunk.
+	:param gameInfo: DataFrame containing PGN information, raw or compact.
 	:param DBPlayers: DataFrame containing player names and ID from the
-	PostgreSQL database.
+	PostgreSQL database, or a PlayerIdCache of the players table.
 	:param chunk_size: Number of rows to process at a time.
-	:return: DataFrame containing player information.
+	:param deterministic_ids: Derive the IDs from the player names instead of
+	generating random ones.
+	:param executor: Process pool to use instead of starting a new one.
+	:return: DataFrame containing information on the players which are not in
+	the database yet.
 	"""
 	try:
 		logger.info("Starting to create players DataFrame")
@@ -129,22 +254,47 @@ def createPlayersDataFrame(
 				"DataFrame.")
 			return pd.DataFrame()
 
-		# Split gameInfo into chunks
-		chunks = [
-			gameInfo.iloc[start:start + chunk_size].copy().reset_index(drop=True)
-			for start in range(0, len(gameInfo), chunk_size)]
+		names, name_values = __factorize_columns(gameInfo, ["White", "Black"])
+		titles, title_values = __factorize_columns(
+			gameInfo.reindex(columns=["WhiteTitle", "BlackTitle"]),
+			["WhiteTitle", "BlackTitle"])
+		starts = range(0, len(gameInfo), chunk_size)
 
 		# Process chunks in parallel
-		with ProcessPoolExecutor(max_workers=MAX_CORES) as executor:
-			players_chunks = list(tqdm(executor.map(__process_players_chunk,
-																							chunks,
-																							[DBPlayers] * len(chunks)),
-																 total=len(chunks),
-																 desc="Processing player chunks"))
-
-		# Combine all chunks into a single DataFrame
-		players = pd.concat(players_chunks, ignore_index=True).drop_duplicates(
-			subset=["name"]).reset_index(drop=True)
+		with SharedArrays({"names": names, "titles": titles}) as shared, \
+				(nullcontext(executor) if executor is not None else
+				 ProcessPoolExecutor(max_workers=MAX_CORES)) as pool:
+			players_chunks = list(tqdm(collectTimes(
+				pool.map(timedCall, [__process_players_shared] * len(starts),
+								 [shared.descriptor] * len(starts), starts,
+								 [start + chunk_size for start in starts])),
+				total=len(starts), desc="Processing player chunks"))
+			addMetrics(shared_bytes=shared.size,
+								 ipc_bytes=len(starts) * shared.descriptorSize
+								 + sum(codes.nbytes for chunk in players_chunks
+											 for codes in chunk))
+
+		# Keep the first occurrence of each player across the chunks
+		name_codes = np.concatenate([chunk[0] for chunk in players_chunks])
+		title_codes = np.concatenate([chunk[1] for chunk in players_chunks])
+		name_codes, first = np.unique(name_codes, return_index=True)
+		order = np.argsort(first, kind="stable")
+		players = pd.DataFrame({
+			"name": name_values[name_codes[order]],
+			"title": np.append(title_values.to_numpy(dtype=object),
+												 None)[title_codes[first[order]]]
+		})
+
+		# Filter out players already in the database
+		if isinstance(DBPlayers, PlayerIdCache):
+			players = players[~DBPlayers.contains(players["name"])]
+		elif not DBPlayers.empty:
+			players = players[~players["name"].isin(DBPlayers["name"])]
+		players = players.reset_index(drop=True)
+		if deterministic_ids:
+			players["id"] = deterministicIds(PLAYERS_NAMESPACE, players["name"])
+		else:
+			players["id"] = randomIds(len(players))
 
 		logger.info(
 			f"Finished creating players DataFrame. Total new players: {len(players)}")
@@ -155,51 +305,202 @@ def createPlayersDataFrame(
 		return pd.DataFrame()
 
 
-def __process_games(
-		infoChunk: pd.DataFrame, player_id_map: dict,
-		opening_id_map: dict
+def __game_lookups(
+		gameInfo: pd.DataFrame, player_id_map: pd.Series,
+		openings: pd.DataFrame, opening_trie: OpeningTrie = None
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+	"""
+	Encode the columns of the games and resolve each distinct value only once.
+	Lookup arrays end with the value of the missing code (-1).
+	:param gameInfo: DataFrame containing compact PGN information.
+	:param player_id_map: Series mapping player names to IDs.
+	:param openings: DataFrame containing opening names and IDs.
+	:param opening_trie: Trie of the openings, classifying the games by their
+	moves (optional).
+	:return: Codes and lookup arrays to transform, and the tables of values
+	(ending with None) the transformed positions refer to.
+	"""
+	arrays, tables = {}, {}
+
+	# Players and openings are resolved to positions in the ID tables
+	arrays["players"], names = __factorize_columns(gameInfo, ["White", "Black"])
+	arrays["player_index"] = np.append(
+		player_id_map.index.get_indexer(names), -1).astype(np.int32)
+	tables["players"] = np.append(player_id_map.to_numpy(dtype=object), None)
+
+	# Openings are resolved by name (the last opening wins among homonyms), then
+	# by moves, and unknown ones fall back to their family (the name before ':')
+	opening_positions = pd.Series(np.arange(len(openings)),
+																index=openings["name"].to_numpy())
+	opening_positions = opening_positions[
+		~opening_positions.index.duplicated(keep="last")]
+	arrays["opening"], names = __factorize_columns(gameInfo, ["Opening"])
+	arrays["opening_index"] = np.append(
+		opening_positions.reindex(names).fillna(-1).to_numpy(), -1).astype(
+		np.int32)
+	arrays["opening_family"] = np.append(opening_positions.reindex(
+		pd.Series(names, dtype=object).str.split(":", n=1).str[0]).fillna(
+		-1).to_numpy(), -1).astype(np.int32)
+	if opening_trie is not None and MOVES_COLUMN in gameInfo.columns:
+		arrays["opening_moves"] = opening_trie.classify(gameInfo[MOVES_COLUMN])
+	else:
+		arrays["opening_moves"] = np.full(len(gameInfo), -1, dtype=np.int32)
+	tables["openings"] = np.append(openings["id"].to_numpy(dtype=object), None)
+
+	arrays["result"], results = __factorize_columns(gameInfo, ["Result"])
+	arrays["result_index"] = np.append(
+		RESULT_CODES.index.get_indexer(results), -1).astype(np.int8)
+	tables["results"] = np.append(RESULT_CODES.to_numpy(dtype=object), None)
+
+	arrays["elo"] = np.stack([
+		gameInfo[column].to_numpy(dtype=np.int32, na_value=MISSING_ELO)
+		for column in ["WhiteElo", "BlackElo"]])
+
+	# Timestamps as nanoseconds, NaT (the smallest int64) when invalid
+	arrays["date_time"] = pd.DatetimeIndex(
+		gameInfo["UTCDateTime"]).as_unit("ns").asi8
+
+	# Time controls are formatted back as text (e.g. "180+2")
+	bases, increments = (
+		gameInfo[column].to_numpy(dtype=np.int64, na_value=-2)
+		for column in ["BaseTime", "Increment"])
+	arrays["time_control"], pairs = pd.factorize(
+		((bases + 2) << 32) | (increments + 2))  # Both fit in 32 bits
+	tables["time_controls"] = np.array(
+		[None if -2 in (base, increment) else
+		 "-" if base == UNLIMITED_TIME else f"{base}+{increment}"
+		 for base, increment in zip((pairs >> 32) - 2, (pairs & 0xFFFFFFFF) - 2)]
+		+ [None], dtype=object)
+	return arrays, tables
+
+
+def __transform_games(
+		arrays: dict[str, np.ndarray], start: int = 0, end: int = None
+) -> dict[str, np.ndarray]:
+	"""
+	Transform a range of encoded games into compact columns.
+	:param arrays: Codes and lookup arrays built by __game_lookups.
+	:param start: First game of the range.
+	:param end: End of the range (defaults to the last game).
+	:return: Positions of the players, openings and results in their tables,
+	Elo ratings (MISSING_ELO when unknown) and timestamps in nanoseconds.
+	"""
+	opening = arrays["opening_index"][arrays["opening"][0, start:end]]
+	opening = np.where(opening >= 0, opening,
+										 arrays["opening_moves"][start:end])
+	opening = np.where(opening >= 0, opening,
+										 arrays["opening_family"][arrays["opening"][0, start:end]])
+	return {
+		"players": arrays["player_index"][arrays["players"][:, start:end]],
+		"opening": opening,
+		"result": arrays["result_index"][arrays["result"][0, start:end]],
+		"elo": arrays["elo"][:, start:end],
+		"date_time": arrays["date_time"][start:end]
+	}
+
+
+def __process_games_shared(
+		descriptor: dict, start: int, end: int
+) -> dict[str, np.ndarray]:
+	"""
+	Transform a range of the encoded games published in shared memory.
+	:param descriptor: Descriptor of the shared codes and lookup arrays.
+	:param start: First game of the range.
+	:param end: End of the range.
+	:return: Compact columns of the games, see __transform_games.
+	"""
+	return __transform_games(attachArrays(descriptor), start, end)
+
+
+def __date_time_text(values: np.ndarray) -> np.ndarray:
+	"""
+	Format timestamps as in the UTCDate and UTCTime headers, formatting each
+	distinct day and time of day only once.
+	:param values: Timestamps in nanoseconds, NaT when invalid.
+	:return: Timestamps as "YYYY.MM.DD HH:MM:SS" text, empty for NaT.
+	"""
+	day = np.int64(86400 * 10 ** 9)
+	valid = np.where(values == NAT, 0, values)
+	days, day_values = pd.factorize(valid // day)
+	times, time_values = pd.factorize(valid % day // 10 ** 9)
+	day_text = pd.to_datetime(day_values * day).strftime("%Y.%m.%d").to_numpy(
+		dtype=object)
+	time_text = np.array([f"{time // 3600:02d}:{time // 60 % 60:02d}:"
+												f"{time % 60:02d}" for time in time_values], dtype=object)
+	return np.where(values == NAT, "", day_text[days] + " " + time_text[times])
+
+
+def __games_from_columns(
+		gameInfo: pd.DataFrame, arrays: dict[str, np.ndarray],
+		tables: dict[str, np.ndarray], columns: dict[str, np.ndarray],
+		deterministic_ids: bool = False
 ) -> pd.DataFrame:
 	"""
-	Process a single chunk of the gameInfo DataFrame.
-	:param infoChunk: Chunk of the gameInfo DataFrame.
-	:param player_id_map: Dictionary mapping player names to IDs.
-	:param opening_id_map: Dictionary mapping opening names to IDs.
-	:return: Processed chunk as a DataFrame.
-	"""
-	gameChunk = pd.DataFrame()
-	gameChunk["id"] = [str(uuid.uuid4()) for _ in range(len(infoChunk))]
-	gameChunk["white"] = infoChunk["White"].map(player_id_map)
-	gameChunk["black"] = infoChunk["Black"].map(player_id_map)
-	gameChunk["opening"] = infoChunk["Opening"].map(
-		lambda x: opening_id_map.get(x, opening_id_map.get(x.split(":")[0])))
-	gameChunk["result"] = infoChunk.apply(
-		lambda row: "D" if row["Result"] == "1/2-1/2" else
-		"W" if row["Result"] == "1-0" else
-		"B" if row["Result"] == "0-1" else
-		None,
-		axis=1
-	)
-	gameChunk["white_elo"] = infoChunk["WhiteElo"]
-	gameChunk["black_elo"] = infoChunk["BlackElo"]
-	gameChunk["date_time"] = infoChunk["UTCDate"].astype(str) + " " + infoChunk[
-		"UTCTime"].astype(str)
-	gameChunk["time_control"] = infoChunk["TimeControl"]
-	return gameChunk
+	Build the games DataFrame from the compact columns of the games.
+	:param gameInfo: DataFrame containing compact PGN information.
+	:param arrays: Codes and lookup arrays built by __game_lookups.
+	:param tables: Tables of values built by __game_lookups.
+	:param columns: Compact columns of all the games.
+	:param deterministic_ids: Derive the game IDs from the site, players and
+	timestamp of the games instead of generating random ones.
+	:return: DataFrame containing game information.
+	"""
+	games = pd.DataFrame(index=pd.RangeIndex(len(gameInfo)))
+	if deterministic_ids:
+		site = gameInfo["Site"].to_numpy(dtype=object) \
+			if "Site" in gameInfo.columns else np.full(len(gameInfo), None)
+		games["id"] = deterministicIds(
+			GAMES_NAMESPACE,
+			pd.Series(np.where(pd.isna(site), "", site)) + "|"
+			+ gameInfo["White"].to_numpy(dtype=object) + "|"
+			+ gameInfo["Black"].to_numpy(dtype=object) + "|"
+			+ __date_time_text(arrays["date_time"])).to_numpy()
+	else:
+		games["id"] = randomIds(len(gameInfo))
+
+	games["white"] = tables["players"][columns["players"][0]]
+	games["black"] = tables["players"][columns["players"][1]]
+	games["opening"] = tables["openings"][columns["opening"]]
+	games["result"] = tables["results"][columns["result"]]
+	games["white_elo"] = pd.arrays.IntegerArray(
+		columns["elo"][0], columns["elo"][0] == MISSING_ELO)
+	games["black_elo"] = pd.arrays.IntegerArray(
+		columns["elo"][1], columns["elo"][1] == MISSING_ELO)
+	games["date_time"] = pd.DatetimeIndex(
+		columns["date_time"].view("datetime64[ns]")).tz_localize("UTC")
+	games["time_control"] = tables["time_controls"][arrays["time_control"]]
+	return games
 
 
 def createGamesDataFrame(
 		gameInfo: pd.DataFrame, players: pd.DataFrame,
 		openings: pd.DataFrame,
-		chunk_size: int = 10000
+		chunk_size: int = 10000, deterministic_ids: bool = False,
+		executor: Executor = None, parallel: bool = False,
+		opening_trie: OpeningTrie = None
 ) -> pd.DataFrame:
 	"""
-	Create a DataFrame of games from the raw PGN DataFrame.
-	:param gameInfo: DataFrame containing raw PGN information.
+	Create a DataFrame of games from the PGN DataFrame.
+	The opening of a game is found by its name in the Opening header, by its
+	first moves when the name is unknown, and by the family of its name (the part
+	before ':') when neither matches.
+	:param gameInfo: DataFrame containing PGN information, raw (strings) or
+	compact (see compactColumns).
 	:param players: DataFrame containing player names and IDs from the
 	PostgreSQL database. (must be up to date)
 	:param openings: DataFrame containing opening names and IDs from the
 	PostgreSQL database. (must be up to date)
-	:param chunk_size: Number of rows to process at a time.
+	:param chunk_size: Number of rows to process at a time in parallel mode.
+	:param deterministic_ids: Derive the game IDs from the site, players and
+	timestamp of the games instead of generating random ones.
+	:param executor: Process pool to use in parallel mode instead of starting a
+	new one.
+	:param parallel: Split gameInfo into chunks processed by a process pool, the
+	encoded columns and lookup arrays being shared with the workers through
+	shared memory. The transformation being vectorized, it mostly pays off on
+	very large DataFrames.
+	:param opening_trie: Trie of the openings to classify the games by their
+	moves, built from the "pgn" column of openings when not given.
 	:return: DataFrame containing game information.
 	"""
 	try:
@@ -212,32 +513,52 @@ def createGamesDataFrame(
 				"DataFrame.")
 			return pd.DataFrame()
 
+		# Raw headers are converted to the compact schema of the parser
+		gameInfo = compactGameInfo(gameInfo)
+
 		# Check for required columns
 		required_columns = ["White", "Black", "Result", "WhiteElo", "BlackElo",
-												"UTCDate", "UTCTime", "TimeControl", "Opening"]
+												"UTCDateTime", "BaseTime", "Increment", "Opening"]
 		for col in required_columns:
 			if col not in gameInfo.columns:
 				logger.error(f"Missing required column in gameInfo DataFrame: {col}")
 				return pd.DataFrame()
 
-		# Create mapping dictionaries
-		player_id_map = players.set_index("name")["id"].to_dict()
-		opening_id_map = openings.set_index("name")["id"].to_dict()
-
-		# Split gameInfo into chunks
-		chunks = [
-			gameInfo.iloc[start:start + chunk_size].copy().reset_index(drop=True)
-			for start in range(0, len(gameInfo), chunk_size)]
-
-		# Process chunks in parallel
-		with ProcessPoolExecutor(max_workers=MAX_CORES) as executor:
-			games_chunks = (list(tqdm(
-				executor.map(__process_games, chunks,
-										 [player_id_map] * len(chunks),
-										 [opening_id_map] * len(chunks)),
-				total=len(chunks), desc="Processing chunks")))
-
-		games = pd.concat(games_chunks, ignore_index=True)
+		# Create mapping Series
+		player_id_map = players.drop_duplicates(subset=["name"]).set_index(
+			"name")["id"]
+		openings = openings.reset_index(drop=True)
+		if (opening_trie is None and "pgn" in openings.columns
+				and MOVES_COLUMN in gameInfo.columns):
+			opening_trie = OpeningTrie(openings)
+
+		arrays, tables = __game_lookups(gameInfo, player_id_map, openings,
+																		opening_trie)
+
+		if not parallel:
+			columns = __transform_games(arrays)
+		else:
+			# Codes and lookup arrays are published once, each worker transforms a
+			# range of games and only returns compact columns
+			starts = range(0, len(gameInfo), chunk_size)
+			with SharedArrays(arrays) as shared, \
+					(nullcontext(executor) if executor is not None else
+					 ProcessPoolExecutor(max_workers=MAX_CORES)) as pool:
+				games_chunks = list(tqdm(collectTimes(
+					pool.map(timedCall, [__process_games_shared] * len(starts),
+									 [shared.descriptor] * len(starts), starts,
+									 [start + chunk_size for start in starts])),
+					total=len(starts), desc="Processing chunks"))
+				addMetrics(shared_bytes=shared.size,
+									 ipc_bytes=len(starts) * shared.descriptorSize
+									 + sum(column.nbytes for chunk in games_chunks
+												 for column in chunk.values()))
+			columns = {key: np.concatenate([chunk[key] for chunk in games_chunks],
+																		 axis=-1)
+								 for key in games_chunks[0]}
+
+		games = __games_from_columns(gameInfo, arrays, tables, columns,
+																 deterministic_ids)
 
 		logger.info(f"Finished creating games DataFrame. Total games: {len(games)}")
 		return games
@@ -250,11 +571,15 @@ def createGamesDataFrame(
 		return pd.DataFrame()
 
 
-def createOpeningsDataFrame(openingFiles: list[str]) -> pd.DataFrame:
+def createOpeningsDataFrame(
+		openingFiles: list[str], deterministic_ids: bool = False
+) -> pd.DataFrame:
 	"""
 	Create a DataFrame of openings from the lichess opening database's TSV files.
 	:param: openingFiles: List of paths to TSV files containing opening
 	information.
+	:param deterministic_ids: Derive the IDs from the name and moves of the
+	openings instead of generating random ones.
 	:return: DataFrame containing opening information.
 	"""
 	try:
@@ -272,8 +597,13 @@ def createOpeningsDataFrame(openingFiles: list[str]) -> pd.DataFrame:
 				logger.error(f"Opening file not found: {openingFile} - {e}")
 
 		openingsDataFrame = pd.concat(openings, ignore_index=True)
-		openingsDataFrame["id"] = [str(uuid.uuid4()) for _ in
-															 range(len(openingsDataFrame))]
+		if deterministic_ids:
+			# Names are not unique, the openings table's key is the name and moves
+			openingsDataFrame["id"] = deterministicIds(
+				OPENINGS_NAMESPACE,
+				openingsDataFrame["name"] + "|" + openingsDataFrame["pgn"])
+		else:
+			openingsDataFrame["id"] = randomIds(len(openingsDataFrame))
 
 		logger.info(
 			f"Finished creating openings DataFrame. Total openings:"
@@ -305,7 +635,9 @@ def __insert_chunk_to_postgres(chunk: pd.DataFrame, table_name: str) -> None:
 					psycopg.sql.Placeholder() for _ in chunk.columns)
 			)
 
-			# Execute the insert query
+			# Execute the insert query (missing values of typed columns as NULL)
+			chunk = chunk.astype(object)
+			chunk = chunk.where(chunk.notna(), None)
 			cursor.executemany(insert_query,
 												 [tuple(row) for row in chunk.itertuples(index=False)])
 		# Commit the transaction
@@ -314,107 +646,531 @@ def __insert_chunk_to_postgres(chunk: pd.DataFrame, table_name: str) -> None:
 		logging.error(f"Error inserting chunk into table '{table_name}': {e}")
 
 
+def __copy_column(column: pd.Series, type_name: str) -> list:
+	"""
+	Convert a DataFrame column to the Python values expected by the binary COPY
+	dumper of a PostgreSQL type.
+	:param column: Column to convert.
+	:param type_name: Name of the PostgreSQL type of the column (pg_type.typname).
+	:return: List of values, None standing for NULL.
+	"""
+	if type_name in ("int2", "int4", "int8"):
+		column = pd.to_numeric(column, errors="coerce").astype("Int64")
+	elif type_name in ("timestamp", "timestamptz"):
+		column = pd.to_datetime(column, errors="coerce", utc=True)
+		if type_name == "timestamp":
+			column = column.dt.tz_localize(None)
+	elif type_name == "uuid":
+		column = column.map(
+			lambda x: x if isinstance(x, uuid.UUID) else uuid.UUID(str(x)),
+			na_action="ignore")
+	column = column.astype(object)
+	return column.where(column.notna(), None).tolist()
+
+
+def copyToPostgres(
+		connection: psycopg.Connection, table_name: str, dataframe: pd.DataFrame
+) -> int:
+	"""
+	Load a DataFrame into a PostgreSQL table with a binary COPY into a temporary
+	staging table, followed by a single insert of its rows which are not already
+	in the table. The transaction is left open for the caller to commit.
+	:param connection: Connection to the PostgreSQL database.
+	:param table_name: Name of the table to insert data into.
+	:param dataframe: DataFrame whose columns match columns of the table.
+	:return: Number of rows inserted in the table.
+	"""
+	table = psycopg.sql.Identifier(table_name)
+	stage = psycopg.sql.Identifier(f"{table_name}_staging")
+	columns = psycopg.sql.SQL(", ").join(
+		[psycopg.sql.Identifier(col) for col in dataframe.columns])
+
+	with connection.cursor() as cursor:
+		# Temporary tables are private to the session and never WAL-logged
+		cursor.execute(psycopg.sql.SQL(
+			"create temp table if not exists {stage} (like {table} including "
+			"defaults) on commit delete rows"
+		).format(stage=stage, table=table))
+
+		types = dict(cursor.execute(
+			"select a.attname::text, t.typname::text from pg_attribute a "
+			"join pg_type t on t.oid = a.atttypid "
+			"where a.attrelid = %s::regclass and a.attnum > 0 "
+			"and not a.attisdropped",
+			(table_name,)
+		).fetchall())
+		column_types = [types[col] for col in dataframe.columns]
+
+		with cursor.copy(psycopg.sql.SQL(
+				"copy {stage} ({columns}) from stdin (format binary)"
+		).format(stage=stage, columns=columns)) as copy:
+			# bpchar has no binary dumper but shares the binary format of text
+			copy.set_types(["text" if type_name == "bpchar" else type_name
+											for type_name in column_types])
+			for row in zip(*(__copy_column(dataframe[col], type_name)
+											 for col, type_name in zip(dataframe.columns,
+																								 column_types))):
+				copy.write_row(row)
+
+		cursor.execute(psycopg.sql.SQL(
+			"insert into {table} ({columns}) select {columns} from {stage} "
+			"on conflict do nothing"
+		).format(table=table, columns=columns, stage=stage))
+		inserted = cursor.rowcount
+		cursor.execute(psycopg.sql.SQL("truncate {stage}").format(stage=stage))
+
+	return inserted
+
+
+def __copy_chunk_to_postgres(chunk: pd.DataFrame, table_name: str) -> int:
+	"""
+	Load a chunk of data into the PostgreSQL table with COPY.
+	:param chunk: Data chunk to insert.
+	:param table_name: Name of the table to insert data into.
+	:return: Number of rows inserted.
+	"""
+	global global_connection
+	try:
+		inserted = copyToPostgres(global_connection, table_name, chunk)
+		global_connection.commit()
+		return inserted
+	except Exception as e:
+		global_connection.rollback()
+		logging.error(f"Error copying chunk into table '{table_name}': {e}")
+		return 0
+
+
+def createInsertExecutor(connection_params: dict) -> ProcessPoolExecutor:
+	"""
+	Start a process pool whose workers each keep a connection to the database,
+	to be reused across calls to insertDataToPostgres.
+	:param connection_params: Dictionary of database connection parameters.
+	:return: Process pool executor.
+	"""
+	return ProcessPoolExecutor(max_workers=MAX_CORES,
+														 initializer=__connection_initializer,
+														 initargs=(connection_params,))
+
+
 def insertDataToPostgres(
 		connection_params: dict, table_name: str,
 		dataframe: pd.DataFrame,
-		chunk_size: int = 1000
+		chunk_size: int = None, method: str = "copy",
+		executor: Executor = None
 ) -> None:
 	"""
 	Insert data from a pandas DataFrame into the PostgreSQL table.
 	:param connection_params: Dictionary of database connection parameters.
 	:param table_name: Name of the table to insert data into.
 	:param dataframe: DataFrame containing the data to be inserted.
-	:param chunk_size: Number of rows to insert at a time.
+	:param chunk_size: Number of rows to insert at a time (defaults to 100000
+	for "copy" and 1000 for "insert").
+	:param method: "copy" to load the chunks with binary COPY through a staging
+	table, "insert" to send them as batches of insert statements.
+	:param executor: Pool created by createInsertExecutor to use instead of
+	starting a new one.
 	"""
 	logger.info(f"Starting data insertion into table '{table_name}'.")
 	try:
+		if method == "copy":
+			insert_chunk = __copy_chunk_to_postgres
+			chunk_size = chunk_size or 100000
+		elif method == "insert":
+			insert_chunk = __insert_chunk_to_postgres
+			chunk_size = chunk_size or 1000
+		else:
+			raise ValueError("Invalid insertion method. Must be 'copy' or 'insert'.")
+
 		# Split DataFrame into chunks
 		chunks = [dataframe.iloc[i:i + chunk_size] for i in
 							range(0, len(dataframe), chunk_size)]
 
 		# Use multiprocessing to insert chunks
-		with ProcessPoolExecutor(max_workers=MAX_CORES,
-														 initializer=__connection_initializer,
-														 initargs=(connection_params,)) as executor:
-			list(tqdm(executor.map(__insert_chunk_to_postgres, chunks,
-														 [table_name] * len(chunks)),
-								total=len(chunks), desc="Inserting chunks"))
+		start = time.perf_counter()
+		with (nullcontext(executor) if executor is not None else
+					createInsertExecutor(connection_params)) as pool:
+			inserted = list(tqdm(collectTimes(
+				pool.map(timedCall, [insert_chunk] * len(chunks), chunks,
+								 [table_name] * len(chunks))),
+				total=len(chunks), desc="Inserting chunks"))
+		elapsed = time.perf_counter() - start
+		addMetrics(rows_in=len(dataframe),
+							 rows_out=sum(inserted) if method == "copy" else len(dataframe),
+							 # Size of the chunks as pickled to the workers
+							 ipc_bytes=sum(len(ForkingPickler.dumps(chunk))
+														 for chunk in chunks)
+							 if getMetrics() is not None else 0)
 
 		logger.info(
 			f"Data insertion completed for table '{table_name}'. Total rows "
-			f"inserted: {len(dataframe)}.")
+			f"sent: {len(dataframe)}"
+			+ (f", new rows: {sum(inserted)}" if method == "copy" else "")
+			+ f" ({len(dataframe) / elapsed if elapsed else 0:.0f} rows/s).")
 	except Exception as e:
 		logger.error(f"Error during data insertion into table '{table_name}': {e}")
 
 
-def updatePlayersElo(connection_params: dict) -> None:
+def updatePlayersElo(
+		connection_params: dict, player_ids: Iterable[str] = None,
+		batch_size: int = 50000
+) -> bool:
 	"""
 	Update the max and current ELO of players in the PostgreSQL database.
 	:param connection_params: Dictionary of database connection parameters.
+	:param player_ids: IDs of the players to update, typically the players of
+	the games just added (defaults to all players).
+	:param batch_size: Number of players updated per statement.
+	:return: True if the ELO were updated.
 	"""
 	try:
 		with psycopg.connect(**connection_params, autocommit=True) as connection:
+			if player_ids is not None:
+				# Sorted IDs keep the index lookups of a batch close to each other
+				player_ids = sorted(set(player_ids))
+				try:
+					for start in range(0, len(player_ids), batch_size):
+						batch = player_ids[start:start + batch_size]
+						connection.execute("SELECT update_players_max_elo(%s::uuid[])",
+															 (batch,))
+						connection.execute("SELECT update_players_current_elo(%s::uuid[])",
+															 (batch,))
+					logger.info(f"Max and current ELO of {len(player_ids)} players "
+											f"updated successfully.")
+					return True
+				except psycopg.errors.UndefinedFunction:
+					logger.warning("Incremental ELO functions missing from the database, "
+												 "updating all players instead.")
+
 			connection.execute("SELECT update_players_max_elo()")
 			connection.execute("SELECT update_players_current_elo()")
 
 		logger.info("Players' max and current ELO updated successfully.")
+		return True
 	except Exception as e:
 		logger.error(f"Error updating players' max ELO: {e}")
+		return False
+
+
+def __prefetch(iterator: Iterator, size: int) -> Iterator:
+	"""
+	Run an iterator in a background thread, which stays at most `size` items
+	ahead of the consumer.
+	:param iterator: Iterator to run.
+	:param size: Maximum number of items waiting to be consumed.
+	:return: Iterator over the same items.
+	"""
+	items = queue.Queue(maxsize=size)
+	stop = threading.Event()
+	done = object()
+
+	def put(item) -> bool:
+		while not stop.is_set():
+			try:
+				items.put(item, timeout=0.1)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+	def produce() -> None:
+		try:
+			for item in iterator:
+				if not put((item, None)):
+					return
+			put((done, None))
+		except BaseException as e:
+			put((done, e))
+
+	threading.Thread(target=produce, daemon=True).start()
+	try:
+		while True:
+			item, error = items.get()
+			if error is not None:
+				raise error
+			if item is done:
+				return
+			yield item
+	finally:
+		stop.set()
+
+
+def __transform_chunks(
+		rawChunks: Iterator[pd.DataFrame], db_params: dict, players_table: str,
+		cache: PlayerIdCache, openings: pd.DataFrame, opening_trie: OpeningTrie,
+		deterministic_ids: bool, transform_executor: Executor,
+		insert_executor: Executor
+) -> Iterator[tuple[pd.DataFrame, pd.DataFrame, dict]]:
+	"""
+	Turn raw PGN chunks into the players and games to insert in the database.
+	:param rawChunks: Iterator over DataFrames of raw PGN information.
+	:param db_params: Dictionary of database connection parameters.
+	:param players_table: Name of the players table.
+	:param cache: Player ID cache, kept up to date with the new players.
+	:param openings: DataFrame containing opening names and IDs.
+	:param opening_trie: Trie of the openings.
+	:param deterministic_ids: Derive the IDs from the natural keys.
+	:param transform_executor: Process pool used to create the DataFrames.
+	:param insert_executor: Pool created by createInsertExecutor.
+	:return: Iterator over the players left to insert, the games and the position
+	in its file of each chunk.
+	"""
+	with psycopg.connect(**db_params, autocommit=True) as connection:
+		for index, rawPGN in enumerate(rawChunks):
+			with measureStage("players", index) as counters:
+				players = createPlayersDataFrame(rawPGN, cache,
+																				 deterministic_ids=deterministic_ids,
+																				 executor=transform_executor)
+				counters["rows_in"] += len(rawPGN)
+				counters["rows_out"] += len(players)
+			if deterministic_ids:
+				# Pending until the load stage commits them
+				cache.update(players.get("name", []), players.get("id", []),
+										 committed=False)
+			else:
+				# Random IDs are read back from the database once inserted
+				with measureStage("load_players", index):
+					insertDataToPostgres(db_params, players_table, players,
+															 executor=insert_executor)
+					if not players.empty:
+						cache.refresh(connection, players_table, players["name"])
+				players = pd.DataFrame()
+
+			with measureStage("games", index) as counters:
+				games = createGamesDataFrame(
+					rawPGN,
+					cache.toDataFrame(pd.concat([rawPGN["White"], rawPGN["Black"]],
+																			ignore_index=True)),
+					openings, deterministic_ids=deterministic_ids,
+					executor=transform_executor, opening_trie=opening_trie)
+				counters["rows_in"] += len(rawPGN)
+				counters["rows_out"] += len(games)
+			yield players, games, rawPGN.attrs
+
+
+def __measure_parsing(
+		rawChunks: Iterator[pd.DataFrame], stage: str = "parse"
+) -> Iterator[pd.DataFrame]:
+	"""
+	Measure the parsing (or reading) of each chunk of games.
+	:param rawChunks: Iterator over DataFrames of raw PGN information.
+	:param stage: Name of the stage.
+	:return: Iterator over the same DataFrames.
+	"""
+	for index in itertools.count():
+		with measureStage(stage, index) as counters:
+			rawPGN = next(rawChunks, None)
+			if rawPGN is not None:
+				counters["rows_out"] += len(rawPGN)
+				counters["bytes_read"] += rawPGN.attrs.get("bytes_read", 0)
+		if rawPGN is None:
+			return
+		yield rawPGN
+
+
+def __load_chunk(
+		connection: psycopg.Connection, manifest: IngestionManifest,
+		table_names: dict, players: pd.DataFrame, games: pd.DataFrame,
+		position: dict
+) -> None:
+	"""
+	Load the players and games of a chunk and record its position and players in
+	the manifest, in a single transaction.
+	:param connection: Connection to the PostgreSQL database.
+	:param manifest: Ingestion manifest.
+	:param table_names: Dictionary containing the table names for "players" and
+	"games" in the database.
+	:param players: Players left to insert.
+	:param games: Games of the chunk.
+	:param position: Position of the chunk in its file.
+	"""
+	try:
+		start = time.perf_counter()
+		new_players = copyToPostgres(
+			connection, table_names.get("players", "players"),
+			players) if not players.empty else 0
+		inserted = copyToPostgres(connection, table_names.get("games", "games"),
+															games) if not games.empty else 0
+		if not games.empty:
+			manifest.touch(connection, pd.unique(
+				pd.concat([games["white"], games["black"]]).dropna()))
+		manifest.checkpoint(connection, position)
+		connection.commit()
+		addMetrics(rows_in=len(players) + len(games),
+							 rows_out=new_players + inserted)
+		logger.info(
+			f"Committed {len(games)} games of {position['file']} ({inserted} new, "
+			f"{position['games']} games of the file loaded) in "
+			f"{time.perf_counter() - start:.1f}s.")
+	except Exception:
+		connection.rollback()
+		raise
+
+
+def __load_references(
+		db_params: dict, table_names: dict, player_cache: str | None,
+		deterministic_ids: bool
+) -> tuple[PlayerIdCache, pd.DataFrame, OpeningTrie]:
+	"""
+	Load the existing players and the openings once for all chunks.
+	:param db_params: Dictionary of database connection parameters.
+	:param table_names: Dictionary containing the table names for "players" and
+	"openings" in the database.
+	:param player_cache: Path to the player ID cache file (optional).
+	:param deterministic_ids: Derive the IDs from the natural keys.
+	:return: Player ID cache, openings and trie of the openings.
+	"""
+	with psycopg.connect(**db_params) as connection:
+		if player_cache is not None or not deterministic_ids:
+			cache = PlayerIdCache.load(connection,
+																 table_names.get("players", "players"),
+																 player_cache)
+		else:
+			cache = PlayerIdCache()
+
+		with connection.cursor() as cursor:
+			query = psycopg.sql.SQL(
+				"SELECT id, name, pgn FROM {opening_table}").format(
+				opening_table=psycopg.sql.Identifier(
+					table_names.get("openings", "openings"))
+			)
+			openings_data = cursor.execute(query).fetchall()
+			openings = pd.DataFrame(openings_data, columns=["id", "name", "pgn"])
+	return cache, openings, OpeningTrie(openings)
+
+
+def __load_games(
+		rawChunks: Iterator[pd.DataFrame], db_params: dict, table_names: dict,
+		player_cache: str | None, deterministic_ids: bool, queue_size: int,
+		incremental_elo: bool, manifest: IngestionManifest | None = None
+) -> None:
+	"""
+	Load chunks of games into the database, then update the ELO of the players.
+	Transformation and loading run as a pipeline with the production of the
+	chunks, each stage being at most `queue_size` chunks ahead of the next one.
+	:param rawChunks: Iterator over DataFrames of raw or compact PGN
+	information, already measured.
+	:param db_params: Dictionary of database connection parameters.
+	:param table_names: Dictionary containing the table names for "players",
+	"openings" and "games" in the database.
+	:param player_cache: Path to a file keeping the player ID cache between runs
+	(optional).
+	:param deterministic_ids: Derive the IDs from the natural keys.
+	:param queue_size: Maximum number of chunks waiting between two stages.
+	:param incremental_elo: Only update the ELO of the players of the added
+	games.
+	:param manifest: Ingestion manifest to record the position of each chunk in,
+	along with its games and, if it tracks them (see tracksPlayers), their
+	players (optional).
+	"""
+	players_table = table_names.get("players", "players")
+	games_table = table_names.get("games", "games")
+	cache, openings, opening_trie = __load_references(
+		db_params, table_names, player_cache, deterministic_ids)
+
+	with ProcessPoolExecutor(max_workers=MAX_CORES) as transform_executor, \
+			createInsertExecutor(db_params) as insert_executor, \
+			psycopg.connect(**db_params) as connection:
+		connection.execute("set time zone 'UTC'")
+		transformed = __prefetch(
+			__transform_chunks(__prefetch(rawChunks, queue_size), db_params,
+												 players_table, cache, openings, opening_trie,
+												 deterministic_ids, transform_executor,
+												 insert_executor),
+			queue_size)
+
+		# Without a table of touched players, they are collected in memory
+		tracked = manifest is not None and manifest.tracking
+		touched = set()
+		for index, (players, games, position) in enumerate(transformed):
+			if incremental_elo and not tracked and not games.empty:
+				touched.update(games["white"].dropna())
+				touched.update(games["black"].dropna())
+			with measureStage("load", index):
+				if manifest is not None:
+					__load_chunk(connection, manifest, table_names, players, games,
+											 position)
+					if not players.empty:
+						cache.update(players["name"], players["id"])
+					continue
+				if not players.empty:
+					insertDataToPostgres(db_params, players_table, players,
+															 executor=insert_executor)
+					# Only the players found in the table are confirmed
+					cache.refresh(connection, players_table, players["name"])
+					connection.commit()
+				insertDataToPostgres(db_params, games_table, games,
+														 executor=insert_executor)
+
+	if player_cache is not None:
+		cache.save(player_cache)
+
+	# Update players' ELO columns in the database
+	with measureStage("elo") as counters:
+		if not incremental_elo:
+			updatePlayersElo(db_params)
+		elif tracked:
+			# Players recorded with the chunks, including those of interrupted runs
+			with psycopg.connect(**db_params, autocommit=True) as connection:
+				touched = manifest.touched(connection)
+				if touched and updatePlayersElo(db_params, touched):
+					manifest.release(connection, touched)
+			counters["rows_in"] += len(touched)
+		elif touched:
+			updatePlayersElo(db_params, touched)
+			counters["rows_in"] += len(touched)
 
 
 def addNewPGNtoDatabase(
 		PGNFiles: list[str], db_params: dict,
-		table_names: dict
+		table_names: dict, player_cache: str = None,
+		deterministic_ids: bool = False, queue_size: int = 2,
+		chunk_size: int = 500000, incremental_elo: bool = True
 ) -> None:
 	"""
 	Add new PGN files to the PostgreSQL database.
+	Parsing, transformation and loading run as a pipeline: while a chunk is
+	being loaded, the next ones are being parsed and transformed, each stage
+	being at most `queue_size` chunks ahead of the next one. The process pools
+	of the stages are kept for the whole run.
+	When the database has an ingestion manifest table, each chunk is committed
+	along with the progress of its file: files already loaded are skipped and
+	interrupted files are resumed after their last committed chunk.
 	:param PGNFiles: List of paths to the PGN files.
 	:param db_params: Dictionary of database connection parameters.
 	:param table_names: Dictionary containing the table names for "players",
-	"openings", and "games" in the database.
+	"openings", "games" and "manifest" in the database.
+	:param player_cache: Path to a file keeping the player ID cache between runs
+	(optional).
+	:param deterministic_ids: Derive the player and game IDs from their natural
+	keys, so that no players need to be read from the database and that adding
+	the same games twice has no effect. The players already in the database must
+	have been added in this mode too, unless a player cache is used.
+	:param queue_size: Maximum number of chunks waiting between two stages,
+	which bounds the memory used by the pipeline.
+	:param chunk_size: Number of games per chunk.
+	:param incremental_elo: Only update the ELO of the players of the added
+	games, instead of all players.
 	"""
 	try:
-		players_table = table_names.get("players", "players")
-		openings_table = table_names.get("openings", "openings")
-		games_table = table_names.get("games", "games")
-
-		for rawPGN in PGNtoDataFrame(PGNFiles):
-
-			# Connect to the database
-			with psycopg.connect(**db_params) as connection:
-				# Get current existing players in the database
-				with connection.cursor() as cursor:
-					query = psycopg.sql.SQL("select id, name from {player_table}").format(
-						player_table=psycopg.sql.Identifier(players_table)
-					)
-					players_data = cursor.execute(query).fetchall()
-					DBplayers = pd.DataFrame(players_data, columns=["id", "name"])
-
-				# Create DataFrame for new players and insert into PostgreSQL
-				players = createPlayersDataFrame(rawPGN, DBplayers)
-				insertDataToPostgres(db_params, players_table, players)
-
-				# Get updated player and opening data from the database
-				with connection.cursor() as cursor:
-					query = psycopg.sql.SQL("SELECT id, name FROM {player_table}").format(
-						player_table=psycopg.sql.Identifier(players_table)
-					)
-					players_data = cursor.execute(query).fetchall()
-					players = pd.DataFrame(players_data, columns=["id", "name"])
-
-					query = psycopg.sql.SQL(
-						"SELECT id, name, pgn FROM {opening_table}").format(
-						opening_table=psycopg.sql.Identifier(openings_table)
-					)
-					openings_data = cursor.execute(query).fetchall()
-					openings = pd.DataFrame(openings_data, columns=["id", "name", "pgn"])
-
-				# Create the games DataFrame and insert into PostgreSQL
-				games = createGamesDataFrame(rawPGN, players, openings)
-				insertDataToPostgres(db_params, games_table, games)
-
-			# Update players' ELO columns in the database
-		updatePlayersElo(db_params)
+		with psycopg.connect(**db_params) as connection:
+			manifest = IngestionManifest(
+				table_names.get("manifest", "ingestion_manifest"))
+			if manifest.exists(connection):
+				PGNFiles, resume = manifest.pending(connection, PGNFiles)
+				if not manifest.tracksPlayers(connection):
+					logger.warning(f"No {manifest.touched_table} table, the ELO of all "
+												 "players will be updated if a run is resumed")
+					# The players of the chunks loaded before are unknown
+					incremental_elo = incremental_elo and not resume
+			else:
+				logger.warning(f"No {manifest.table_name} table, interrupted runs "
+											 "will have to start over")
+				manifest, resume = None, None
+
+		__load_games(
+			__measure_parsing(PGNtoDataFrame(PGNFiles, chunk_size, resume=resume)),
+			db_params, table_names, player_cache, deterministic_ids, queue_size,
+			incremental_elo, manifest)
 
 		logger.info("PGN files successfully added to the database.")
 
@@ -422,9 +1178,52 @@ def addNewPGNtoDatabase(
 		logger.error(f"Error in addNewPGNtoDatabase: {e}")
 
 
+def addParquetToDatabase(
+		directory: str, db_params: dict, table_names: dict,
+		player_cache: str = None, deterministic_ids: bool = False,
+		queue_size: int = 2, chunk_size: int = 500000,
+		incremental_elo: bool = True, files: list[str] = None
+) -> None:
+	"""
+	Add the games of a Parquet store written by writeParquetStore to the
+	PostgreSQL database, without parsing the PGN files again. Only the columns
+	used by the database are read.
+	:param directory: Directory of the Parquet store.
+	:param db_params: Dictionary of database connection parameters.
+	:param table_names: Dictionary containing the table names for "players",
+	"openings" and "games" in the database.
+	:param player_cache: Path to a file keeping the player ID cache between runs
+	(optional).
+	:param deterministic_ids: Derive the player and game IDs from their natural
+	keys, see addNewPGNtoDatabase.
+	:param queue_size: Maximum number of chunks waiting between two stages.
+	:param chunk_size: Number of games per chunk.
+	:param incremental_elo: Only update the ELO of the players of the added
+	games, instead of all players.
+	:param files: Names of the PGN files to load from the store (defaults to all
+	of them).
+	"""
+	try:
+		columns = ["White", "Black", "Result", "WhiteElo", "BlackElo",
+							 "WhiteTitle", "BlackTitle", "UTCDateTime", "BaseTime",
+							 "Increment", "Opening", MOVES_COLUMN]
+		if deterministic_ids:
+			columns.append("Site")
+		__load_games(
+			__measure_parsing(readParquetStore(directory, chunk_size, columns, files),
+												"read"),
+			db_params, table_names, player_cache, deterministic_ids, queue_size,
+			incremental_elo)
+
+		logger.info("Parquet store successfully added to the database.")
+
+	except Exception as e:
+		logger.error(f"Error in addParquetToDatabase: {e}")
+
+
 def addOpeningsToDatabase(
 		openingFiles: list[str], db_params: dict,
-		table_names: dict
+		table_names: dict, deterministic_ids: bool = False
 ) -> None:
 	"""
 	Add new openings to the PostgreSQL database.
@@ -433,13 +1232,15 @@ def addOpeningsToDatabase(
 	:param db_params: Dictionary of database connection parameters.
 	:param table_names: Dictionary containing the table names for "openings" in
 	the database.
+	:param deterministic_ids: Derive the opening IDs from their name and moves.
 	"""
 	try:
 		openings_table = table_names.get("openings", "openings")
 
 		# Create DataFrame for openings and insert into PostgreSQL
-		openings = createOpeningsDataFrame(openingFiles)
-		insertDataToPostgres(db_params, openings_table, openings)
+		with measureStage("openings"):
+			openings = createOpeningsDataFrame(openingFiles, deterministic_ids)
+			insertDataToPostgres(db_params, openings_table, openings)
 
 		logger.info("Openings successfully added to the database.")
 
@@ -1,5 +1,5 @@
+import argparse
 import os
-import sys
 
 from DataCollection import *
 from json import load
@@ -8,47 +8,80 @@ from json import load
 tables = {
 	"games": "games",
 	"players": "players",
-	"openings": "openings"
+	"openings": "openings",
+	"manifest": "ingestion_manifest"
 }
 
+# Set up argument parser
+parser = argparse.ArgumentParser(
+	description="Add PGN files and lichess opening files to a postgreSQL "
+							"database."
+)
+parser.add_argument("config_files", type=str, nargs="+",
+										help="Path to the JSON configuration files (required).")
+parser.add_argument("--metrics", type=str,
+										help="Record the time, rows, bytes and memory of each stage"
+												 " and save them to this JSON file, along with a"
+												 " Prometheus textfile (.prom) next to it (optional).")
+parquet = parser.add_mutually_exclusive_group()
+parquet.add_argument("--to_parquet", type=str,
+										 help="Only parse the PGN files into a Parquet store in this"
+													" directory, partitioned by file and month, instead of"
+													" adding them to the database (optional, requires"
+													" pyarrow).")
+parquet.add_argument("--from_parquet", type=str,
+										 help="Add the games of the Parquet store in this directory to"
+													" the database instead of parsing PGN files (optional,"
+													" requires pyarrow).")
+
 if __name__ == "__main__":
+	def list_files(directory: str) -> list[str]:
+		return [os.path.join(directory, f) for f in os.listdir(directory)
+						if os.path.isfile(os.path.join(directory, f))]
+
+
 	def main():
-		args = sys.argv[1:]
-		if not args:
-			raise ValueError("Please provide a JSON file path as an argument.")
-		for arg in args:
+		args = parser.parse_args()
+		metrics = enableMetrics("DataCollection") if args.metrics else None
+		for arg in args.config_files:
 			if not os.path.isfile(arg):
 				raise ValueError(f"File {arg} does not exist.")
 			with open(arg, 'r') as file:
 				all_params = load(file)
 
-				if all_params.get("pgn_files_dir") is None:
+				if all_params.get("pgn_files_dir") is None and not args.from_parquet:
 					raise ValueError("Please provide a directory for PGN files.")
 
+				setMaxCores()
+				if args.to_parquet:
+					PGNtoParquet(list_files(all_params["pgn_files_dir"]), args.to_parquet)
+					continue
+
 				required_db_keys = ["dbname", "user", "host", "port"]
 				optional_db_keys = ["password", "sslmode", "sslkey", "sslcert",
 														"sslrootcert"]
 				db_params = validate_and_extract_params(all_params, required_db_keys,
 																								optional_db_keys)
 
-				setMaxCores()
+				deterministic_ids = bool(all_params.get("deterministic_ids", False))
 
 				if all_params.get("openings_dir"):
 
-					lichessOpeningTSVs = [os.path.join(all_params["openings_dir"], f) for
-																f in os.listdir(all_params["openings_dir"]) if
-																os.path.isfile(
-																	os.path.join(all_params["openings_dir"], f)
-																)]
-					addOpeningsToDatabase(lichessOpeningTSVs, db_params, tables)
+					lichessOpeningTSVs = list_files(all_params["openings_dir"])
+					addOpeningsToDatabase(lichessOpeningTSVs, db_params, tables,
+																deterministic_ids)
+
+				if args.from_parquet:
+					addParquetToDatabase(args.from_parquet, db_params, tables,
+															 all_params.get("player_cache"), deterministic_ids)
+					continue
 
-				PGNFiles = [os.path.join(all_params["pgn_files_dir"], f) for f in
-										os.listdir(all_params["pgn_files_dir"]) if
-										os.path.isfile(
-											os.path.join(all_params["pgn_files_dir"], f)
-										)]
+				PGNFiles = list_files(all_params["pgn_files_dir"])
+				addNewPGNtoDatabase(PGNFiles, db_params, tables,
+														all_params.get("player_cache"), deterministic_ids)
 
-				addNewPGNtoDatabase(PGNFiles, db_params, tables)
+		if metrics is not None:
+			metrics.save(args.metrics)
 
 
 	main()
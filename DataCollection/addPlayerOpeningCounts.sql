@@ -0,0 +1,196 @@
+-- Add the player_opening_counts table and its triggers to a database created
+-- before them, keeping its data. The script can be run again safely.
+-- Run in a single transaction: creating the triggers locks the games table
+-- against writes until the counts are rebuilt, so no game is counted twice or
+-- missed.
+BEGIN;
+
+-- Create the table of the number of games of each player in each opening and
+-- color, kept up to date by the triggers of the games table
+CREATE TABLE IF NOT EXISTS player_opening_counts
+(
+  player  UUID    NOT NULL,
+  color   CHAR(1) NOT NULL CHECK (color IN ('W', 'B')),
+  opening UUID    NOT NULL,
+  n       INT     NOT NULL,
+  PRIMARY KEY (color, player, opening)
+);
+
+-- Create the function adding the games inserted by a statement to the counts
+CREATE OR REPLACE FUNCTION count_inserted_player_openings()
+RETURNS trigger AS $$
+BEGIN
+    -- Rows are upserted in key order, for concurrent loads not to deadlock
+    INSERT INTO player_opening_counts (player, color, opening, n)
+    SELECT player, color, opening, COUNT(*)
+    FROM (
+        SELECT white AS player, 'W' AS color, opening
+        FROM new_games
+        WHERE opening IS NOT NULL
+
+        UNION ALL
+
+        SELECT black AS player, 'B' AS color, opening
+        FROM new_games
+        WHERE opening IS NOT NULL
+    ) AS added
+    GROUP BY color, player, opening
+    ORDER BY color, player, opening
+    ON CONFLICT (color, player, opening)
+    DO UPDATE SET n = player_opening_counts.n + excluded.n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function removing the games deleted by a statement from the counts
+CREATE OR REPLACE FUNCTION count_deleted_player_openings()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE player_opening_counts
+    SET n = player_opening_counts.n - removed.n
+    FROM (
+        SELECT player, color, opening, COUNT(*) AS n
+        FROM (
+            SELECT white AS player, 'W' AS color, opening
+            FROM old_games
+            WHERE opening IS NOT NULL
+
+            UNION ALL
+
+            SELECT black AS player, 'B' AS color, opening
+            FROM old_games
+            WHERE opening IS NOT NULL
+        ) AS deleted
+        GROUP BY color, player, opening
+    ) AS removed
+    WHERE player_opening_counts.color = removed.color
+      AND player_opening_counts.player = removed.player
+      AND player_opening_counts.opening = removed.opening;
+
+    DELETE FROM player_opening_counts WHERE n <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function rebuilding the counts from the games table
+CREATE OR REPLACE FUNCTION refresh_player_opening_counts()
+RETURNS void AS $$
+BEGIN
+    TRUNCATE player_opening_counts;
+    INSERT INTO player_opening_counts (player, color, opening, n)
+    SELECT player, color, opening, COUNT(*)
+    FROM (
+        SELECT white AS player, 'W' AS color, opening
+        FROM games
+        WHERE opening IS NOT NULL
+
+        UNION ALL
+
+        SELECT black AS player, 'B' AS color, opening
+        FROM games
+        WHERE opening IS NOT NULL
+    ) AS played
+    GROUP BY color, player, opening;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function moving the games updated by a statement in the counts,
+-- only the games whose players or opening changed being counted again
+CREATE OR REPLACE FUNCTION count_updated_player_openings()
+RETURNS trigger AS $$
+BEGIN
+    WITH changed AS (
+        SELECT white, black, opening FROM old_games
+        EXCEPT ALL
+        SELECT white, black, opening FROM new_games
+    )
+    UPDATE player_opening_counts
+    SET n = player_opening_counts.n - removed.n
+    FROM (
+        SELECT player, color, opening, COUNT(*) AS n
+        FROM (
+            SELECT white AS player, 'W' AS color, opening
+            FROM changed
+            WHERE opening IS NOT NULL
+
+            UNION ALL
+
+            SELECT black AS player, 'B' AS color, opening
+            FROM changed
+            WHERE opening IS NOT NULL
+        ) AS deleted
+        GROUP BY color, player, opening
+    ) AS removed
+    WHERE player_opening_counts.color = removed.color
+      AND player_opening_counts.player = removed.player
+      AND player_opening_counts.opening = removed.opening;
+
+    DELETE FROM player_opening_counts WHERE n <= 0;
+
+    WITH changed AS (
+        SELECT white, black, opening FROM new_games
+        EXCEPT ALL
+        SELECT white, black, opening FROM old_games
+    )
+    INSERT INTO player_opening_counts (player, color, opening, n)
+    SELECT player, color, opening, COUNT(*)
+    FROM (
+        SELECT white AS player, 'W' AS color, opening
+        FROM changed
+        WHERE opening IS NOT NULL
+
+        UNION ALL
+
+        SELECT black AS player, 'B' AS color, opening
+        FROM changed
+        WHERE opening IS NOT NULL
+    ) AS added
+    GROUP BY color, player, opening
+    ORDER BY color, player, opening
+    ON CONFLICT (color, player, opening)
+    DO UPDATE SET n = player_opening_counts.n + excluded.n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function emptying the counts when the games table is truncated
+CREATE OR REPLACE FUNCTION clear_player_opening_counts()
+RETURNS trigger AS $$
+BEGIN
+    TRUNCATE player_opening_counts;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Update the counts once per statement, with the rows it inserted, updated or
+-- deleted
+DROP TRIGGER IF EXISTS games_count_inserted_player_openings ON games;
+CREATE TRIGGER games_count_inserted_player_openings
+AFTER INSERT ON games
+REFERENCING NEW TABLE AS new_games
+FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_player_openings();
+
+DROP TRIGGER IF EXISTS games_count_deleted_player_openings ON games;
+CREATE TRIGGER games_count_deleted_player_openings
+AFTER DELETE ON games
+REFERENCING OLD TABLE AS old_games
+FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_player_openings();
+
+DROP TRIGGER IF EXISTS games_count_updated_player_openings ON games;
+CREATE TRIGGER games_count_updated_player_openings
+AFTER UPDATE ON games
+REFERENCING OLD TABLE AS old_games NEW TABLE AS new_games
+FOR EACH STATEMENT EXECUTE FUNCTION count_updated_player_openings();
+
+DROP TRIGGER IF EXISTS games_clear_player_opening_counts ON games;
+CREATE TRIGGER games_clear_player_opening_counts
+AFTER TRUNCATE ON games
+FOR EACH STATEMENT EXECUTE FUNCTION clear_player_opening_counts();
+
+-- Count the games already in the table
+SELECT refresh_player_opening_counts();
+
+COMMIT;
+
+ALTER TABLE player_opening_counts
+  OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
@@ -1,7 +1,10 @@
 -- Reset already existing tables
+DROP TABLE IF EXISTS player_opening_counts;
 DROP TABLE IF EXISTS games;
 DROP TABLE IF EXISTS players;
 DROP TABLE IF EXISTS openings;
+DROP TABLE IF EXISTS ingestion_manifest;
+DROP TABLE IF EXISTS touched_players;
 
 -- Create the players table
 CREATE TABLE IF NOT EXISTS players
@@ -39,6 +42,42 @@ CREATE TABLE IF NOT EXISTS games
   UNIQUE (white, black, date_time)
 );
 
+-- Index the games of the black players (white players use the unique index)
+CREATE INDEX IF NOT EXISTS games_black_date_time_idx ON games (black, date_time);
+
+-- Create the table of the number of games of each player in each opening and
+-- color, kept up to date by the triggers of the games table
+CREATE TABLE IF NOT EXISTS player_opening_counts
+(
+  player  UUID    NOT NULL,
+  color   CHAR(1) NOT NULL CHECK (color IN ('W', 'B')),
+  opening UUID    NOT NULL,
+  n       INT     NOT NULL,
+  PRIMARY KEY (color, player, opening)
+);
+
+-- Create the ingestion manifest table (progress of the loaded PGN files)
+CREATE TABLE IF NOT EXISTS ingestion_manifest
+(
+  path         TEXT      NOT NULL,
+  size         BIGINT    NOT NULL,
+  hash         CHAR(32)  NOT NULL,
+  games        BIGINT    NOT NULL DEFAULT 0,
+  byte_offset  BIGINT    NOT NULL DEFAULT 0,
+  offset_games BIGINT    NOT NULL DEFAULT 0,
+  chunks       INT       NOT NULL DEFAULT 0,
+  completed    BOOLEAN   NOT NULL DEFAULT FALSE,
+  updated_at   TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (path, size, hash)
+);
+
+-- Create the table of the players of the loaded games whose ELO is left to
+-- update, filled along with the manifest
+CREATE TABLE IF NOT EXISTS touched_players
+(
+  id UUID PRIMARY KEY
+);
+
 -- Create the function to update the max_elo field in the players table
 CREATE OR REPLACE FUNCTION update_players_max_elo()
 RETURNS void AS $$
@@ -104,9 +143,233 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Create the function to update the max_elo field of a set of players only
+CREATE OR REPLACE FUNCTION update_players_max_elo(player_ids UUID[])
+RETURNS void AS $$
+BEGIN
+    UPDATE players
+    SET max_elo = subquery.max_elo
+    FROM (
+        SELECT id, MAX(elo) AS max_elo
+        FROM (
+            SELECT white AS id, white_elo AS elo
+            FROM games
+            WHERE white = ANY (player_ids)
+
+            UNION ALL
+
+            SELECT black AS id, black_elo AS elo
+            FROM games
+            WHERE black = ANY (player_ids)
+        ) AS combined
+        GROUP BY id
+    ) AS subquery
+    WHERE players.id = subquery.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function to update the current_elo field of a set of players only
+CREATE OR REPLACE FUNCTION update_players_current_elo(player_ids UUID[])
+RETURNS void AS $$
+BEGIN
+    UPDATE players
+    SET current_elo = latest.elo
+    FROM (
+        SELECT DISTINCT ON (id) id, elo
+        FROM (
+            SELECT white AS id, white_elo AS elo, date_time
+            FROM games
+            WHERE white = ANY (player_ids) AND date_time IS NOT NULL
+
+            UNION ALL
+
+            SELECT black AS id, black_elo AS elo, date_time
+            FROM games
+            WHERE black = ANY (player_ids) AND date_time IS NOT NULL
+        ) AS combined
+        ORDER BY id, date_time DESC
+    ) AS latest
+    WHERE players.id = latest.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function adding the games inserted by a statement to the counts
+CREATE OR REPLACE FUNCTION count_inserted_player_openings()
+RETURNS trigger AS $$
+BEGIN
+    -- Rows are upserted in key order, for concurrent loads not to deadlock
+    INSERT INTO player_opening_counts (player, color, opening, n)
+    SELECT player, color, opening, COUNT(*)
+    FROM (
+        SELECT white AS player, 'W' AS color, opening
+        FROM new_games
+        WHERE opening IS NOT NULL
+
+        UNION ALL
+
+        SELECT black AS player, 'B' AS color, opening
+        FROM new_games
+        WHERE opening IS NOT NULL
+    ) AS added
+    GROUP BY color, player, opening
+    ORDER BY color, player, opening
+    ON CONFLICT (color, player, opening)
+    DO UPDATE SET n = player_opening_counts.n + excluded.n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function removing the games deleted by a statement from the counts
+CREATE OR REPLACE FUNCTION count_deleted_player_openings()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE player_opening_counts
+    SET n = player_opening_counts.n - removed.n
+    FROM (
+        SELECT player, color, opening, COUNT(*) AS n
+        FROM (
+            SELECT white AS player, 'W' AS color, opening
+            FROM old_games
+            WHERE opening IS NOT NULL
+
+            UNION ALL
+
+            SELECT black AS player, 'B' AS color, opening
+            FROM old_games
+            WHERE opening IS NOT NULL
+        ) AS deleted
+        GROUP BY color, player, opening
+    ) AS removed
+    WHERE player_opening_counts.color = removed.color
+      AND player_opening_counts.player = removed.player
+      AND player_opening_counts.opening = removed.opening;
+
+    DELETE FROM player_opening_counts WHERE n <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function moving the games updated by a statement in the counts,
+-- only the games whose players or opening changed being counted again
+CREATE OR REPLACE FUNCTION count_updated_player_openings()
+RETURNS trigger AS $$
+BEGIN
+    WITH changed AS (
+        SELECT white, black, opening FROM old_games
+        EXCEPT ALL
+        SELECT white, black, opening FROM new_games
+    )
+    UPDATE player_opening_counts
+    SET n = player_opening_counts.n - removed.n
+    FROM (
+        SELECT player, color, opening, COUNT(*) AS n
+        FROM (
+            SELECT white AS player, 'W' AS color, opening
+            FROM changed
+            WHERE opening IS NOT NULL
+
+            UNION ALL
+
+            SELECT black AS player, 'B' AS color, opening
+            FROM changed
+            WHERE opening IS NOT NULL
+        ) AS deleted
+        GROUP BY color, player, opening
+    ) AS removed
+    WHERE player_opening_counts.color = removed.color
+      AND player_opening_counts.player = removed.player
+      AND player_opening_counts.opening = removed.opening;
+
+    DELETE FROM player_opening_counts WHERE n <= 0;
+
+    WITH changed AS (
+        SELECT white, black, opening FROM new_games
+        EXCEPT ALL
+        SELECT white, black, opening FROM old_games
+    )
+    INSERT INTO player_opening_counts (player, color, opening, n)
+    SELECT player, color, opening, COUNT(*)
+    FROM (
+        SELECT white AS player, 'W' AS color, opening
+        FROM changed
+        WHERE opening IS NOT NULL
+
+        UNION ALL
+
+        SELECT black AS player, 'B' AS color, opening
+        FROM changed
+        WHERE opening IS NOT NULL
+    ) AS added
+    GROUP BY color, player, opening
+    ORDER BY color, player, opening
+    ON CONFLICT (color, player, opening)
+    DO UPDATE SET n = player_opening_counts.n + excluded.n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the function emptying the counts when the games table is truncated
+CREATE OR REPLACE FUNCTION clear_player_opening_counts()
+RETURNS trigger AS $$
+BEGIN
+    TRUNCATE player_opening_counts;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Update the counts once per statement, with the rows it inserted, updated or
+-- deleted
+CREATE TRIGGER games_count_inserted_player_openings
+AFTER INSERT ON games
+REFERENCING NEW TABLE AS new_games
+FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_player_openings();
+
+CREATE TRIGGER games_count_deleted_player_openings
+AFTER DELETE ON games
+REFERENCING OLD TABLE AS old_games
+FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_player_openings();
+
+CREATE TRIGGER games_count_updated_player_openings
+AFTER UPDATE ON games
+REFERENCING OLD TABLE AS old_games NEW TABLE AS new_games
+FOR EACH STATEMENT EXECUTE FUNCTION count_updated_player_openings();
+
+CREATE TRIGGER games_clear_player_opening_counts
+AFTER TRUNCATE ON games
+FOR EACH STATEMENT EXECUTE FUNCTION clear_player_opening_counts();
+
+-- Create the function rebuilding the counts from the games table (e.g. after
+-- adding the table to an existing database)
+CREATE OR REPLACE FUNCTION refresh_player_opening_counts()
+RETURNS void AS $$
+BEGIN
+    TRUNCATE player_opening_counts;
+    INSERT INTO player_opening_counts (player, color, opening, n)
+    SELECT player, color, opening, COUNT(*)
+    FROM (
+        SELECT white AS player, 'W' AS color, opening
+        FROM games
+        WHERE opening IS NOT NULL
+
+        UNION ALL
+
+        SELECT black AS player, 'B' AS color, opening
+        FROM games
+        WHERE opening IS NOT NULL
+    ) AS played
+    GROUP BY color, player, opening;
+END;
+$$ LANGUAGE plpgsql;
+
 ALTER TABLE players
   OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
 ALTER TABLE openings
   OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
 ALTER TABLE games
+  OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
+ALTER TABLE ingestion_manifest
+  OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
+ALTER TABLE player_opening_counts
+  OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
+ALTER TABLE touched_players
   OWNER TO SVCollaborator; -- Don't run this if you're creating the tables locally
\ No newline at end of file
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+
+import psycopg
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 1024 * 1024  # Bytes hashed at the start, middle and end of files
+
+
+def fileFingerprint(file: str) -> tuple[int, str]:
+	"""
+	Identify the content of a file without reading it whole, by hashing its size
+	along with samples of its start, middle and end.
+	:param file: Path to the file.
+	:return: Size of the file and hexadecimal hash of the samples.
+	"""
+	size = os.path.getsize(file)
+	digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+	with open(file, "rb") as f:
+		for offset in sorted({0, max(size // 2 - SAMPLE_SIZE // 2, 0),
+													max(size - SAMPLE_SIZE, 0)}):
+			f.seek(offset)
+			digest.update(f.read(SAMPLE_SIZE))
+	return size, digest.hexdigest()
+
+
+class IngestionManifest:
+	"""
+	Progress of the ingestion of the PGN files, kept in a table of the database.
+	Each file is identified by its path, size and content hash, and its row holds
+	the number of games and chunks committed along with the position to resume
+	parsing from. Rows are updated in the transaction loading each chunk, so that
+	a run interrupted at any point resumes after the last committed chunk.
+	The players of the loaded games are recorded in a second table in the same
+	transaction, until their ELO is updated, so that the players of the chunks
+	committed by an interrupted run are updated by the run resuming it.
+	"""
+
+	def __init__(self, table_name: str = "ingestion_manifest",
+							 touched_table: str = "touched_players"):
+		"""
+		:param table_name: Name of the manifest table.
+		:param touched_table: Name of the table of the players whose ELO is left to
+		update.
+		"""
+		self.table_name = table_name
+		self.touched_table = touched_table
+		self.__fingerprints = {}
+		self.__tracking = False
+
+	def exists(self, connection: psycopg.Connection) -> bool:
+		"""
+		Check whether the manifest table exists in the database.
+		:param connection: Connection to the PostgreSQL database.
+		:return: True if the table exists.
+		"""
+		return connection.execute("select to_regclass(%s) is not null",
+															(self.table_name,)).fetchone()[0]
+
+	def tracksPlayers(self, connection: psycopg.Connection) -> bool:
+		"""
+		Check whether the table of the touched players exists in the database, the
+		players being recorded by touch only if it does.
+		:param connection: Connection to the PostgreSQL database.
+		:return: True if the table exists.
+		"""
+		self.__tracking = connection.execute("select to_regclass(%s) is not null",
+																				 (self.touched_table,)).fetchone()[0]
+		return self.__tracking
+
+	@property
+	def tracking(self) -> bool:
+		"""
+		Whether the players are recorded by touch, as found by the last call to
+		tracksPlayers (False before it).
+		"""
+		return self.__tracking
+
+	def pending(
+			self, connection: psycopg.Connection, files: list[str]
+	) -> tuple[list[str], dict[str, tuple[int, int, int]]]:
+		"""
+		Find the files left to load and where to resume them from.
+		:param connection: Connection to the PostgreSQL database.
+		:param files: Paths to the PGN files.
+		:return: Paths of the files not completely loaded yet, and the positions to
+		resume the partially loaded ones from, as expected by readPGNFiles.
+		"""
+		self.__fingerprints = {file: fileFingerprint(file) for file in files
+													 if os.path.isfile(file)}
+		query = psycopg.sql.SQL(
+			"select path, size, hash, byte_offset, offset_games, games, completed "
+			"from {manifest_table} where path = any(%s)").format(
+			manifest_table=psycopg.sql.Identifier(self.table_name))
+		rows = connection.execute(
+			query, ([os.path.abspath(file) for file in self.__fingerprints],)
+		).fetchall()
+		progress = {(path, size, hash_): (byte_offset, offset_games, games, completed)
+								for path, size, hash_, byte_offset, offset_games, games, completed
+								in rows}
+
+		remaining, resume = [], {}
+		for file in files:
+			if file not in self.__fingerprints:
+				remaining.append(file)  # Reported as missing by the parser
+				continue
+			state = progress.get((os.path.abspath(file), *self.__fingerprints[file]))
+			if state is None:
+				remaining.append(file)
+			elif state[3]:
+				logger.info(f"Skipping {file}, already loaded ({state[2]} games)")
+			else:
+				logger.info(f"Resuming {file} after {state[2]} games")
+				remaining.append(file)
+				resume[file] = state[:3]
+		return remaining, resume
+
+	def checkpoint(self, connection: psycopg.Connection, position: dict) -> None:
+		"""
+		Record that a chunk of a file has been loaded, in the current transaction.
+		:param connection: Connection to the PostgreSQL database.
+		:param position: Position reached in the file, as found in the attrs of the
+		DataFrames yielded by readPGNFiles.
+		"""
+		file = position["file"]
+		size, hash_ = self.__fingerprints.get(file) or fileFingerprint(file)
+		query = psycopg.sql.SQL(
+			"insert into {manifest_table} (path, size, hash, games, byte_offset, "
+			"offset_games, chunks, completed, updated_at) "
+			"values (%s, %s, %s, %s, %s, %s, 1, %s, now()) "
+			"on conflict (path, size, hash) do update set games = excluded.games, "
+			"byte_offset = excluded.byte_offset, "
+			"offset_games = excluded.offset_games, "
+			"chunks = {manifest_table}.chunks + 1, completed = excluded.completed, "
+			"updated_at = excluded.updated_at").format(
+			manifest_table=psycopg.sql.Identifier(self.table_name))
+		connection.execute(query, (os.path.abspath(file), size, hash_,
+															 position["games"], position["byte_offset"],
+															 position["offset_games"], position["completed"]))
+
+	def touch(self, connection: psycopg.Connection, player_ids: list) -> None:
+		"""
+		Record the players of a chunk, in the current transaction.
+		:param connection: Connection to the PostgreSQL database.
+		:param player_ids: IDs of the players of the games of the chunk.
+		"""
+		if not self.__tracking or not len(player_ids):
+			return
+		query = psycopg.sql.SQL(
+			"insert into {touched_table} (id) select unnest(%s::uuid[]) "
+			"on conflict do nothing").format(
+			touched_table=psycopg.sql.Identifier(self.touched_table))
+		connection.execute(query, ([str(player_id) for player_id in player_ids],))
+
+	def touched(self, connection: psycopg.Connection) -> list[str]:
+		"""
+		Get the players whose ELO is left to update, from this run or from
+		interrupted ones.
+		:param connection: Connection to the PostgreSQL database.
+		:return: IDs of the players.
+		"""
+		if not self.__tracking:
+			return []
+		query = psycopg.sql.SQL("select id::text from {touched_table}").format(
+			touched_table=psycopg.sql.Identifier(self.touched_table))
+		return [row[0] for row in connection.execute(query).fetchall()]
+
+	def release(self, connection: psycopg.Connection, player_ids: list) -> None:
+		"""
+		Forget players whose ELO has been updated.
+		:param connection: Connection to the PostgreSQL database.
+		:param player_ids: IDs of the players.
+		"""
+		if not self.__tracking or not len(player_ids):
+			return
+		query = psycopg.sql.SQL(
+			"delete from {touched_table} where id = any(%s::uuid[])").format(
+			touched_table=psycopg.sql.Identifier(self.touched_table))
+		connection.execute(query, (list(player_ids),))
@@ -0,0 +1,260 @@
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Counters of a stage, added to by the code running in it
+COUNTERS = ["rows_in", "rows_out", "bytes_read", "ipc_bytes", "shared_bytes",
+						"worker_cpu_seconds"]
+
+# Metrics of the current run, None when disabled
+current_run = None
+
+
+class RunMetrics:
+	"""
+	Measurements of a run, stage by stage and chunk by chunk: wall time, CPU
+	time of the thread running the stage and of the tasks it ran in worker
+	processes or threads, rows in and out, bytes read, bytes sent to or received
+	from worker processes (IPC) or shared with them, and memory.
+	Stages may run in different threads (pipelines), each thread adding to the
+	counters of the stage it is running.
+	"""
+
+	def __init__(self, name: str):
+		"""
+		:param name: Name of the run (e.g. the module), used as a label.
+		"""
+		self.name = name
+		self.records = []
+		self.started = time.time()
+		self.__lock = threading.Lock()
+		self.__local = threading.local()
+
+	@staticmethod
+	def __rss_bytes() -> int | None:
+		"""
+		Get the current resident memory of the process.
+		:return: Resident memory in bytes, None where /proc is not available.
+		"""
+		try:
+			with open("/proc/self/statm", "r") as f:
+				return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+		except (OSError, ValueError, IndexError):
+			return None
+
+	@staticmethod
+	def __peak_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+		"""
+		Get the peak resident memory of the process or of its terminated children.
+		:param who: resource.RUSAGE_SELF or resource.RUSAGE_CHILDREN.
+		:return: Peak resident memory in bytes.
+		"""
+		return resource.getrusage(who).ru_maxrss * 1024  # Kilobytes on Linux
+
+	@contextmanager
+	def stage(self, name: str, chunk: int | str = None) -> Iterator[dict]:
+		"""
+		Measure a stage, or a chunk of a stage.
+		:param name: Name of the stage.
+		:param chunk: Chunk processed by the stage (optional).
+		:return: Dictionary of the counters of the stage, see COUNTERS.
+		"""
+		counters = dict.fromkeys(COUNTERS, 0)
+		stack = self.__local.__dict__.setdefault("stack", [])
+		stack.append(counters)
+		wall, cpu = time.perf_counter(), time.thread_time()
+		try:
+			yield counters
+		finally:
+			wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+			stack.pop()
+			record = {"stage": name, "chunk": chunk, "seconds": wall,
+								"cpu_seconds": cpu, **counters,
+								"rss_bytes": self.__rss_bytes(),
+								"peak_rss_bytes": self.__peak_rss_bytes()}
+			with self.__lock:
+				self.records.append(record)
+
+	def add(self, **counters: int) -> None:
+		"""
+		Add to the counters of the stage running in the current thread.
+		:param counters: Values to add, by counter name (see COUNTERS).
+		"""
+		stack = self.__local.__dict__.get("stack")
+		if stack:
+			for key, value in counters.items():
+				stack[-1][key] += value if isinstance(value, float) else int(value)
+
+	def summary(self) -> dict[str, dict]:
+		"""
+		Aggregate the records by stage.
+		:return: Totals of each stage, with its number of calls and throughput.
+		"""
+		stages = {}
+		with self.__lock:
+			records = list(self.records)
+		for record in records:
+			stage = stages.setdefault(record["stage"], {
+				"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0,
+				**dict.fromkeys(COUNTERS, 0), "peak_rss_bytes": 0})
+			stage["calls"] += 1
+			for key in ["seconds", "cpu_seconds", *COUNTERS]:
+				stage[key] += record[key]
+			stage["peak_rss_bytes"] = max(stage["peak_rss_bytes"],
+																		record["peak_rss_bytes"])
+		for stage in stages.values():
+			stage["rows_per_second"] = (stage["rows_out"] / stage["seconds"]
+																	if stage["seconds"] else None)
+		return stages
+
+	def toDict(self) -> dict:
+		"""
+		Build the run report.
+		:return: JSON-serializable report with the stage totals and the records.
+		"""
+		return {
+			"run": self.name,
+			"started": time.strftime("%Y-%m-%dT%H:%M:%S%z",
+															 time.localtime(self.started)),
+			"seconds": time.time() - self.started,
+			"peak_rss_bytes": self.__peak_rss_bytes(),
+			"peak_children_rss_bytes": self.__peak_rss_bytes(
+				resource.RUSAGE_CHILDREN),
+			"stages": self.summary(),
+			"records": list(self.records)
+		}
+
+	def toPrometheus(self) -> str:
+		"""
+		Format the stage totals in the Prometheus text exposition format.
+		:return: Content of a textfile for the node exporter.
+		"""
+		lines = []
+		stages = self.summary()
+
+		def metric(name: str, kind: str, description: str,
+							 samples: Iterable[tuple[str, float]]) -> None:
+			lines.append(f"# HELP analyzers_{name} {description}")
+			lines.append(f"# TYPE analyzers_{name} {kind}")
+			lines.extend(f"analyzers_{name}{{{labels}}} {value}"
+									 for labels, value in samples)
+
+		def per_stage(key: str) -> list[tuple[str, float]]:
+			return [(f'run="{self.name}",stage="{stage}"', values[key])
+							for stage, values in stages.items()]
+
+		metric("stage_calls_total", "counter", "Number of runs of the stage.",
+					 per_stage("calls"))
+		metric("stage_seconds_total", "counter", "Wall time spent in the stage.",
+					 per_stage("seconds"))
+		metric("stage_cpu_seconds_total", "counter",
+					 "CPU time of the thread running the stage, without its workers.",
+					 per_stage("cpu_seconds"))
+		for key in COUNTERS:
+			metric(f"stage_{key}_total", "counter",
+						 f"{key.replace('_', ' ').capitalize()} of the stage.",
+						 per_stage(key))
+		metric("peak_rss_bytes", "gauge", "Peak resident memory of the process.",
+					 [(f'run="{self.name}"', self.__peak_rss_bytes())])
+		metric("run_seconds", "gauge", "Duration of the run.",
+					 [(f'run="{self.name}"', time.time() - self.started)])
+		return "\n".join(lines) + "\n"
+
+	def save(self, path: str) -> None:
+		"""
+		Save the run report as JSON and the stage totals as a Prometheus textfile
+		next to it (same path with the .prom extension).
+		:param path: Path to the JSON report.
+		"""
+		with open(path, "w") as f:
+			json.dump(self.toDict(), f, indent=2)
+
+		textfile = os.path.splitext(path)[0] + ".prom"
+		# Written aside and renamed, for the exporter never to read a partial file
+		with open(f"{textfile}.tmp", "w") as f:
+			f.write(self.toPrometheus())
+		os.replace(f"{textfile}.tmp", textfile)
+		logger.info(f"Metrics saved to {path} and {textfile}")
+
+
+def enableMetrics(name: str) -> RunMetrics:
+	"""
+	Start recording the metrics of a run.
+	:param name: Name of the run.
+	:return: Metrics of the run.
+	"""
+	global current_run
+	current_run = RunMetrics(name)
+	return current_run
+
+
+def getMetrics() -> RunMetrics | None:
+	"""
+	Get the metrics of the current run.
+	:return: Metrics of the run, None when metrics are disabled.
+	"""
+	return current_run
+
+
+@contextmanager
+def measureStage(name: str, chunk: int | str = None) -> Iterator[dict]:
+	"""
+	Measure a stage in the current run, does nothing when metrics are disabled.
+	:param name: Name of the stage.
+	:param chunk: Chunk processed by the stage (optional).
+	:return: Dictionary of the counters of the stage, see COUNTERS.
+	"""
+	if current_run is None:
+		yield dict.fromkeys(COUNTERS, 0)
+	else:
+		with current_run.stage(name, chunk) as counters:
+			yield counters
+
+
+def addMetrics(**counters: int) -> None:
+	"""
+	Add to the counters of the stage running in the current thread, does nothing
+	when metrics are disabled.
+	:param counters: Values to add, by counter name (see COUNTERS).
+	"""
+	if current_run is not None:
+		current_run.add(**counters)
+
+
+def timedCall(function: Callable, *args) -> tuple[Any, float]:
+	"""
+	Call a function in a worker, measuring its CPU time: the CPU time of the
+	worker process, or of the thread in the main process (thread pools). Submit
+	it in place of the function and pass the results to collectTimes.
+	:param function: Function of the task.
+	:param args: Arguments of the function.
+	:return: Result of the function and CPU seconds it took.
+	"""
+	clock = time.thread_time if multiprocessing.parent_process() is None \
+		else time.process_time
+	start = clock()
+	result = function(*args)
+	return result, clock() - start
+
+
+def collectTimes(results: Iterable[tuple[Any, float]]) -> Iterator[Any]:
+	"""
+	Add the CPU time of tasks run with timedCall to the stage consuming their
+	results.
+	:param results: Results of timedCall.
+	:return: Iterator over the results of the functions.
+	"""
+	for result, seconds in results:
+		addMetrics(worker_cpu_seconds=seconds)
+		yield result
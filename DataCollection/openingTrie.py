@@ -0,0 +1,96 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from DataCollection.readPGN import splitMoves
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class OpeningTrie:
+	"""
+	Trie of the move sequences of the openings, classifying games by the deepest
+	opening their first moves go through. The trie is stored as flat arrays: the
+	edges are sorted by key (parent node * number of moves + move code), so that
+	following a move is a binary search, done for a whole chunk of games at once.
+	"""
+
+	def __init__(self, openings: pd.DataFrame):
+		"""
+		:param openings: DataFrame of the openings, with their moves in a "pgn"
+		column (e.g. "1. e4 c5 2. Nf3"). Among openings with the same moves, the
+		last one is kept.
+		"""
+		lines = [splitMoves(pgn, len(pgn)) if isinstance(pgn, str) else []
+						 for pgn in openings["pgn"]]
+		self.moves = pd.Index(pd.unique(
+			np.array([move for line in lines for move in line], dtype=object)))
+
+		# Nodes are numbered in order of creation, the root being 0
+		edges = {}
+		node_opening = [-1]
+		for position, line in enumerate(lines):
+			node = 0
+			for code in self.moves.get_indexer(line):
+				child = edges.get((node, code))
+				if child is None:
+					child = edges[(node, code)] = len(node_opening)
+					node_opening.append(-1)
+				node = child
+			if node:
+				node_opening[node] = position
+
+		keys = np.fromiter((node * len(self.moves) + code for node, code in edges),
+											 dtype=np.int64, count=len(edges))
+		order = np.argsort(keys)
+		self.keys = keys[order]
+		self.children = np.fromiter(edges.values(), dtype=np.int32,
+																count=len(edges))[order]
+		self.nodeOpening = np.array(node_opening, dtype=np.int32)
+		self.depth = max(map(len, lines), default=0)
+		logger.info(f"Built the opening trie: {len(node_opening)} nodes, "
+								f"{len(self.moves)} distinct moves, depth {self.depth}")
+
+	def classify(self, moves: pd.Series) -> np.ndarray:
+		"""
+		Find the deepest opening the moves of each game go through. Each game is
+		read once, one move further at each step, and leaves the search on its
+		first move out of the trie.
+		:param moves: Space separated moves of the games, in SAN (e.g. "e4 c5").
+		:return: Position in the openings DataFrame of the opening of each game,
+		-1 for games matching no opening.
+		"""
+		openings = np.full(len(moves), -1, dtype=np.int32)
+		if not len(self.keys):
+			return openings
+
+		# Moves beyond the depth of the trie are never looked at
+		lines = [line.split(" ", self.depth)[:self.depth] if line else []
+						 for line in moves.fillna("")]
+		lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+		starts = np.cumsum(lengths) - lengths
+		codes = self.moves.get_indexer(pd.Index(
+			[move for line in lines for move in line], dtype=object))
+
+		games = np.flatnonzero(lengths)
+		nodes = np.zeros(len(games), dtype=np.int64)
+		for ply in range(self.depth):
+			move_codes = codes[starts[games] + ply]
+			keys = nodes * len(self.moves) + move_codes
+			positions = np.minimum(np.searchsorted(self.keys, keys),
+														 len(self.keys) - 1)
+			found = (move_codes >= 0) & (self.keys[positions] == keys)
+
+			games, nodes = games[found], self.children[positions[found]]
+			named = self.nodeOpening[nodes]
+			openings[games[named >= 0]] = named[named >= 0]
+			going_on = lengths[games] > ply + 1
+			games, nodes = games[going_on], nodes[going_on]
+			if not len(games):
+				break
+
+		return openings
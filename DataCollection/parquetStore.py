@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from DataCollection.readPGN import orderedResults, readPGNFiles, rechunk
+
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+UNKNOWN_MONTH = "unknown"  # Partition of the games without a valid date
+SOURCE_FILE = "_source.json"  # Name and path of the PGN file of a partition
+
+
+def __require_pyarrow() -> None:
+	"""
+	Check that the optional pyarrow package is installed.
+	"""
+	if pyarrow is None:
+		raise ImportError("The pyarrow package is required to use Parquet files")
+
+
+def __partition_key(file: str) -> str:
+	"""
+	Identify the partition of a PGN file by a hash of its absolute path, for files
+	of the same name in different directories not to overwrite each other.
+	:param file: Path to the PGN file.
+	:return: Hexadecimal key of the partition.
+	"""
+	return hashlib.blake2b(os.path.abspath(file).encode(),
+												 digest_size=8).hexdigest()
+
+
+def __read_source(path: str) -> dict:
+	"""
+	Read the name and path of the PGN file of a partition.
+	:param path: Directory of the partition.
+	:return: Dictionary with the "name" and "path" of the file.
+	"""
+	try:
+		with open(os.path.join(path, SOURCE_FILE), "r") as f:
+			return json.load(f)
+	except FileNotFoundError:
+		# Partitions of older stores are named after the file
+		return {"name": os.path.basename(path)[len("file="):]}
+	except (OSError, ValueError) as e:
+		logger.error(f"Error reading the source of the partition {path}: {e}")
+		return {}
+
+
+def __write_partitions(
+		chunk: pd.DataFrame, directory: str, index: int, compression: str
+) -> int:
+	"""
+	Write a chunk of games to the monthly partitions of its file.
+	:param chunk: Compact DataFrame of games.
+	:param directory: Directory of the partitions of the file.
+	:param index: Index of the chunk in the file, naming its part files.
+	:param compression: Compression codec of the Parquet files.
+	:return: Number of games written.
+	"""
+	dates = pd.DatetimeIndex(chunk["UTCDateTime"])
+	# Years and months are floats when some dates are missing (NaN)
+	months = np.where(dates.isna(), -1,
+										dates.year.fillna(0) * 100 + dates.month.fillna(0)
+										).astype(np.int64)
+	for month in np.unique(months):
+		part = chunk[months == month]
+		# The categories of other months are dropped from the dictionaries
+		part = part.assign(**{
+			column: part[column].cat.remove_unused_categories()
+			for column, dtype in part.dtypes.items()
+			if isinstance(dtype, pd.CategoricalDtype)})
+		name = UNKNOWN_MONTH if month < 0 else f"{month // 100}-{month % 100:02d}"
+		path = os.path.join(directory, f"month={name}")
+		os.makedirs(path, exist_ok=True)
+		pyarrow.parquet.write_table(
+			pyarrow.Table.from_pandas(part, preserve_index=False),
+			os.path.join(path, f"part-{index:05d}.parquet"),
+			compression=compression)
+	return len(chunk)
+
+
+def writeParquetStore(
+		files: list[str], directory: str, chunk_size: int, max_workers: int,
+		compression: str = "zstd"
+) -> int:
+	"""
+	Parse PGN files once into a store of Parquet files in the compact schema of
+	the parser, partitioned by PGN file and by month of the games
+	(<directory>/file=<key>/month=<YYYY-MM>/part-<chunk>.parquet), the key being
+	a hash of the absolute path of the file, whose name and path are kept in the
+	_source.json of its partition. Files are parsed in parallel and their chunks
+	written by a pool of threads. The partitions of a file are replaced when it
+	is converted again.
+	:param files: List of paths to the PGN files, plain or compressed.
+	:param directory: Directory of the Parquet store.
+	:param chunk_size: Number of games per chunk.
+	:param max_workers: Number of parser processes and writer threads.
+	:param compression: Compression codec of the Parquet files.
+	:return: Number of games written.
+	"""
+	__require_pyarrow()
+	written = 0
+	index = 0
+	current = None
+
+	def tasks() -> Iterator[tuple]:
+		nonlocal index, current
+		for chunk in readPGNFiles(files, chunk_size, max_workers):
+			file = chunk.attrs["file"]
+			path = os.path.join(directory, f"file={__partition_key(file)}")
+			if file != current:
+				current, index = file, 0
+				shutil.rmtree(path, ignore_errors=True)
+				os.makedirs(path)
+				with open(os.path.join(path, SOURCE_FILE), "w") as f:
+					json.dump({"name": os.path.basename(file),
+										 "path": os.path.abspath(file)}, f)
+			yield chunk, path, index, compression
+			index += 1
+
+	with ThreadPoolExecutor(max_workers=max_workers) as executor:
+		for count in orderedResults(executor, __write_partitions, tasks(),
+																max_workers * 2):
+			written += count
+
+	logger.info(f"Wrote {written} games to the Parquet store {directory}")
+	return written
+
+
+def readParquetStore(
+		directory: str, chunk_size: int, columns: list[str] = None,
+		files: list[str] = None
+) -> Iterator[pd.DataFrame]:
+	"""
+	Read the games of a Parquet store written by writeParquetStore, in the
+	compact schema of the parser. The Parquet files are memory-mapped and only
+	the requested columns are read.
+	:param directory: Directory of the Parquet store.
+	:param chunk_size: Maximum number of games per DataFrame.
+	:param columns: Columns to read (defaults to all of them), the columns
+	missing from a file being left out of its games.
+	:param files: Names or paths of the PGN files to read (defaults to all of
+	them), a name selecting every file of that name.
+	:return: Iterator over DataFrames of `chunk_size` games, by PGN file and
+	month, the last one holding the remaining games.
+	"""
+	__require_pyarrow()
+	wanted = None if files is None else \
+		set(files) | {os.path.abspath(file) for file in files}
+	sources = {entry: __read_source(os.path.join(directory, entry))
+						 for entry in os.listdir(directory) if entry.startswith("file=")}
+
+	def frames() -> Iterator[pd.DataFrame]:
+		for entry, source in sorted(sources.items(), key=lambda item: (
+				item[1].get("name", ""), item[1].get("path", ""), item[0])):
+			if wanted is not None and source.get("name") not in wanted and \
+					source.get("path") not in wanted:
+				continue
+			for root, _, names in sorted(os.walk(os.path.join(directory, entry))):
+				for name in sorted(names):
+					if name.endswith(".parquet"):
+						parquet = pyarrow.parquet.ParquetFile(os.path.join(root, name),
+																									memory_map=True)
+						# Columns never filled in a file (e.g. titles) are not in its schema
+						present = None if columns is None else [
+							column for column in columns
+							if column in parquet.schema_arrow.names]
+						for batch in parquet.iter_batches(batch_size=chunk_size,
+																							columns=present):
+							yield batch.to_pandas()
+
+	return rechunk(frames(), chunk_size)
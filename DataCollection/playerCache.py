@@ -0,0 +1,266 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import psycopg
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PlayerIdCache:
+	"""
+	In-process mapping of player names to their ID in the players table.
+	Names are kept in a hashed pandas Index and IDs as 16 raw bytes each, the
+	cache is filled once from the database and then updated with the players
+	inserted during the ingestion. Players added before their insertion is
+	committed stay pending until they are confirmed, and are never saved. The
+	cache can be saved to disk along with a watermark of the committed players
+	it holds (their number and a checksum of their IDs), which is checked
+	against the players table when loading it back, so that players deleted or
+	replaced since make the cache stale.
+	The cache is locked while it is read or updated, the stages of the pipeline
+	using it from different threads.
+	"""
+
+	def __init__(self, names: Iterable[str] = (), ids: Iterable = (),
+							 watermark: tuple[int, int] = None):
+		"""
+		:param names: Player names, without duplicates, all committed.
+		:param ids: Player IDs (UUID objects, strings or raw bytes).
+		:param watermark: Row count and checksum of the IDs of the players table
+		reflected by the cache (defaults to the ones of the given players).
+		"""
+		self.__names = pd.Index(list(names), dtype=object)
+		self.__ids = self.__to_bytes(ids)
+		self.__pending = np.zeros(len(self.__names), dtype=bool)
+		self.watermark = watermark if watermark is not None else \
+			(len(self.__names), self.checksum(self.__ids))
+		self.__lock = threading.Lock()
+
+	@staticmethod
+	def __to_bytes(ids: Iterable) -> np.ndarray:
+		"""
+		Convert player IDs to an array of 16 bytes rows.
+		:param ids: Player IDs (UUID objects, strings or raw bytes).
+		:return: Array of shape (len(ids), 16) and dtype uint8.
+		"""
+		raw = b"".join(
+			i if isinstance(i, bytes) else
+			i.bytes if isinstance(i, uuid.UUID) else
+			uuid.UUID(str(i)).bytes
+			for i in ids)
+		return np.frombuffer(raw, dtype=np.uint8).reshape(-1, 16)
+
+	@staticmethod
+	def checksum(ids: np.ndarray) -> int:
+		"""
+		Checksum of a set of player IDs, the sum modulo 2^64 of the first 8 bytes
+		of the MD5 of their text, as computed by databaseWatermark in the database.
+		:param ids: Array of 16 bytes rows of player IDs.
+		:return: Checksum, in [0, 2^64).
+		"""
+		digests = b"".join(
+			hashlib.md5(str(uuid.UUID(bytes=row.tobytes())).encode()).digest()[:8]
+			for row in ids)
+		# Unsigned 64 bits sums wrap around, i.e. are taken modulo 2^64
+		return int(np.frombuffer(digests, dtype=">u8").sum(dtype=np.uint64))
+
+	@staticmethod
+	def databaseWatermark(
+			connection: psycopg.Connection, table_name: str
+	) -> tuple[int, int]:
+		"""
+		Get the watermark of the players table.
+		:param connection: Connection to the PostgreSQL database.
+		:param table_name: Name of the players table.
+		:return: Row count and checksum of the IDs of the table.
+		"""
+		query = psycopg.sql.SQL(
+			"select count(*), coalesce(sum(('x' || left(md5(id::text), 16))"
+			"::bit(64)::bigint), 0) from {player_table}").format(
+			player_table=psycopg.sql.Identifier(table_name))
+		count, total = connection.execute(query).fetchone()
+		return count, int(total) % 2 ** 64
+
+	def __len__(self) -> int:
+		with self.__lock:
+			return len(self.__names)
+
+	def contains(self, names: Iterable[str]) -> np.ndarray:
+		"""
+		Check which player names are in the cache.
+		:param names: Player names.
+		:return: Boolean array, True for the names present in the cache.
+		"""
+		names = pd.Index(names, dtype=object)
+		with self.__lock:
+			return self.__names.get_indexer(names) >= 0
+
+	def toDataFrame(self, names: Iterable[str]) -> pd.DataFrame:
+		"""
+		Get the IDs of a set of players.
+		:param names: Player names, unknown names are ignored.
+		:return: DataFrame with the "id" and "name" of the known players.
+		"""
+		names = pd.Index(pd.unique(pd.Series(list(names), dtype=object).dropna()))
+		with self.__lock:
+			positions = self.__names.get_indexer(names)
+			known = positions >= 0
+			ids = self.__ids[positions[known]]
+		return pd.DataFrame({
+			"id": [str(uuid.UUID(bytes=row.tobytes())) for row in ids],
+			"name": names[known]
+		})
+
+	def update(self, names: Iterable[str], ids: Iterable,
+						 committed: bool = True) -> int:
+		"""
+		Add players to the cache, names already present are ignored.
+		:param names: Player names.
+		:param ids: Player IDs, in the same order as the names.
+		:param committed: Whether the players are committed to the database, in
+		which case the pending players among them are confirmed. Otherwise they are
+		added as pending, e.g. before their insertion.
+		:return: Number of players added.
+		"""
+		new = pd.DataFrame({"name": list(names), "id": list(ids)})
+		new = new.drop_duplicates(subset=["name"])
+		names = pd.Index(new["name"], dtype=object)
+		with self.__lock:
+			present = self.__names.get_indexer(names)
+			if committed:
+				confirmed = present[present >= 0]
+				confirmed = confirmed[self.__pending[confirmed]]
+				if len(confirmed):
+					self.__pending[confirmed] = False
+					self.__advance(self.__ids[confirmed])
+			new = new[present < 0]
+			if not new.empty:
+				new_ids = self.__to_bytes(new["id"])
+				self.__names = self.__names.append(names[present < 0])
+				self.__ids = np.concatenate([self.__ids, new_ids])
+				self.__pending = np.concatenate(
+					[self.__pending, np.full(len(new), not committed)])
+				if committed:
+					self.__advance(new_ids)
+			return len(new)
+
+	def __advance(self, ids: np.ndarray) -> None:
+		"""
+		Add committed players to the watermark, the cache being locked.
+		:param ids: Array of 16 bytes rows of their IDs.
+		"""
+		count, total = self.watermark
+		self.watermark = (count + len(ids),
+											(total + self.checksum(ids)) % 2 ** 64)
+
+	def refresh(
+			self, connection: psycopg.Connection, table_name: str,
+			names: Iterable[str]
+	) -> int:
+		"""
+		Fetch the IDs of some players from the database into the cache, typically
+		the players which have just been inserted, confirming the pending ones
+		found in the table.
+		:param connection: Connection to the PostgreSQL database.
+		:param table_name: Name of the players table.
+		:param names: Names of the players to fetch.
+		:return: Number of players added to the cache.
+		"""
+		names = [name for name in pd.unique(pd.Series(list(names), dtype=object))
+						 if isinstance(name, str)]
+		if not names:
+			return 0
+		query = psycopg.sql.SQL(
+			"select id, name from {player_table} where name = any(%s)").format(
+			player_table=psycopg.sql.Identifier(table_name))
+		rows = connection.execute(query, (names,)).fetchall()
+		return self.update((row[1] for row in rows), (row[0] for row in rows))
+
+	@classmethod
+	def fromDatabase(
+			cls, connection: psycopg.Connection, table_name: str
+	) -> "PlayerIdCache":
+		"""
+		Build the cache from the whole players table.
+		:param connection: Connection to the PostgreSQL database.
+		:param table_name: Name of the players table.
+		:return: Player ID cache.
+		"""
+		query = psycopg.sql.SQL("select id, name from {player_table}").format(
+			player_table=psycopg.sql.Identifier(table_name))
+		rows = connection.execute(query).fetchall()
+		return cls((row[1] for row in rows), (row[0] for row in rows))
+
+	@classmethod
+	def load(
+			cls, connection: psycopg.Connection, table_name: str,
+			path: str = None
+	) -> "PlayerIdCache":
+		"""
+		Load the cache from disk if it is still in sync with the database,
+		otherwise build it from the database.
+		:param connection: Connection to the PostgreSQL database.
+		:param table_name: Name of the players table.
+		:param path: Path to a cache saved with save (optional).
+		:return: Player ID cache.
+		"""
+		if path is not None and os.path.isfile(path):
+			try:
+				with np.load(path) as data:
+					lengths = data["lengths"]
+					blob = data["names"].tobytes()
+					bounds = np.concatenate([[0], np.cumsum(lengths)])
+					cache = cls(
+						(blob[start:end].decode() for start, end in
+						 zip(bounds[:-1], bounds[1:])),
+						(row.tobytes() for row in data["ids"]),
+						(int(data["watermark"]), int(data["checksum"])))
+
+				watermark = cls.databaseWatermark(connection, table_name)
+				if watermark == cache.watermark:
+					logger.info(f"Loaded {len(cache)} players from cache {path}")
+					return cache
+				logger.info(f"Player cache {path} is stale ({cache.watermark[0]} "
+										f"players cached, {watermark[0]} in the database, or "
+										f"different players), rebuilding it")
+			except (OSError, KeyError, ValueError) as e:
+				logger.warning(f"Could not load player cache {path}: {e}")
+
+		cache = cls.fromDatabase(connection, table_name)
+		logger.info(f"Loaded {len(cache)} players from the database")
+		return cache
+
+	def save(self, path: str) -> None:
+		"""
+		Save the committed players of the cache to disk.
+		:param path: Path to the cache file.
+		"""
+		with self.__lock:
+			committed = ~self.__pending
+			names = self.__names[committed]
+			ids = self.__ids[committed]
+			watermark = self.watermark
+			pending = self.__pending.sum()
+		encoded = [name.encode() for name in names]
+		temporary = f"{path}.tmp"
+		with open(temporary, "wb") as f:
+			np.savez(f,
+							 names=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+							 lengths=np.array([len(name) for name in encoded],
+																dtype=np.int64),
+							 ids=ids,
+							 watermark=np.int64(watermark[0]),
+							 checksum=np.uint64(watermark[1]))
+		os.replace(temporary, path)
+		logger.info(f"Saved {len(ids)} players to cache {path}"
+								+ (f", leaving out {pending} uncommitted ones"
+									 if pending else ""))
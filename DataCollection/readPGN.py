@@ -0,0 +1,661 @@
+import bz2
+import gzip
+import logging
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import BinaryIO, Callable, Collection, Iterable, Iterator, \
+	Sequence
+
+import numpy as np
+import pandas as pd
+
+from DataCollection.metrics import collectTimes, timedCall
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GAME_SEPARATOR = b"\n[Event "
+RANGE_SIZE = 64 * 1024 * 1024  # Bytes of PGN text parsed by a worker at once
+STREAM_BLOCK_SIZE = 16 * 1024 * 1024  # Bytes of decompressed text per block
+ZSTD_RANGE_SIZE = 8 * 1024 * 1024  # Bytes of zstd frames decompressed at once
+OPENING_PLIES = 40  # Plies of movetext kept, deeper than any named opening
+MOVES_COLUMN = "Moves"  # Column of the first plies, space separated
+
+# Headers kept by the parser, the others are dropped
+PARSED_HEADERS = frozenset([
+	"Site", "White", "Black", "Result", "WhiteElo", "BlackElo", "WhiteTitle",
+	"BlackTitle", "UTCDate", "UTCTime", "TimeControl", "Opening"])
+# Headers with few distinct values, stored as categoricals
+CATEGORICAL_HEADERS = frozenset([
+	"White", "Black", "WhiteTitle", "BlackTitle", "Result", "Opening"])
+ELO_HEADERS = frozenset(["WhiteElo", "BlackElo"])
+UNLIMITED_TIME = -1  # Base time and increment of games without time control
+NAT = np.iinfo(np.int64).min  # Integer value of NaT
+
+# Movetext tokens: comments, variations, NAGs, move numbers and results are
+# matched to be skipped, moves are captured
+MOVE_TOKEN = re.compile(
+	r"\{[^}]*\}|\([^)]*\)|\$\d+|\d+\.+|1-0|0-1|1/2-1/2|\*|([A-Za-z][^\s{}()$!?]*)")
+
+ZSTD_MAGIC = 0xFD2FB528
+ZSTD_SKIPPABLE_MAGIC = range(0x184D2A50, 0x184D2A60)
+COMPRESSION_MAGICS = {
+	b"\x28\xb5\x2f\xfd": "zstd",
+	b"\x1f\x8b": "gzip",
+	b"BZh": "bz2"
+}
+
+
+def splitPGNFile(file: str, range_size: int = RANGE_SIZE, start: int = 0) \
+		-> list[tuple[int, int]]:
+	"""
+	Split a PGN file into byte ranges which all start on an "[Event " header.
+	:param file: Path to the PGN file.
+	:param range_size: Approximate size in bytes of each range.
+	:param start: Offset of the game header to start from.
+	:return: List of (start, end) byte offsets covering the file from `start`.
+	"""
+	size = os.path.getsize(file)
+	if size <= start:
+		return []
+
+	bounds = [start]
+	with open(file, "rb") as f, \
+			mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		target = start + range_size
+		while target < size:
+			position = mm.find(GAME_SEPARATOR, target)
+			if position == -1:
+				break
+			bounds.append(position + 1)
+			target = position + 1 + range_size
+	bounds.append(size)
+
+	return list(zip(bounds[:-1], bounds[1:]))
+
+
+def splitMoves(movetext: str, plies: int = OPENING_PLIES) -> list[str]:
+	"""
+	Extract the first moves of a movetext, without move numbers, comments,
+	variations or annotations.
+	:param movetext: Movetext in PGN format (e.g. "1. e4 { ... } 1... c5").
+	:param plies: Maximum number of moves to extract.
+	:return: Moves in SAN (e.g. ["e4", "c5"]).
+	"""
+	moves = []
+	for match in MOVE_TOKEN.finditer(movetext):
+		if match.group(1):
+			moves.append(match.group(1))
+			if len(moves) == plies:
+				break
+	return moves
+
+
+def parsePGNBlock(
+		data: bytes, plies: int = OPENING_PLIES,
+		headers: Collection[str] | None = PARSED_HEADERS
+) -> tuple[dict[str, list], int]:
+	"""
+	Parse the headers and first moves of the games contained in a block of PGN
+	text.
+	:param data: PGN text, starting on a game's first header.
+	:param plies: Number of moves of each game to keep in the MOVES_COLUMN
+	column.
+	:param headers: Headers to keep, None to keep them all.
+	:return: Dictionary mapping each header to its column of values (None when a
+	game lacks the header) and the number of games parsed.
+	"""
+	columns = {}
+	count = 0
+	game = {}
+	moves = None  # Moves of the last game, while its movetext goes on
+	for line in data.decode("utf-8", errors="replace").splitlines():
+		if line.startswith("["):
+			moves = None
+			try:
+				header, value = line.rstrip()[1:-1].split(" ", 1)
+				if headers is None or header in headers:
+					game[header] = value.strip('"')
+			except ValueError as e:
+				logger.error(f"Error parsing header line: {line.strip()} - {e}")
+		elif line.startswith("1") and game:
+			moves = splitMoves(line, plies)
+			game[MOVES_COLUMN] = " ".join(moves)
+			for header, value in game.items():
+				column = columns.get(header)
+				if column is None:
+					column = columns[header] = [None] * count
+				column.append(value)
+			count += 1
+			for column in columns.values():
+				if len(column) < count:
+					column.append(None)
+			game = {}
+		elif moves is not None and len(moves) < plies and line.strip():
+			# Movetext wrapped over several lines
+			moves += splitMoves(line, plies - len(moves))
+			columns[MOVES_COLUMN][-1] = " ".join(moves)
+
+	return columns, count
+
+
+def __parse_distinct(
+		values: Sequence, parse: Callable[[pd.Index], np.ndarray], missing
+) -> np.ndarray:
+	"""
+	Parse each distinct value of a column only once.
+	:param values: Values of the column.
+	:param parse: Function parsing an Index of distinct values into an array.
+	:param missing: Value of the missing values.
+	:return: Parsed values of the column.
+	"""
+	codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+	return np.append(parse(pd.Index(uniques, dtype=object)), missing)[codes]
+
+
+def __parse_time_control(time_control: str) -> tuple[int, int]:
+	"""
+	Parse a time control (e.g. "180+2", or "-" for unlimited time).
+	:param time_control: Value of the TimeControl header.
+	:return: Base time and increment in seconds, UNLIMITED_TIME for unlimited
+	time, -2 when invalid.
+	"""
+	if time_control == "-":
+		return UNLIMITED_TIME, UNLIMITED_TIME
+	base, _, increment = time_control.partition("+")
+	try:
+		return int(base), int(increment)
+	except ValueError:
+		return -2, -2
+
+
+def compactColumns(columns: dict[str, Sequence]) -> dict[str, Sequence]:
+	"""
+	Convert the columns of raw headers (strings) into a compact typed schema:
+	- White, Black, WhiteTitle, BlackTitle, Result and Opening are categoricals,
+	- WhiteElo and BlackElo are nullable Int16,
+	- UTCDate and UTCTime are combined into UTCDateTime, a UTC timestamp,
+	- TimeControl is split into BaseTime and Increment, nullable Int32 in seconds
+	(UNLIMITED_TIME for "-").
+	The other columns are kept as they are, and columns already compact too.
+	:param columns: Columns of headers, see parsePGNBlock.
+	:return: Compact columns.
+	"""
+	compact = {}
+	for header, values in columns.items():
+		if header in CATEGORICAL_HEADERS and not isinstance(values, pd.Categorical):
+			codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+			compact[header] = pd.Categorical.from_codes(codes, uniques)
+		elif header in ELO_HEADERS and not pd.api.types.is_integer_dtype(
+				getattr(values, "dtype", None)):
+			elos = __parse_distinct(values, lambda uniques: pd.to_numeric(
+				uniques, errors="coerce").to_numpy(dtype=float), np.nan)
+			invalid = ~((elos >= 0) & (elos <= np.iinfo(np.int16).max))
+			compact[header] = pd.arrays.IntegerArray(
+				np.where(invalid, 0, elos).astype(np.int16), invalid)
+		elif header not in ["UTCDate", "UTCTime", "TimeControl"]:
+			compact[header] = values
+
+	if "UTCDate" in columns and "UTCTime" in columns:
+		# Nanoseconds since the epoch, NaT when the date or time is invalid
+		dates = __parse_distinct(columns["UTCDate"], lambda uniques: pd.to_datetime(
+			uniques, format="%Y.%m.%d", errors="coerce").as_unit("ns").asi8, NAT)
+		times = __parse_distinct(columns["UTCTime"], lambda uniques: pd.to_timedelta(
+			uniques, errors="coerce").as_unit("ns").asi8, NAT)
+		compact["UTCDateTime"] = pd.DatetimeIndex(np.where(
+			(dates == NAT) | (times == NAT), NAT, dates + times).view(
+			"datetime64[ns]")).tz_localize("UTC").array
+
+	if "TimeControl" in columns:
+		codes, uniques = pd.factorize(
+			np.asarray(columns["TimeControl"], dtype=object))
+		time_controls = np.array(
+			[__parse_time_control(value) for value in uniques] + [(-2, -2)],
+			dtype=np.int32)[codes]
+		for position, header in enumerate(["BaseTime", "Increment"]):
+			values = time_controls[:, position]
+			compact[header] = pd.arrays.IntegerArray(
+				np.where(values == -2, 0, values).astype(np.int32), values == -2)
+
+	return compact
+
+
+def compactGameInfo(gameInfo: pd.DataFrame) -> pd.DataFrame:
+	"""
+	Convert a DataFrame of raw PGN headers into the compact schema of the
+	parser, see compactColumns. Compact DataFrames are returned as they are.
+	:param gameInfo: DataFrame containing raw or compact PGN information.
+	:return: DataFrame containing compact PGN information.
+	"""
+	raw = [header for header, dtype in gameInfo.dtypes.items()
+				 if header in ["UTCDate", "UTCTime", "TimeControl"]
+				 or header in CATEGORICAL_HEADERS
+				 and not isinstance(dtype, pd.CategoricalDtype)
+				 or header in ELO_HEADERS and not pd.api.types.is_integer_dtype(dtype)]
+	if not raw:
+		return gameInfo
+	compact = pd.DataFrame(compactColumns(
+		{header: gameInfo[header].array for header in gameInfo.columns}))
+	compact.attrs = gameInfo.attrs
+	return compact
+
+
+def parseCompactBlock(data: bytes) -> tuple[dict[str, Sequence], int]:
+	"""
+	Parse a block of PGN text into compact columns.
+	:param data: PGN text, starting on a game's first header.
+	:return: Compact columns (see compactColumns) and number of games parsed.
+	"""
+	columns, count = parsePGNBlock(data)
+	return compactColumns(columns), count
+
+
+def __parse_file_range(file: str, start: int, end: int) \
+		-> tuple[dict[str, list], int]:
+	"""
+	Memory-map a PGN file and parse the games in one of its byte ranges.
+	:param file: Path to the PGN file.
+	:param start: Offset of the first byte of the range.
+	:param end: Offset of the byte following the range.
+	:return: Compact columns and number of games, see parseCompactBlock.
+	"""
+	with open(file, "rb") as f, \
+			mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		return parseCompactBlock(mm[start:end])
+
+
+def detectCompression(file: str) -> str | None:
+	"""
+	Detect the compression format of a file from its magic number.
+	:param file: Path to the file.
+	:return: "zstd", "gzip", "bz2" or None for uncompressed files.
+	"""
+	with open(file, "rb") as f:
+		magic = f.read(4)
+	for prefix, compression in COMPRESSION_MAGICS.items():
+		if magic.startswith(prefix):
+			return compression
+	return None
+
+
+def openCompressedFile(file: str, compression: str) -> BinaryIO:
+	"""
+	Open a compressed file as a stream of decompressed bytes.
+	:param file: Path to the compressed file.
+	:param compression: Compression format, see detectCompression.
+	:return: Binary file-like object yielding the decompressed content.
+	"""
+	if compression == "gzip":
+		return gzip.open(file, "rb")
+	if compression == "bz2":
+		return bz2.open(file, "rb")
+	if compression == "zstd":
+		if zstandard is None:
+			raise ImportError("The zstandard package is required to read .zst files")
+		return zstandard.ZstdDecompressor().stream_reader(
+			open(file, "rb"), read_across_frames=True, closefd=True)
+	raise ValueError(f"Unsupported compression format: {compression}")
+
+
+def zstdFrameRanges(file: str) -> list[tuple[int, int]]:
+	"""
+	Locate the independent frames of a zstd file by walking the frame and block
+	headers, without decompressing anything.
+	:param file: Path to the zstd file.
+	:return: List of (start, end) byte offsets of the data frames.
+	"""
+	frames = []
+	with open(file, "rb") as f, \
+			mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		position = 0
+		while position < len(mm):
+			magic = int.from_bytes(mm[position:position + 4], "little")
+			if magic in ZSTD_SKIPPABLE_MAGIC:
+				position += 8 + int.from_bytes(mm[position + 4:position + 8], "little")
+				continue
+			if magic != ZSTD_MAGIC:
+				raise ValueError(f"Invalid zstd frame at offset {position} of {file}")
+
+			start = position
+			descriptor = mm[position + 4]
+			single_segment = descriptor >> 5 & 1
+			position += (5 + (1 - single_segment)
+									 + (0, 1, 2, 4)[descriptor & 3]
+									 + (single_segment, 2, 4, 8)[descriptor >> 6])
+			last_block = False
+			while not last_block:
+				header = int.from_bytes(mm[position:position + 3], "little")
+				last_block = bool(header & 1)
+				block_type = header >> 1 & 3
+				if block_type == 3:
+					raise ValueError(f"Invalid zstd block at offset {position} of {file}")
+				position += 3 + (1 if block_type == 1 else header >> 3)
+			position += 4 * (descriptor >> 2 & 1)  # Content checksum
+			frames.append((start, position))
+
+	return frames
+
+
+def __group_ranges(ranges: list[tuple[int, int]], range_size: int) \
+		-> list[tuple[int, int]]:
+	"""
+	Merge consecutive byte ranges until they reach `range_size` bytes.
+	:param ranges: Contiguous (start, end) byte ranges.
+	:param range_size: Minimum size in bytes of the merged ranges.
+	:return: List of merged (start, end) byte ranges.
+	"""
+	groups = []
+	for start, end in ranges:
+		if groups and groups[-1][1] - groups[-1][0] < range_size:
+			groups[-1] = (groups[-1][0], end)
+		else:
+			groups.append((start, end))
+	return groups
+
+
+def __split_partial_games(data: bytes) -> tuple[bytes, bytes, bytes | None]:
+	"""
+	Split decompressed PGN text whose boundaries can fall inside games.
+	:param data: PGN text.
+	:return: The text before the first game header, the complete games, and the
+	text from the last game header onwards (None if no game header was found).
+	"""
+	if data.startswith(GAME_SEPARATOR[1:]):
+		first = 0
+	else:
+		first = data.find(GAME_SEPARATOR) + 1
+		if first == 0:
+			return data, b"", None
+	last = max(data.rfind(GAME_SEPARATOR) + 1, first)
+	return data[:first], data[first:last], data[last:]
+
+
+def __parse_zstd_range(file: str, start: int, end: int) \
+		-> tuple[bytes, dict[str, list], int, bytes | None, int]:
+	"""
+	Decompress a range of whole zstd frames and parse the complete games in it.
+	:param file: Path to the zstd file.
+	:param start: Offset of the first frame of the range.
+	:param end: Offset of the byte following the last frame of the range.
+	:return: The partial game text at the start of the range, the columns and
+	number of complete games, the partial game text at the end of the range
+	(see __split_partial_games) and the size of the decompressed text.
+	"""
+	with open(file, "rb") as f, \
+			mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		reader = zstandard.ZstdDecompressor().stream_reader(
+			mm[start:end], read_across_frames=True)
+		data = reader.readall()
+	head, body, tail = __split_partial_games(data)
+	columns, count = parseCompactBlock(body)
+	return head, columns, count, tail, len(data)
+
+
+def __stream_blocks(stream: BinaryIO, block_size: int) -> Iterator[bytes]:
+	"""
+	Read a stream of PGN text in blocks cut on game boundaries.
+	:param stream: Binary file-like object.
+	:param block_size: Number of bytes read from the stream at once.
+	:return: Iterator over blocks of complete games.
+	"""
+	carry = b""
+	while data := stream.read(block_size):
+		data = carry + data
+		cut = data.rfind(GAME_SEPARATOR) + 1
+		if cut == 0:
+			carry = data
+			continue
+		yield data[:cut]
+		carry = data[cut:]
+	if carry:
+		yield carry
+
+
+def __file_blocks(
+		executor: Executor, file: str, range_size: int, window: int,
+		start: int = 0
+) -> Iterator[tuple[dict[str, list], int, int | None, int]]:
+	"""
+	Parse a PGN file, plain or compressed, in parallel blocks.
+	:param executor: Executor running the parser workers.
+	:param file: Path to the PGN file.
+	:param range_size: Approximate size in bytes of the ranges of plain files.
+	:param window: Maximum number of blocks in flight.
+	:param start: Offset of the game header to start from (plain files only).
+	:return: Iterator over the columns and number of games of each block, in file
+	order, along with the offset of the byte following the block in the file
+	(None for compressed files) and the number of bytes of PGN text parsed.
+	"""
+	compression = detectCompression(file)
+	if compression is None:
+		ranges = splitPGNFile(file, range_size, start)
+		tasks = ((file, start, end) for start, end in ranges)
+		for (columns, count), (range_start, end) in zip(
+				orderedResults(executor, __parse_file_range, tasks, window), ranges):
+			yield columns, count, end, end - range_start
+		return
+	if start:
+		raise ValueError(f"Cannot start reading compressed file {file} at an offset")
+
+	if compression == "zstd" and zstandard is not None:
+		ranges = __group_ranges(zstdFrameRanges(file), ZSTD_RANGE_SIZE)
+		if len(ranges) > 1:
+			# Independent frames are decompressed in parallel, and the games split
+			# between two ranges are stitched back together here
+			logger.info(f"Decompressing {len(ranges)} zstd frame ranges in parallel")
+			tasks = ((file, start, end) for start, end in ranges)
+			carry = b""
+			for head, columns, count, tail, size in orderedResults(
+					executor, __parse_zstd_range, tasks, window):
+				if tail is None:
+					carry += head
+					yield {}, 0, None, size
+					continue
+				yield *parseCompactBlock(carry + head), None, 0
+				yield columns, count, None, size
+				carry = tail
+			yield *parseCompactBlock(carry), None, 0
+			return
+
+	with openCompressedFile(file, compression) as stream:
+		sizes = deque()
+
+		def tasks() -> Iterator[tuple[bytes]]:
+			for block in __stream_blocks(stream, STREAM_BLOCK_SIZE):
+				sizes.append(len(block))
+				yield block,
+
+		for columns, count in orderedResults(executor, parseCompactBlock, tasks(),
+																				 window):
+			yield columns, count, None, sizes.popleft()
+
+
+def orderedResults(
+		executor: Executor, function: Callable, tasks: Iterable[tuple],
+		window: int
+) -> Iterator:
+	"""
+	Submit tasks to an executor and yield their results in submission order,
+	keeping at most `window` tasks in flight to bound memory usage.
+	:param executor: Executor running the tasks.
+	:param function: Function to call for each task.
+	:param tasks: Iterable of argument tuples for the function.
+	:param window: Maximum number of submitted but unconsumed tasks.
+	:return: Iterator over the results of the tasks.
+	"""
+	def results() -> Iterator:
+		pending = deque()
+		for task in tasks:
+			pending.append(executor.submit(timedCall, function, *task))
+			if len(pending) >= window:
+				yield pending.popleft().result()
+		while pending:
+			yield pending.popleft().result()
+
+	# The CPU time of the tasks is added to the stage consuming their results
+	return collectTimes(results())
+
+
+def concatFrames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+	"""
+	Concatenate DataFrames, their categorical columns staying categorical (the
+	categories of the DataFrames are merged).
+	:param frames: DataFrames to concatenate.
+	:return: Concatenated DataFrame.
+	"""
+	columns = {column for frame in frames for column, dtype in frame.dtypes.items()
+						 if isinstance(dtype, pd.CategoricalDtype)}
+	if len(frames) > 1 and columns:
+		for column in columns:
+			parts = [frame[column] for frame in frames if column in frame.columns]
+			if not all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+				continue
+			categories = pd.Index(np.concatenate(
+				[part.cat.categories.to_numpy(dtype=object) for part in parts])).unique()
+			frames = [frame.assign(**{column: frame[column].cat.set_categories(
+				categories) if column in frame.columns else pd.Categorical.from_codes(
+				np.full(len(frame), -1), categories)}) for frame in frames]
+	return pd.concat(frames, ignore_index=True)
+
+
+def rechunk(frames: Iterable[pd.DataFrame], chunk_size: int) \
+		-> Iterator[pd.DataFrame]:
+	"""
+	Regroup a stream of DataFrames into DataFrames of exactly `chunk_size` rows,
+	the last one holding the remaining rows.
+	:param frames: Iterable of DataFrames.
+	:param chunk_size: Number of rows per output DataFrame.
+	:return: Iterator over the regrouped DataFrames.
+	"""
+	buffer = []
+	buffered = 0
+	for frame in frames:
+		if frame.empty:
+			continue
+		buffer.append(frame)
+		buffered += len(frame)
+		if buffered < chunk_size:
+			continue
+		merged = concatFrames(buffer)
+		start = 0
+		while buffered - start >= chunk_size:
+			yield merged.iloc[start:start + chunk_size].reset_index(drop=True)
+			start += chunk_size
+		# The categories of the rest are trimmed, not to pile up chunk after chunk
+		rest = merged.iloc[start:]
+		buffer = [rest.assign(**{
+			column: rest[column].cat.remove_unused_categories()
+			for column, dtype in rest.dtypes.items()
+			if isinstance(dtype, pd.CategoricalDtype)})] if start < buffered else []
+		buffered -= start
+	if buffered:
+		yield concatFrames(buffer)
+
+
+def __file_chunks(
+		executor: Executor, file: str, chunk_size: int, range_size: int,
+		window: int, resume: tuple[int, int, int] = (0, 0, 0)
+) -> Iterator[pd.DataFrame]:
+	"""
+	Parse a PGN file into DataFrames of `chunk_size` games, keeping track of the
+	position in the file reached by each of them.
+	:param executor: Executor running the parser workers.
+	:param file: Path to the PGN file.
+	:param chunk_size: Number of games per output DataFrame.
+	:param range_size: Approximate size in bytes of the ranges of plain files.
+	:param window: Maximum number of blocks in flight.
+	:param resume: Position to resume from, see readPGNFiles.
+	:return: Iterator over DataFrames whose attrs hold their position, see
+	readPGNFiles.
+	"""
+	byte_offset, offset_games, games = resume
+	# Game boundaries known in the file, as (byte offset, games before it)
+	boundaries = deque([(byte_offset, offset_games)])
+	parsed = offset_games
+	skip = games - offset_games
+	parsed_bytes = 0
+
+	def frames() -> Iterator[pd.DataFrame]:
+		nonlocal parsed, skip, parsed_bytes
+		for columns, count, end, size in __file_blocks(executor, file, range_size,
+																									 window, byte_offset):
+			frame = pd.DataFrame(columns)
+			parsed += count
+			parsed_bytes += size
+			if end is not None:
+				boundaries.append((end, parsed))
+			if skip:
+				skipped = min(skip, len(frame))
+				frame = frame.iloc[skipped:]
+				skip -= skipped
+			yield frame
+
+	# Chunks are held back by one to flag the last one of the file
+	previous = None
+	reported_bytes = 0
+	for chunk in rechunk(frames(), chunk_size):
+		games += len(chunk)
+		while len(boundaries) > 1 and boundaries[1][1] <= games:
+			boundaries.popleft()
+		chunk.attrs = {"file": file, "games": games,
+									 "byte_offset": boundaries[0][0],
+									 "offset_games": boundaries[0][1], "completed": False,
+									 "bytes_read": parsed_bytes - reported_bytes}
+		reported_bytes = parsed_bytes
+		if previous is not None:
+			yield previous
+		previous = chunk
+	if previous is not None:
+		previous.attrs["completed"] = True
+		yield previous
+
+
+def readPGNFiles(
+		files: list[str], chunk_size: int, max_workers: int,
+		range_size: int = RANGE_SIZE,
+		resume: dict[str, tuple[int, int, int]] = None
+) -> Iterator[pd.DataFrame]:
+	"""
+	Parse PGN files in parallel. Plain files are memory-mapped and split into
+	byte ranges parsed by the workers, gzip, bz2 and zstd files are decompressed
+	as a stream into blocks parsed by the workers, and zstd files made of several
+	frames have their frames decompressed by the workers too.
+	Each DataFrame has its position in its file in attrs: the "file", the number
+	of "games" of the file up to the end of the DataFrame, the "byte_offset" of
+	the last game boundary known before that end along with the number of games
+	before it ("offset_games"), whether it is the last DataFrame of the file
+	("completed") and the bytes of PGN text parsed since the previous DataFrame
+	("bytes_read"). The offset is only known on plain files, 0 otherwise.
+	:param files: List of paths to the PGN files, plain or compressed.
+	:param chunk_size: Number of games per output DataFrame.
+	:param max_workers: Number of parser processes.
+	:param range_size: Approximate size in bytes of the ranges given to workers.
+	:param resume: Positions to resume some files from, as (byte_offset,
+	offset_games, games) tuples by path: parsing starts at the byte offset and the
+	games up to the number of games are skipped.
+	:return: Iterator over DataFrames of at most `chunk_size` games, a file's
+	last DataFrame holding its remaining games.
+	"""
+	resume = resume or {}
+	with ProcessPoolExecutor(max_workers=max_workers) as executor:
+		for file in files:
+			if not os.path.isfile(file):
+				logger.error(f"PGN file not found: {file}")
+				continue
+
+			logger.info(f"Parsing PGN file: {file}")
+			try:
+				yield from __file_chunks(executor, file, chunk_size, range_size,
+																 max_workers * 2, resume.get(file, (0, 0, 0)))
+			except (OSError, ImportError, ValueError, EOFError) as e:
+				logger.error(f"Error reading PGN file {file}: {e}")
@@ -0,0 +1,95 @@
+import logging
+import pickle
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ALIGNMENT = 64  # Byte alignment of the arrays inside a shared memory block
+ATTACHED_LIMIT = 4  # Shared memory blocks kept attached by a worker process
+
+# Shared memory blocks attached by the current process, most recent last
+__attached = OrderedDict()
+
+
+class SharedArrays:
+	"""
+	Set of NumPy arrays published once in a shared memory block, which worker
+	processes attach to without copying them. Only the small descriptor of the
+	block has to be sent to the workers.
+	"""
+
+	def __init__(self, arrays: dict[str, np.ndarray]):
+		"""
+		:param arrays: Arrays to publish, by name (object arrays are not supported).
+		"""
+		layout = {}
+		size = 0
+		for key, array in arrays.items():
+			array = np.asarray(array)
+			if array.dtype.hasobject:
+				raise TypeError(f"Cannot share the object array '{key}'")
+			layout[key] = (size, array.dtype.str, array.shape)
+			size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+		self.__memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+		for key, (offset, dtype, shape) in layout.items():
+			np.ndarray(shape, dtype, buffer=self.__memory.buf, offset=offset)[...] = \
+				arrays[key]
+
+		self.descriptor = {"name": self.__memory.name, "arrays": layout}
+		self.size = size
+		self.descriptorSize = len(pickle.dumps(self.descriptor))
+
+	def close(self) -> None:
+		"""
+		Release the shared memory block.
+		"""
+		self.__memory.close()
+		self.__memory.unlink()
+
+	def __enter__(self) -> "SharedArrays":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+
+def attachArrays(descriptor: dict) -> dict[str, np.ndarray]:
+	"""
+	Attach to arrays published with SharedArrays. The block stays attached for
+	the next tasks of the process, until more recent blocks replace it.
+	:param descriptor: Descriptor of the published arrays.
+	:return: Read-only views of the arrays, by name.
+	"""
+	name = descriptor["name"]
+	if name in __attached:
+		__attached.move_to_end(name)
+		return __attached[name][1]
+
+	try:
+		memory = shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:  # Python < 3.13, tracked along with the publisher's block
+		memory = shared_memory.SharedMemory(name=name)
+
+	arrays = {}
+	for key, (offset, dtype, shape) in descriptor["arrays"].items():
+		array = np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+		array.flags.writeable = False
+		arrays[key] = array
+	__attached[name] = (memory, arrays)
+
+	while len(__attached) > ATTACHED_LIMIT:
+		memory, arrays = __attached.popitem(last=False)[1]
+		arrays.clear()
+		try:
+			memory.close()
+		except BufferError:  # Views still referenced, released with the process
+			pass
+
+	return __attached[name][1]
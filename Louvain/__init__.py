@@ -1,8 +1,18 @@
 __author__ = "agueguen-lr"
-__all__ = ["getPlayersOpenings", "getNetworkGraph", "getPartitionSummary",
-					 "plotBasic", "plotLouvainPartitions", "exportPlotToJSON"]
+__all__ = ["getPlayersOpenings", "getDatabaseWatermark", "getNetworkGraph",
+					 "getCompactGraph", "getPartitionSummary", "CompactGraph",
+					 "ResultCache", "forceLayout", "warmStartPositions",
+					 "detectCommunities", "findCommunities", "modularity",
+					 "sweepCommunities", "plotBasic", "plotLouvainPartitions",
+					 "exportPlotToJSON", "exportGraph", "loadPlotPositions"]
 
-from Louvain.getData import (getPlayersOpenings, getNetworkGraph,
-													getPartitionSummary)
+from Louvain.communities import detectCommunities, findCommunities, modularity
+from Louvain.compactGraph import CompactGraph
+from Louvain.exportGraph import exportGraph, loadPlotPositions
+from Louvain.getData import (getPlayersOpenings, getDatabaseWatermark,
+													getNetworkGraph, getCompactGraph, getPartitionSummary)
+from Louvain.layout import forceLayout, warmStartPositions
+from Louvain.resultCache import ResultCache
+from Louvain.sweep import sweepCommunities
 from Louvain.visualiseNetwork import (plotBasic, plotLouvainPartitions,
 															exportPlotToJSON)
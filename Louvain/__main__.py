@@ -5,11 +5,15 @@ from json import load
 import logging
 
 import networkx as nx
-from community import community_louvain
+import numpy as np
+import pandas as pd
 
 from Louvain import *
+from Louvain.resultCache import (arraysToFrame, arraysToGraph, frameToArrays,
+																 graphToArrays)
 
 from DataCollection import validate_and_extract_params
+from DataCollection.metrics import enableMetrics, measureStage
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO,
@@ -28,13 +32,19 @@ parser.add_argument("-c", "--color", type=str,
 										help="Get data for the players"
 												 " with the white or black pieces (required).")
 parser.add_argument("-l", "--layout", type=str,
-										choices=["spring", "kamada"],
+										choices=["spring", "kamada", "force"],
 										help="How to position the nodes/vertices"
-												 " for the graph (required).")
+												 " for the graph, 'force' scaling to large graphs"
+												 " (required).")
 parser.add_argument("-w", "--weighted", action="store_true",
 	help="Use weighted edges between openings in the graph, if not specified,"
 			 " the weights between openings and their variations is 1 (optional)."
 )
+parser.add_argument("--all_ancestors", action="store_true",
+	help="Link each opening to all the openings it is a variation of (e.g. a"
+			 " sub-variation to its variation and to its family), if not specified,"
+			 " only to the closest one (optional)."
+)
 parser.add_argument("json_file", type=str,
 										help="Path to the output JSON file (required).")
 parser.add_argument("--min_count", type=int,
@@ -49,13 +59,59 @@ parser.add_argument("--min_percent", type=float,
 parser.add_argument("--Louvain", type=str, choices=["true", "false"],
 										help="Perform partitioning of players into communities"
 												 " with Louvain's algorithm (optional, default = true).")
+parser.add_argument("--method", type=str, choices=["louvain", "leiden"],
+										help="Community detection algorithm, Leiden guaranteeing"
+												 " connected communities (optional, default = louvain).")
+parser.add_argument("--resolution", type=float,
+										help="Resolution of the modularity, above 1 for smaller"
+												 " communities and below 1 for larger ones"
+												 " (optional, default = 1).")
+parser.add_argument("--seed", type=int,
+										help="Seed of the community detection, the same seed giving"
+												 " the same communities (optional, default = 0).")
+parser.add_argument("--parallel", action="store_true",
+	help="Move the nodes between communities all at once with vectorized rounds,"
+			 " faster on large graphs, instead of one at a time (optional)."
+)
+parser.add_argument("--sweep", type=str,
+										help="Comma-separated resolutions (e.g. 0.5,1,1.5,2) to find"
+												 " communities with, for every seed of --sweep_seeds,"
+												 " exporting the most stable partition (optional).")
+parser.add_argument("--sweep_seeds", type=int,
+										help="Number of seeds tried at every resolution of --sweep"
+												 " (optional, default = 5).")
+parser.add_argument("--sweep_report", type=str,
+										help="Save the modularity, number of communities and"
+												 " stability of every run of --sweep to this CSV file"
+												 " (optional).")
+parser.add_argument("--cores", type=int,
+										help="Number of worker processes of --sweep (optional).")
 parser.add_argument("--iterations", type=int,
-										help="For layout = 'spring', how many iterations"
+										help="For layout = 'spring' or 'force', how many iterations"
 												 " of the Fruchterman-Reingold force-directed algorithm"
-												 " (optional, default = 50).")
+												 " (optional, default = 50, or 10 with --warm_start).")
+parser.add_argument("--warm_start", type=str,
+										help="Start the layout from the positions of a previous"
+												 " JSON export: known nodes keep their position and only"
+												 " the new ones are laid out around them (optional).")
 parser.add_argument("--save", type=str,
 										help="Plot the result and save to a png"
 												 " with the specified name and path (optional).")
+parser.add_argument("--max_rows", type=int,
+										help="Maximum number of player-opening rows to fetch from"
+												 " the database (optional).")
+parser.add_argument("--cache", type=str,
+										help="Directory caching the fetched data, graph, layout and"
+												 " partitions, reused while the games and the options"
+												 " they depend on do not change (optional).")
+parser.add_argument("--cache_size", type=int,
+										help="Maximum size of the cache in MB, the least recently"
+												 " used results being evicted (optional, default ="
+												 " 1024).")
+parser.add_argument("--metrics", type=str,
+										help="Record the time, rows and memory of each stage and"
+												 " save them to this JSON file, along with a"
+												 " Prometheus textfile (.prom) next to it (optional).")
 
 # Parse arguments
 args = parser.parse_args()
@@ -68,11 +124,15 @@ if not os.path.isfile(args.json_file):
 color = args.color
 layout = args.layout
 weighted = args.weighted
+all_ancestors = args.all_ancestors
 min_count = args.min_count
 min_percent = args.min_percent
 louvain = args.Louvain.lower() == "true" if args.Louvain else None
 iterations = args.iterations
+if iterations is None:
+	iterations = 10 if args.warm_start else 50
 save = args.save
+metrics = enableMetrics("Louvain") if args.metrics else None
 
 with (open(args.json_file, 'r') as file):
 	all_params = load(file)
@@ -82,43 +142,173 @@ optional_db_keys = ["password", "sslmode", "sslkey", "sslcert", "sslrootcert"]
 db_params = validate_and_extract_params(all_params, required_db_keys,
 																				optional_db_keys)
 
-data = getPlayersOpenings(
-	db_params,
-	color,
-	min_games=min_count if min_count is not None else 100,
-	min_percent=min_percent if min_percent is not None else 0.01
-)
+cache = ResultCache(
+	args.cache,
+	(args.cache_size if args.cache_size is not None else 1024) * 1024 ** 2)
+watermark = getDatabaseWatermark(db_params) if args.cache else None
+if args.cache and watermark is None:
+	logger.warning("Cannot tell whether the games changed, not using the cache.")
+	cache = ResultCache(None)
+
+with measureStage("fetch") as counters:
+	fetch_key, data = cache.getOrCompute(
+		"fetch",
+		{"database": [db_params.get(key) for key in ["host", "port", "dbname"]],
+		 "watermark": watermark, "color": color, "min_count": min_count,
+		 "min_percent": min_percent, "max_rows": args.max_rows},
+		None,
+		lambda: getPlayersOpenings(
+			db_params,
+			color,
+			min_games=min_count if min_count is not None else 100,
+			min_percent=min_percent if min_percent is not None else 0.01,
+			max_rows=args.max_rows,
+			progress=True
+		),
+		# A failed fetch is not cached
+		lambda frame: None if frame.empty else frameToArrays(frame),
+		arraysToFrame
+	)
+	counters["rows_out"] += len(data)
 
 logger.info("Displaying fetched data:")
 print(data)
 
 logger.info("Creating network graph...")
-graph = getNetworkGraph(data, weighted)
+with measureStage("graph") as counters:
+	graph_key, graph = cache.getOrCompute(
+		"graph", {"weighted": weighted, "all_ancestors": all_ancestors}, fetch_key,
+		lambda: getCompactGraph(data, weighted, all_ancestors),
+		graphToArrays, arraysToGraph)
+	counters["rows_in"] += len(data)
+	counters["rows_out"] += graph.numberOfNodes()
+
+
+def compute_layout() -> dict:
+	"""
+	Compute the positions of the nodes with the chosen layout, warm-started from
+	the previous export if asked to.
+	:return: Positions of the nodes by name.
+	"""
+	previous = loadPlotPositions(args.warm_start) if args.warm_start else {}
+	initial, fixed = None, None
+	if previous and layout != "force":
+		positions, known = warmStartPositions(graph, previous)
+		initial = dict(enumerate(positions))
+		fixed = np.flatnonzero(known).tolist() or None
+
+	# The networkx layouts run on numbered nodes, named back afterward
+	if layout == "kamada":
+		return graph.byName(
+			nx.kamada_kawai_layout(graph.toNetworkx(attributes=False), pos=initial))
+	elif layout == "spring":
+		return graph.byName(nx.spring_layout(
+			graph.toNetworkx(attributes=False), pos=initial, fixed=fixed,
+			iterations=iterations))
+	elif layout == "force":
+		return forceLayout(graph, iterations=iterations, initial=previous)
+	else:
+		raise ValueError("Invalid layout type. Must be 'kamada', 'spring' or "
+										 "'force'.")
+
+
+def compute_partitions() -> tuple[pd.DataFrame | None, dict]:
+	"""
+	Find the communities of the nodes, sweeping over resolutions and seeds if
+	asked to.
+	:return: Report of the sweep (None without sweep) and community of each node.
+	"""
+	if args.sweep:
+		return sweepCommunities(
+			graph,
+			resolutions=[float(value) for value in args.sweep.split(",")],
+			seeds=list(range(args.sweep_seeds if args.sweep_seeds is not None
+											 else 5)),
+			method=args.method or "louvain",
+			parallel=args.parallel,
+			max_workers=args.cores
+		)
+	return None, detectCommunities(
+		graph,
+		method=args.method or "louvain",
+		resolution=args.resolution if args.resolution is not None else 1.0,
+		seed=args.seed if args.seed is not None else 0,
+		parallel=args.parallel
+	)
+
+
+def encode_partitions(result: tuple[pd.DataFrame | None, dict]) -> dict:
+	"""
+	Convert the communities, and the report of the sweep, to arrays.
+	:param result: Report of the sweep and community of each node.
+	:return: Arrays, by name.
+	"""
+	report, communities = result
+	arrays = {"communities": np.array([communities[name] for name in graph.names],
+																		dtype=np.int64)}
+	if report is not None:
+		arrays.update(frameToArrays(report, "report_"))
+	return arrays
+
+
+def decode_partitions(arrays: dict) -> tuple[pd.DataFrame | None, dict]:
+	"""
+	Convert arrays written by encode_partitions back to the communities.
+	:param arrays: Arrays, by name.
+	:return: Report of the sweep and community of each node.
+	"""
+	report = arraysToFrame(arrays, "report_") if "report_columns" in arrays \
+		else None
+	return report, graph.byName(arrays["communities"].tolist())
+
 
 logger.info(
-	f"Calculating node positions for {graph.number_of_nodes()} nodes. "
+	f"Calculating node positions for {graph.numberOfNodes()} nodes. "
 	f"This can take a while...")
-if layout == "kamada":
-	pos = nx.kamada_kawai_layout(graph)
-elif layout == "spring":
-	pos = nx.spring_layout(graph,
-												 iterations=iterations if iterations is not None else 50)
-else:
-	raise ValueError("Invalid layout type. Must be 'kamada' or 'spring'.")
+with measureStage("layout") as counters:
+	_, pos = cache.getOrCompute(
+		"layout",
+		{"layout": layout, "iterations": iterations,
+		 # A changed previous export invalidates the warm-started layout
+		 "warm_start": [args.warm_start, os.path.getmtime(args.warm_start)]
+		 if args.warm_start and os.path.isfile(args.warm_start) else None},
+		graph_key,
+		compute_layout,
+		lambda positions: {"positions": np.array([positions[name]
+																							for name in graph.names])},
+		lambda arrays: graph.byName(arrays["positions"]))
+	counters["rows_out"] += len(pos)
 
 partitions = None
 if louvain is None or louvain:
 	logger.info("Calculating Louvain partitions...")
-	partitions = community_louvain.best_partition(graph)
+	with measureStage("louvain") as counters:
+		_, (report, partitions) = cache.getOrCompute(
+			"partitions",
+			{"method": args.method, "resolution": args.resolution, "seed": args.seed,
+			 "parallel": args.parallel, "sweep": args.sweep,
+			 "sweep_seeds": args.sweep_seeds},
+			graph_key, compute_partitions, encode_partitions, decode_partitions)
+		if report is not None:
+			logger.info("Sweep results:")
+			print(report)
+			if args.sweep_report is not None:
+				report.to_csv(args.sweep_report, index=False)
+		counters["rows_out"] += len(partitions)
 	if save is not None:
-		plotLouvainPartitions(graph, pos, save, partitions)
+		plotLouvainPartitions(graph.toNetworkx(), pos, save, partitions)
 else:
 	if save is not None:
-		plotBasic(graph, pos, save, show_edge_labels=False)
+		plotBasic(graph.toNetworkx(), pos, save, show_edge_labels=False)
 
-exportPlotToJSON(
-	graph,
-	pos,
-	validate_and_extract_params(all_params, ["output"], [""]).get('output'),
-	partitions
-)
+with measureStage("export") as counters:
+	exportGraph(
+		graph,
+		pos,
+		validate_and_extract_params(all_params, ["output"], [""]).get('output'),
+		partitions
+	)
+	counters["rows_in"] += graph.numberOfNodes()
+
+if metrics is not None:
+	metrics.save(args.metrics)
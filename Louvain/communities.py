@@ -0,0 +1,359 @@
+import logging
+
+import numpy as np
+from scipy import sparse
+
+from Louvain.compactGraph import CompactGraph
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+METHODS = ["louvain", "leiden"]
+MIN_GAIN = 1e-7  # Minimum modularity gain for a pass to continue
+MAX_PASSES = 100  # Maximum number of local-move passes per level
+MOVING_SHARE = 0.5  # Share of the improvable nodes moved at each parallel round
+RANDOMNESS = 0.01  # Randomness of the merges of the Leiden refinement
+
+
+def __edge_modularity(
+		rows: np.ndarray, columns: np.ndarray, weights: np.ndarray,
+		degrees: np.ndarray, labels: np.ndarray, resolution: float
+) -> float:
+	"""
+	Computes the modularity of a partition from the edges of the graph.
+	:param rows: First node of each entry of the adjacency matrix.
+	:param columns: Second node of each entry of the adjacency matrix.
+	:param weights: Weight of each entry of the adjacency matrix.
+	:param degrees: Weighted degree of each node.
+	:param labels: Community of each node.
+	:param resolution: Resolution, above 1 favouring smaller communities.
+	:return: Modularity of the partition.
+	"""
+	total = degrees.sum()
+	if not total:
+		return 0.0
+	count = labels.max() + 1
+	row_labels = labels[rows]
+	inside = np.bincount(row_labels, weights=weights * (
+		row_labels == labels[columns]), minlength=count)
+	totals = np.bincount(labels, weights=degrees, minlength=count)
+	return float((inside / total - resolution * (totals / total) ** 2).sum())
+
+
+def modularity(
+		adjacency: sparse.csr_matrix, labels: np.ndarray, resolution: float = 1.0
+) -> float:
+	"""
+	Computes the modularity of a partition of a weighted graph.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param labels: Community of each node.
+	:param resolution: Resolution, above 1 favouring smaller communities.
+	:return: Modularity of the partition.
+	"""
+	coo = adjacency.tocoo()
+	return __edge_modularity(coo.row, coo.col, coo.data,
+													 np.asarray(adjacency.sum(axis=1)).ravel(),
+													 np.asarray(labels), resolution)
+
+
+def __relabel(labels: np.ndarray) -> np.ndarray:
+	"""
+	Number the communities from 0, in order of their first node.
+	:param labels: Community of each node.
+	:return: Renumbered community of each node.
+	"""
+	_, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+	ranks = np.empty(len(first), dtype=np.int64)
+	ranks[np.argsort(first)] = np.arange(len(first))
+	return ranks[inverse]
+
+
+def __aggregate(adjacency: sparse.csr_matrix, labels: np.ndarray) \
+		-> sparse.csr_matrix:
+	"""
+	Collapse the communities of a graph into nodes, the edges inside a community
+	becoming a self-loop.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param labels: Community of each node, numbered from 0.
+	:return: Adjacency matrix of the communities.
+	"""
+	members = sparse.csr_matrix(
+		(np.ones(len(labels)), (np.arange(len(labels)), labels)),
+		shape=(len(labels), labels.max() + 1))
+	return (members.T @ adjacency @ members).tocsr()
+
+
+def __sequential_moves(
+		adjacency: sparse.csr_matrix, labels: np.ndarray, resolution: float,
+		rng: np.random.Generator
+) -> np.ndarray:
+	"""
+	Move the nodes one at a time, in random order, to the community of their
+	neighbours with the highest modularity gain, until no pass improves it.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param labels: Initial community of each node.
+	:param resolution: Resolution of the modularity.
+	:param rng: Random generator of the order of the nodes.
+	:return: Community of each node.
+	"""
+	n = adjacency.shape[0]
+	degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+	total = degrees.sum()
+	indptr, indices, data = (adjacency.indptr.tolist(), adjacency.indices.tolist(),
+													 adjacency.data.tolist())
+	node_degrees = degrees.tolist()
+	totals = np.bincount(labels, weights=degrees, minlength=n).tolist()
+	labels = labels.tolist()
+	current = modularity(adjacency, np.array(labels), resolution)
+
+	for _ in range(MAX_PASSES):
+		moved = 0
+		for node in rng.permutation(n).tolist():
+			community = labels[node]
+			degree = node_degrees[node]
+			weights = {community: 0.0}
+			for position in range(indptr[node], indptr[node + 1]):
+				neighbour = indices[position]
+				if neighbour != node:
+					label = labels[neighbour]
+					weights[label] = weights.get(label, 0.0) + data[position]
+
+			totals[community] -= degree
+			best = community
+			best_gain = (weights[community]
+								 - resolution * degree * totals[community] / total)
+			for label, weight in weights.items():
+				gain = weight - resolution * degree * totals[label] / total
+				if gain > best_gain:
+					best, best_gain = label, gain
+			totals[best] += degree
+			if best != community:
+				labels[node] = best
+				moved += 1
+
+		updated = modularity(adjacency, np.array(labels), resolution)
+		if not moved or updated - current < MIN_GAIN:
+			break
+		current = updated
+	return np.array(labels, dtype=np.int64)
+
+
+def __parallel_moves(
+		adjacency: sparse.csr_matrix, labels: np.ndarray, resolution: float,
+		rng: np.random.Generator
+) -> np.ndarray:
+	"""
+	Move the nodes all at once, each to the community of its neighbours with the
+	highest modularity gain, as vectorized rounds over the edges. Only a random
+	share of the improvable nodes moves at each round, for neighbours not to
+	swap their communities endlessly.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param labels: Initial community of each node.
+	:param resolution: Resolution of the modularity.
+	:param rng: Random generator of the moving nodes.
+	:return: Community of each node.
+	"""
+	n = adjacency.shape[0]
+	degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+	total = degrees.sum()
+	# Self-loops stay with their node
+	links = (adjacency - sparse.diags(adjacency.diagonal())).tocsr()
+	links.eliminate_zeros()
+	linked = np.flatnonzero(np.diff(links.indptr))
+	if not len(linked):
+		return labels
+	coo = adjacency.tocoo()
+	edges = (coo.row, coo.col, coo.data, degrees)
+
+	labels = labels.copy()
+	current = __edge_modularity(*edges, labels, resolution)
+	share = MOVING_SHARE
+	for _ in range(MAX_PASSES):
+		totals = np.bincount(labels, weights=degrees, minlength=n)
+		# Weight of each node to each community of its neighbours, row by row
+		weights = (links @ sparse.csr_matrix(
+			(np.ones(n), (np.arange(n), labels)), shape=(n, n))).tocsr()
+		nodes = np.repeat(np.arange(n), np.diff(weights.indptr))
+		communities = weights.indices
+		own = labels[nodes] == communities
+		gains = weights.data - resolution * degrees[nodes] * (
+			totals[communities] - np.where(own, degrees[nodes], 0)) / total
+
+		stay = -resolution * degrees * (totals[labels] - degrees) / total
+		stay[nodes[own]] = gains[own]
+		maxima = np.maximum.reduceat(gains, weights.indptr[linked])
+		# First community of each node reaching its maximum gain
+		reaching = np.flatnonzero(
+			gains == np.repeat(maxima, np.diff(weights.indptr)[linked]))
+		first = reaching[np.append(True,
+															 nodes[reaching][1:] != nodes[reaching][:-1])]
+		best = labels.copy()
+		best[nodes[first]] = communities[first]
+		improvable = np.zeros(n, dtype=bool)
+		improvable[linked] = maxima > stay[linked] + 1e-12 * total
+		improvable &= best != labels
+		if not improvable.any():
+			break
+
+		# Moves are only kept when they improve the modularity, fewer nodes
+		# moving at once otherwise (a single move always improves it)
+		moving = improvable & (rng.random(n) < share)
+		if not moving.any():
+			moving[rng.choice(np.flatnonzero(improvable))] = True
+		moved = labels.copy()
+		moved[moving] = best[moving]
+		updated = __edge_modularity(*edges, moved, resolution)
+		if updated > current:
+			labels, current, gain = moved, updated, updated - current
+			share = min(MOVING_SHARE, share * 2)
+			if gain < MIN_GAIN:
+				break
+		else:
+			share /= 2
+	return labels
+
+
+def __refine(
+		adjacency: sparse.csr_matrix, communities: np.ndarray, resolution: float,
+		rng: np.random.Generator
+) -> np.ndarray:
+	"""
+	Leiden refinement: split each community into well-connected subcommunities,
+	starting from single nodes and merging the nodes well connected to their
+	community into subcommunities themselves well connected to it, chosen at
+	random favouring the highest modularity gains.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param communities: Community of each node.
+	:param resolution: Resolution of the modularity.
+	:param rng: Random generator of the order of the nodes and of the merges.
+	:return: Subcommunity of each node.
+	"""
+	n = adjacency.shape[0]
+	degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+	total = degrees.sum()
+	coo = adjacency.tocoo()
+	inside = (communities[coo.row] == communities[coo.col]) & (coo.row != coo.col)
+	# Weight of each subcommunity to the rest of its community
+	outside = np.bincount(coo.row[inside], weights=coo.data[inside],
+												minlength=n).tolist()
+	community_totals = np.bincount(communities, weights=degrees).tolist()
+	indptr, indices, data = (adjacency.indptr.tolist(), adjacency.indices.tolist(),
+													 adjacency.data.tolist())
+	node_degrees = degrees.tolist()
+	communities = communities.tolist()
+	refined = list(range(n))
+	refined_totals = list(node_degrees)
+	sizes = [1] * n
+
+	for node in rng.permutation(n).tolist():
+		if sizes[refined[node]] > 1:
+			continue
+		community = communities[node]
+		degree = node_degrees[node]
+		rest = community_totals[community]
+		if outside[node] < resolution * degree * (rest - degree) / total:
+			continue
+
+		weights = {}
+		for position in range(indptr[node], indptr[node + 1]):
+			neighbour = indices[position]
+			if neighbour != node and communities[neighbour] == community:
+				label = refined[neighbour]
+				weights[label] = weights.get(label, 0.0) + data[position]
+		candidates, gains = [], []
+		for label, weight in weights.items():
+			size = refined_totals[label]
+			if outside[label] >= resolution * size * (rest - size) / total:
+				gain = weight - resolution * degree * size / total
+				if gain >= 0:
+					candidates.append(label)
+					gains.append(gain)
+		if not candidates:
+			continue
+
+		gains = np.array(gains)
+		chances = np.exp((gains - gains.max()) / RANDOMNESS)
+		label = candidates[rng.choice(len(candidates), p=chances / chances.sum())]
+		refined[node] = label
+		refined_totals[label] += degree
+		sizes[label] += 1
+		outside[label] += outside[node] - 2 * weights[label]
+	return np.array(refined, dtype=np.int64)
+
+
+def findCommunities(
+		adjacency: sparse.csr_matrix, method: str = "louvain",
+		resolution: float = 1.0, seed: int = None, parallel: bool = False
+) -> np.ndarray:
+	"""
+	Partitions a weighted graph into communities maximizing its modularity, with
+	the Louvain or the Leiden algorithm: nodes are moved between communities,
+	then the communities are collapsed into nodes, until nothing moves. Leiden
+	refines the communities before collapsing them, so that they stay connected.
+	:param adjacency: Symmetric adjacency matrix of the graph, in CSR format.
+	:param method: "louvain" or "leiden".
+	:param resolution: Resolution of the modularity, above 1 favouring smaller
+	communities.
+	:param seed: Seed of the random order of the moves, for the same partition
+	to be found on every run.
+	:param parallel: Whether to move the nodes all at once with vectorized
+	rounds (faster on large graphs), or one at a time.
+	:return: Community of each node, numbered from 0.
+	"""
+	if method not in METHODS:
+		raise ValueError(f"Invalid method {method}. Must be one of {METHODS}.")
+	rng = np.random.default_rng(seed)
+	moves = __parallel_moves if parallel else __sequential_moves
+	adjacency = sparse.csr_matrix(adjacency, dtype=np.float64)
+	n = adjacency.shape[0]
+	if not n:
+		return np.array([], dtype=np.int64)
+
+	# Node of the current level of each node of the graph
+	members = np.arange(n)
+	labels = np.arange(n)
+	while True:
+		labels = __relabel(moves(adjacency, labels, resolution, rng))
+		count = labels.max() + 1
+		if count == adjacency.shape[0]:
+			break
+		if method == "leiden":
+			refined = __relabel(__refine(adjacency, labels, resolution, rng))
+			if refined.max() + 1 == adjacency.shape[0]:
+				break
+			# Subcommunities start in the community they were refined from
+			starts = np.empty(refined.max() + 1, dtype=np.int64)
+			starts[refined] = labels
+			members = refined[members]
+			adjacency = __aggregate(adjacency, refined)
+			labels = starts
+		else:
+			members = labels[members]
+			adjacency = __aggregate(adjacency, labels)
+			labels = np.arange(count)
+	return __relabel(labels[members])
+
+
+def detectCommunities(
+		graph: CompactGraph, method: str = "louvain", resolution: float = 1.0,
+		seed: int = None, parallel: bool = False
+) -> dict:
+	"""
+	Partitions the graph into communities, see findCommunities.
+	:param graph: The bipartite graph to partition.
+	:param method: "louvain" or "leiden".
+	:param resolution: Resolution of the modularity, above 1 favouring smaller
+	communities.
+	:param seed: Seed of the random order of the moves.
+	:param parallel: Whether to move the nodes all at once with vectorized
+	rounds, or one at a time.
+	:return: Community of each node, by name.
+	"""
+	adjacency = graph.adjacency
+	labels = findCommunities(adjacency, method, resolution, seed, parallel)
+	logger.info(f"Found {labels.max() + 1 if len(labels) else 0} communities "
+							f"with {method}, modularity "
+							f"{modularity(adjacency, labels, resolution):.4f}")
+	return graph.byName(labels.tolist())
@@ -0,0 +1,152 @@
+import logging
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NODE_TYPES = ["player", "opening"]  # Type of the nodes, by bipartite set
+
+
+class CompactGraph:
+	"""
+	Bipartite graph of players and openings stored as arrays: nodes are numbered
+	(players first, then openings), their attributes are arrays indexed by node
+	and the edges are arrays of node numbers with their weights. The sparse
+	adjacency matrices and the networkx view are only built when asked for.
+	"""
+
+	def __init__(
+			self, names: np.ndarray, bipartite: np.ndarray, elo: np.ndarray,
+			play_count: np.ndarray, sources: np.ndarray, targets: np.ndarray,
+			weights: np.ndarray
+	):
+		"""
+		:param names: Name of each node.
+		:param bipartite: Set of each node, 0 for players and 1 for openings.
+		:param elo: Elo of each node, the maximum Elo of a player or the average
+		Elo of the players of an opening.
+		:param play_count: Number of games of each node, -1 for the openings with
+		no games of their own (only linking their variations).
+		:param sources: First node of each edge.
+		:param targets: Second node of each edge.
+		:param weights: Weight of each edge.
+		"""
+		self.names = np.asarray(names, dtype=object)
+		self.bipartite = np.asarray(bipartite, dtype=np.int8)
+		self.elo = np.asarray(elo, dtype=np.float64)
+		self.playCount = np.asarray(play_count, dtype=np.int64)
+		self.sources = np.asarray(sources, dtype=np.int32)
+		self.targets = np.asarray(targets, dtype=np.int32)
+		self.weights = np.asarray(weights, dtype=np.float64)
+		self.__index = None
+		self.__view = None
+
+	def numberOfNodes(self) -> int:
+		"""
+		:return: Number of nodes of the graph.
+		"""
+		return len(self.names)
+
+	def numberOfEdges(self) -> int:
+		"""
+		:return: Number of edges of the graph.
+		"""
+		return len(self.sources)
+
+	@property
+	def index(self) -> pd.Index:
+		"""
+		:return: Index of the node names, giving the number of a node.
+		"""
+		if self.__index is None:
+			self.__index = pd.Index(self.names)
+		return self.__index
+
+	@property
+	def players(self) -> np.ndarray:
+		"""
+		:return: Numbers of the player nodes.
+		"""
+		return np.flatnonzero(self.bipartite == 0)
+
+	@property
+	def adjacency(self) -> sparse.csr_matrix:
+		"""
+		:return: Symmetric weighted adjacency matrix of the nodes, in CSR format.
+		"""
+		n = self.numberOfNodes()
+		return sparse.csr_matrix(
+			(np.concatenate([self.weights, self.weights]),
+			 (np.concatenate([self.sources, self.targets]),
+				np.concatenate([self.targets, self.sources]))),
+			shape=(n, n))
+
+	@property
+	def biadjacency(self) -> sparse.csr_matrix:
+		"""
+		:return: Weighted biadjacency matrix of the player-opening edges, with a
+		row per player and a column per opening, in CSR format.
+		"""
+		players = self.players
+		openings = np.flatnonzero(self.bipartite == 1)
+		rows = np.full(self.numberOfNodes(), -1, dtype=np.int64)
+		rows[players] = np.arange(len(players))
+		columns = np.full(self.numberOfNodes(), -1, dtype=np.int64)
+		columns[openings] = np.arange(len(openings))
+
+		# Edges are stored in either direction
+		player_sources = self.bipartite[self.sources] == 0
+		player_nodes = np.where(player_sources, self.sources, self.targets)
+		opening_nodes = np.where(player_sources, self.targets, self.sources)
+		edges = self.bipartite[self.sources] != self.bipartite[self.targets]
+		return sparse.csr_matrix(
+			(self.weights[edges],
+			 (rows[player_nodes[edges]], columns[opening_nodes[edges]])),
+			shape=(len(players), len(openings)))
+
+	def toNetworkx(self, attributes: bool = True) -> nx.Graph:
+		"""
+		Build a networkx view of the graph, kept for the next calls.
+		:param attributes: Whether to name the nodes and give them their
+		attributes, the nodes being numbered without attributes otherwise (faster
+		to build, for the layout and partitioning).
+		:return: Undirected graph with the same nodes and weighted edges.
+		"""
+		if not attributes:
+			graph = nx.Graph()
+			graph.add_nodes_from(range(self.numberOfNodes()))
+			graph.add_weighted_edges_from(zip(self.sources.tolist(),
+																				self.targets.tolist(),
+																				self.weights.tolist()))
+			return graph
+
+		if self.__view is None:
+			self.__view = nx.Graph()
+			self.__view.add_nodes_from(
+				(name, {"bipartite": bipartite, "type": NODE_TYPES[bipartite],
+								"elo": elo, "play_count": play_count} if play_count >= 0 else
+				 {"bipartite": bipartite, "type": NODE_TYPES[bipartite]})
+				for name, bipartite, elo, play_count in zip(
+					self.names, self.bipartite.tolist(), self.elo.tolist(),
+					self.playCount.tolist()))
+			self.__view.add_weighted_edges_from(zip(self.names[self.sources],
+																							self.names[self.targets],
+																							self.weights.tolist()))
+		return self.__view
+
+	def byName(self, values: dict | np.ndarray) -> dict:
+		"""
+		Name the nodes of a result computed on the numbered nodes (e.g. positions
+		or partitions of the view without attributes).
+		:param values: Values by node number, as a dictionary or an array.
+		:return: Values by node name.
+		"""
+		if isinstance(values, dict):
+			return {self.names[node]: value for node, value in values.items()}
+		return dict(zip(self.names, values))
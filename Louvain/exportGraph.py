@@ -0,0 +1,224 @@
+import gzip
+import json
+import logging
+from collections import Counter
+from typing import Iterator, TextIO
+
+import numpy as np
+import pandas as pd
+
+from Louvain.compactGraph import CompactGraph, NODE_TYPES
+from Louvain.resultCache import arraysToGraph, frameToArrays, graphToArrays
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000  # Number of nodes or edges formatted per write
+SEPARATORS = (",", ":")  # Compact JSON, without spaces
+GZIP_LEVEL = 6  # Compression level of gzip, 9 being much slower for little gain
+
+
+def __require_zstandard() -> None:
+	"""
+	Check that the optional zstandard package is installed.
+	"""
+	if zstandard is None:
+		raise ImportError("The zstandard package is required to use .zst files")
+
+
+def __open_text(path: str, mode: str) -> TextIO:
+	"""
+	Open a JSON file, compressed with gzip or zstd depending on its extension.
+	:param path: Path to the file, ending with .gz or .zst if compressed.
+	:param mode: "r" to read or "w" to write.
+	:return: Text file.
+	"""
+	if path.endswith(".gz"):
+		return gzip.open(path, mode + "t", compresslevel=GZIP_LEVEL,
+										 encoding="utf-8")
+	if path.endswith(".zst"):
+		__require_zstandard()
+		return zstandard.open(path, mode + "t", encoding="utf-8")
+	return open(path, mode, encoding="utf-8")
+
+
+def __write_list(file: TextIO, records: Iterator[str]) -> None:
+	"""
+	Write JSON values as a list, a batch at a time.
+	:param file: File to write to.
+	:param records: JSON of each value.
+	"""
+	file.write("[")
+	batch, first = [], True
+	for record in records:
+		batch.append(record)
+		if len(batch) == BATCH_SIZE:
+			file.write(("" if first else ",") + ",".join(batch))
+			batch, first = [], False
+	if batch:
+		file.write(("" if first else ",") + ",".join(batch))
+	file.write("]")
+
+
+def __partition_summary(
+		graph: CompactGraph, communities: np.ndarray
+) -> list[dict]:
+	"""
+	Summarize the partitions as getPartitionSummary does, from the arrays of the
+	graph instead of its networkx view.
+	:param graph: The bipartite graph.
+	:param communities: Community of each node.
+	:return: Summary of each community, in the order of their first node.
+	"""
+	order = np.argsort(communities, kind="stable")
+	starts = np.flatnonzero(np.append(True, np.diff(communities[order]) != 0))
+	groups = np.split(order, starts[1:])
+	groups.sort(key=lambda members: members[0])
+
+	summary = []
+	for members in groups:
+		players = members[graph.bipartite[members] == 0]
+		openings = members[graph.bipartite[members] == 1]
+		families = Counter(str(name).split(':')[0]
+											 for name in graph.names[openings])
+		summary.append({
+			"id": int(communities[members[0]]),
+			"main_opening": families.most_common(1)[0][0] if families else None,
+			"player_count": len(players),
+			"players": graph.names[players].tolist(),
+			"variation_count": len(openings) if len(openings) else None,
+			"variations": graph.names[openings].tolist(),
+			"average_max_elo": round(sum(graph.elo[players].tolist()) / len(players),
+															 1) if len(players) else None,
+			"total_play_count": int(np.maximum(graph.playCount[openings], 0).sum())
+		})
+	return summary
+
+
+def __node_records(
+		graph: CompactGraph, names: list[str], positions: np.ndarray,
+		communities: list[int] | None
+) -> Iterator[str]:
+	"""
+	Format the nodes as exportPlotToJSON does.
+	:param graph: The bipartite graph.
+	:param names: JSON of the name of each node.
+	:param positions: Position of each node, (n, 2).
+	:param communities: Community of each node, None without partitions.
+	:return: JSON of each node.
+	"""
+	community = "null"
+	for node, (name, bipartite, (x, y), elo, play_count) in enumerate(zip(
+			names, graph.bipartite.tolist(), positions.tolist(), graph.elo.tolist(),
+			graph.playCount.tolist())):
+		if communities is not None:
+			community = communities[node]
+		# Openings linking variations only have no Elo nor play count
+		attributes = f'"elo":{json.dumps(elo)},"play_count":{play_count}' \
+			if play_count >= 0 else '"elo":null,"play_count":null'
+		yield (f'{{"id":{name},"type":"{NODE_TYPES[bipartite]}",'
+					 f'"position":{{"x":{x!r},"y":{y!r}}},"community":{community},'
+					 f'{attributes}}}')
+
+
+def __edge_records(graph: CompactGraph, names: list[str]) -> Iterator[str]:
+	"""
+	Format the edges as exportPlotToJSON does.
+	:param graph: The bipartite graph.
+	:param names: JSON of the name of each node.
+	:return: JSON of each edge.
+	"""
+	for source, target, weight in zip(graph.sources.tolist(),
+																		graph.targets.tolist(),
+																		graph.weights.tolist()):
+		yield (f'{{"source":{names[source]},"target":{names[target]},'
+					 f'"weight":{weight!r}}}')
+
+
+def exportGraph(
+		graph: CompactGraph, pos: dict, output_file: str, partitions: dict = None
+) -> None:
+	"""
+	Exports the graph, the positions of its nodes and their communities, in a
+	format given by the extension of the output file:
+	- .npz: columnar NumPy archive, with the arrays of the graph (names as UTF-8
+	bytes and end offsets, bipartite, elo, play_count, sources, targets and
+	weights), the positions (n, 2), the community of each node (-1 without
+	partitions) and the summary of the partitions (partition_ prefixed columns).
+	- .gz or .zst: the JSON of exportPlotToJSON, compressed with gzip or zstd (the
+	latter requiring the zstandard package).
+	- anything else: the JSON of exportPlotToJSON.
+	The JSON is compact and streamed node by node and edge by edge from the
+	arrays of the graph, without building the metadata in memory.
+	:param graph: The bipartite graph to be exported.
+	:param pos: The positions of the nodes by name.
+	:param output_file: Path to the output file.
+	:param partitions: Community of each node by name (optional).
+	"""
+	logger.info(f"Exporting the graph to {output_file}...")
+	positions = np.array([pos[name] for name in graph.names],
+											 dtype=np.float64).reshape(-1, 2)
+	communities = np.array([partitions[name] for name in graph.names],
+												 dtype=np.int64) if partitions else None
+	summary = __partition_summary(graph, communities) \
+		if communities is not None and len(communities) else []
+
+	if output_file.endswith(".npz"):
+		arrays = graphToArrays(graph)
+		arrays["positions"] = positions
+		arrays["communities"] = communities if communities is not None else \
+			np.full(graph.numberOfNodes(), -1, dtype=np.int64)
+		arrays.update(frameToArrays(
+			pd.DataFrame(summary, columns=["id", "main_opening", "player_count",
+																		 "variation_count", "average_max_elo",
+																		 "total_play_count"]), "partition_"))
+		with open(output_file, "wb") as file:
+			np.savez(file, **arrays)
+	else:
+		names = [json.dumps(name) for name in graph.names.tolist()]
+		with __open_text(output_file, "w") as file:
+			file.write('{"partitions":')
+			if summary:
+				__write_list(file, (json.dumps(partition, separators=SEPARATORS)
+														for partition in summary))
+			else:
+				file.write("[{}]")
+			file.write(',"nodes":')
+			__write_list(file, __node_records(
+				graph, names, positions,
+				communities.tolist() if communities is not None else None))
+			file.write(',"edges":')
+			__write_list(file, __edge_records(graph, names))
+			file.write("}")
+
+	logger.info(f"Exported {graph.numberOfNodes()} nodes and "
+							f"{graph.numberOfEdges()} edges to {output_file}")
+
+
+def loadPlotPositions(input_file: str) -> dict:
+	"""
+	Reads the positions of the nodes back from a file written by exportGraph or
+	exportPlotToJSON, e.g. to warm-start the next layout.
+	:param input_file: Path to the exported file (.npz, .json, .gz or .zst).
+	:return: Position (x, y) of each node by id, empty if the file is unreadable.
+	"""
+	try:
+		if input_file.endswith(".npz"):
+			with np.load(input_file, allow_pickle=False) as archive:
+				arrays = {name: archive[name] for name in archive.files}
+			return dict(zip(arraysToGraph(arrays).names,
+											map(tuple, arrays["positions"].tolist())))
+		with __open_text(input_file, "r") as json_file:
+			metadata = json.load(json_file)
+		return {node["id"]: (node["position"]["x"], node["position"]["y"])
+						for node in metadata["nodes"]}
+	except (OSError, ValueError, KeyError, TypeError) as e:
+		logger.error(f"Error reading positions from {input_file}: {e}")
+		return {}
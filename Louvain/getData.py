@@ -1,10 +1,14 @@
 import logging
 
 import networkx as nx
+import numpy as np
 import psycopg
 import pandas as pd
-from psycopg.sql import SQL, Identifier
+from psycopg.sql import SQL, Identifier, Literal
 from collections import Counter, defaultdict
+from tqdm import tqdm
+
+from Louvain.compactGraph import CompactGraph
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO,
@@ -31,10 +35,132 @@ SQLQuery = """
               AND (COUNT(*)::decimal / pg.total_games) >= {min_percent} 
 					 """
 
+# Kinds of the fetched columns, by PostgreSQL type name
+COLUMN_KINDS = {"text": "string", "varchar": "string", "bpchar": "string",
+								"int2": "integer", "int4": "integer", "int8": "integer",
+								"numeric": "float", "float4": "float", "float8": "float"}
+
+# Same data read from the counts maintained by the triggers of the games table
+CountsQuery = """
+           WITH player_games AS (SELECT player     AS player_id,
+                                        SUM(n)     AS total_games
+                                 FROM player_opening_counts
+                                 WHERE color = {color}
+                                 GROUP BY player)
+           SELECT p.name            AS player_name,
+                  p.max_elo         AS player_elo,
+                  o.name            AS opening_name,
+                  SUM(c.n)::bigint  AS times_played,
+                  ROUND((SUM(c.n)::decimal / pg.total_games),2)  AS percentage_played
+           FROM player_opening_counts c
+                    JOIN players p ON p.id = c.player
+                    JOIN public.openings o ON o.id = c.opening
+                    JOIN player_games pg ON c.player = pg.player_id
+           WHERE c.color = {color}
+           GROUP BY p.name, p.max_elo, o.name, pg.total_games
+           HAVING SUM(c.n) >= {min_count}
+              AND (SUM(c.n)::decimal / pg.total_games) >= {min_percent}
+					 """
+
+
+def __decode_column(
+		values: tuple, kind: str, dictionary: dict
+) -> np.ndarray:
+	"""
+	Decode the values of a column in a batch of rows into a typed array.
+	:param values: Values of the column.
+	:param kind: Kind of the column, see COLUMN_KINDS.
+	:param dictionary: Codes of the strings already decoded in the column, to
+	which the new strings are added.
+	:return: Codes of the strings (-1 for NULL), integers, or floats (NaN for
+	NULL, integers with NULL values being floats too).
+	"""
+	if kind == "string":
+		return np.fromiter(
+			(-1 if value is None else dictionary.setdefault(value, len(dictionary))
+			 for value in values), dtype=np.int32, count=len(values))
+	if kind == "integer" and None not in values:
+		return np.array(values, dtype=np.int64)
+	return np.array(values, dtype=float)
+
+
+def __counts_available(cursor: psycopg.Cursor) -> bool:
+	"""
+	Check that the player_opening_counts table can be read instead of the games:
+	it exists, and it is filled unless there are no games (e.g. the table was
+	created on an existing database without being refreshed).
+	:param cursor: Cursor of the connection to the database.
+	:return: True if the counts are up to date with the games.
+	"""
+	if not cursor.execute(
+			"SELECT to_regclass('player_opening_counts') IS NOT NULL").fetchone()[0]:
+		return False
+	return cursor.execute(
+		"SELECT EXISTS (SELECT 1 FROM player_opening_counts) "
+		"OR NOT EXISTS (SELECT 1 FROM games)").fetchone()[0]
+
+
+def __fetch_columns(
+		cursor: psycopg.Cursor, batch_size: int, max_rows: int = None,
+		progress: bool = False
+) -> pd.DataFrame:
+	"""
+	Fetch the result of an executed query in batches, each batch being decoded
+	into typed arrays before the next one is fetched. Strings are stored once per
+	distinct value, and never more than a batch of rows is held as tuples.
+	:param cursor: Cursor on which the query was executed (server-side to stream
+	the result).
+	:param batch_size: Number of rows fetched at once.
+	:param max_rows: Maximum number of rows to fetch (optional).
+	:param progress: Show the number of rows fetched.
+	:return: DataFrame of the result: strings as objects, integers as int64
+	(float64 when NULL values are present) and other numbers as float64.
+	"""
+	names = [description.name for description in cursor.description]
+	kinds = [COLUMN_KINDS.get(getattr(psycopg.postgres.types.get(
+		description.type_code), "name", None), "object")
+		for description in cursor.description]
+	dictionaries = [{} for _ in names]
+	batches = [[] for _ in names]
+
+	fetched = 0
+	with tqdm(desc="Fetching rows", unit=" rows", disable=not progress) as bar:
+		while max_rows is None or fetched < max_rows:
+			rows = cursor.fetchmany(batch_size if max_rows is None
+															else min(batch_size, max_rows - fetched))
+			if not rows:
+				break
+			for index, values in enumerate(zip(*rows)):
+				if kinds[index] == "object":
+					batches[index].append(np.array(values, dtype=object))
+				else:
+					batches[index].append(
+						__decode_column(values, kinds[index], dictionaries[index]))
+			fetched += len(rows)
+			bar.update(len(rows))
+	if max_rows is not None and fetched == max_rows:
+		logger.warning(f"Fetched the first {max_rows} rows only.")
+
+	columns = {}
+	for name, kind, dictionary, arrays in zip(names, kinds, dictionaries,
+																						 batches):
+		if kind == "string":
+			codes = np.concatenate(arrays) if arrays else np.empty(0, np.int32)
+			columns[name] = np.append(np.array(list(dictionary), dtype=object),
+																None)[codes]
+		elif kind == "integer" and any(array.dtype == float for array in arrays):
+			columns[name] = np.concatenate(arrays).astype(float)
+		else:
+			columns[name] = np.concatenate(arrays) if arrays else np.empty(
+				0, dtype=object if kind == "object" else
+				np.int64 if kind == "integer" else float)
+	return pd.DataFrame(columns, columns=names)
+
 
 def getPlayersOpenings(
 		connection_params: dict, color: str, min_games: int = 100, 
-		min_percent: float = 0.01
+		min_percent: float = 0.01, use_counts: bool = True,
+		batch_size: int = 100000, max_rows: int = None, progress: bool = False
 ) -> pd.DataFrame:
 	"""
 	Fetches player-opening data based on the specified color (white or black).
@@ -43,7 +169,14 @@ def getPlayersOpenings(
 	:param color: The color to filter by ('white' or 'black').
 	:param min_games: Minimum number of games played by a player to be included.
 	:param min_percent: Minimum percentage of games played with an opening to be included.
-	:return: DataFrame containing player-opening data.
+	:param use_counts: Read the player_opening_counts table when it exists and is
+	filled instead of aggregating the games table, which takes the same time
+	whatever the number of games. Games without an opening are not counted in the
+	percentages.
+	:param batch_size: Number of rows streamed from the server at once.
+	:param max_rows: Maximum number of rows to fetch (optional).
+	:param progress: Show the number of rows fetched.
+	:return: DataFrame containing player-opening data, with typed columns.
 	"""
 	
 	logger.info("Fetching player-opening data...")
@@ -54,98 +187,184 @@ def getPlayersOpenings(
 	try:
 		with psycopg.connect(**connection_params) as conn:
 			with conn.cursor() as cursor:
-				from_query = SQL(SQLQuery).format(color=Identifier(color),
-																					min_count=min_games,
-																					min_percent=min_percent)
+				if use_counts and __counts_available(cursor):
+					from_query = SQL(CountsQuery).format(color=Literal(color[0].upper()),
+																							 min_count=min_games,
+																							 min_percent=min_percent)
+				else:
+					if use_counts:
+						logger.warning("No player_opening_counts table or empty table, "
+													 "aggregating the games instead.")
+					from_query = SQL(SQLQuery).format(color=Identifier(color),
+																						min_count=min_games,
+																						min_percent=min_percent)
 
+			# The result is streamed from a server-side cursor, batch by batch
+			with conn.cursor(name="player_openings") as cursor:
 				cursor.execute(from_query)
-				result = cursor.fetchall()
-				
+				data = __fetch_columns(cursor, batch_size, max_rows, progress)
+
 				logger.info("Finished fetching player-opening data.")
-				
-				return pd.DataFrame(result,
-														columns=[desc[0] for desc in cursor.description])
+
+				return data
 	except Exception as e:
 		logger.error(f"Error fetching data: {e}")
 		return pd.DataFrame()
 
 
-def getNetworkGraph(data: pd.DataFrame, weighted: bool) -> nx.Graph:
+def getDatabaseWatermark(connection_params: dict) -> str | None:
+	"""
+	Get a watermark of the games in the database, changing whenever games are
+	added or removed: their number and the date of the latest one.
+
+	:param connection_params: Dictionary containing database connection parameters.
+	:return: Watermark of the games, None when the database cannot be read.
+	"""
+	try:
+		with psycopg.connect(**connection_params) as conn:
+			count, latest = conn.execute(
+				"SELECT COUNT(*), MAX(date_time) FROM games").fetchone()
+			return f"{count}:{latest}"
+	except Exception as e:
+		logger.error(f"Error fetching the database watermark: {e}")
+		return None
+
+
+def getCompactGraph(
+		data: pd.DataFrame, weighted: bool, all_ancestors: bool = False
+) -> CompactGraph:
+	"""
+	Generates a bipartite graph from the given data, as arrays of integer-coded
+	nodes and edges.
+	:param data: DataFrame containing opening percentage per player data.
+	:param weighted: Boolean indicating whether to add weighted edges between 
+	openings. if false the weight will be 1.
+	:param all_ancestors: Whether to link each opening to all the openings it is
+	a variation of, or only to the closest one.
+	:return: Bipartite graph with players and openings as nodes.
+	"""
+	player_codes, players = pd.factorize(data["player_name"])
+	opening_codes, openings = pd.factorize(data["opening_name"])
+	times_played = data["times_played"].to_numpy(dtype=np.int64)
+	elo = data["player_elo"].to_numpy(dtype=np.float64)
+
+	# Player nodes, with the Elo of their last row
+	player_elo = np.full(len(players), np.nan)
+	player_elo[player_codes] = elo
+	player_count = np.bincount(player_codes, weights=times_played,
+														 minlength=len(players)).astype(np.int64)
+
+	# Opening nodes, with the average Elo of their players
+	opening_count = np.bincount(opening_codes, weights=times_played,
+															minlength=len(openings)).astype(np.int64)
+	rated = ~np.isnan(elo)
+	with np.errstate(invalid="ignore", divide="ignore"):
+		opening_elo = np.round(
+			np.bincount(opening_codes[rated], weights=elo[rated],
+									minlength=len(openings)) /
+			np.bincount(opening_codes[rated], minlength=len(openings)), 1)
+
+	prefixes, children, parents, hierarchy_weights = __opening_hierarchy(
+		openings, opening_count, weighted, all_ancestors)
+	opening_nodes = openings.append(pd.Index(prefixes, dtype=object))
+
+	# Edges between players and openings with weights (percentages), then
+	# between openings and the openings they are a variation of
+	offset = len(players)
+	graph = CompactGraph(
+		names=np.concatenate([players.to_numpy(dtype=object),
+													opening_nodes.to_numpy(dtype=object)]),
+		bipartite=np.repeat([0, 1], [len(players), len(opening_nodes)]),
+		elo=np.concatenate([player_elo, opening_elo, np.full(len(prefixes), np.nan)]),
+		play_count=np.concatenate([player_count, opening_count,
+															 np.full(len(prefixes), -1)]),
+		sources=np.concatenate([player_codes, offset + children]),
+		targets=np.concatenate([offset + opening_codes, offset + parents]),
+		weights=np.concatenate([data["percentage_played"].to_numpy(dtype=np.float64),
+														hierarchy_weights]))
+	logger.info(f"Created a graph of {graph.numberOfNodes()} nodes and "
+							f"{graph.numberOfEdges()} edges")
+	return graph
+
+
+def getNetworkGraph(
+		data: pd.DataFrame, weighted: bool, all_ancestors: bool = False
+) -> nx.Graph:
 	"""
 	Generates a bipartite graph from the given data.
 	:param data: DataFrame containing opening percentage per player data.
 	:param weighted: Boolean indicating whether to add weighted edges between 
 	openings. if false the weight will be 1.
+	:param all_ancestors: Whether to link each opening to all the openings it is
+	a variation of, or only to the closest one.
 	:return: Bipartite graph with players and openings as nodes.
 	"""
+	return getCompactGraph(data, weighted, all_ancestors).toNetworkx()
+
+
+def __opening_ancestors(opening: str) -> list[str]:
+	"""
+	Get the openings an opening is a variation of, following the Lichess naming
+	(e.g. "Sicilian Defense: Najdorf Variation, English Attack" is a
+	sub-variation of "Sicilian Defense: Najdorf Variation", itself a variation
+	of the "Sicilian Defense" family).
+	:param opening: Name of the opening.
+	:return: Names of its ancestors, the closest first.
+	"""
+	colon = opening.find(':')
+	if colon < 0:
+		return []
+	commas = [i for i in range(len(opening) - 1, colon, -1) if opening[i] == ',']
+	return [opening[:i] for i in commas] + [opening[:colon]]
+
+
+def __opening_hierarchy(
+		openings: pd.Index, play_count: np.ndarray, weighted: bool,
+		all_ancestors: bool
+) -> tuple[list[str], np.ndarray, np.ndarray, np.ndarray]:
+	"""
+	Find the edges between the openings and the openings they are a variation
+	of (family, then ':' variation, then ',' sub-variations), adding the missing
+	ones. The weight of an edge is the share of the games of the parent and its
+	variations played in the child and its variations.
+
+	:param openings: Names of the opening nodes.
+	:param play_count: Number of games of each opening.
+	:param weighted: Whether to weight the edges, their weight being 1 otherwise.
+	:param all_ancestors: Whether to link the openings to all their ancestors,
+	or only to the closest one.
+	:return: Names of the added openings, positions of the variations and of
+	their parents among the openings followed by the added ones, and weights of
+	the edges.
+	"""
+	chains = [__opening_ancestors(opening) for opening in openings]
+	known = set(openings)
+	added = list(dict.fromkeys(ancestor for chain in chains for ancestor in chain
+														 if ancestor not in known))
+	nodes = openings.append(pd.Index(added, dtype=object))
+	chains += [__opening_ancestors(opening) for opening in added]
+	lengths = np.fromiter(map(len, chains), dtype=np.int64, count=len(chains))
+
+	# Games of each node and its variations, summed over every ancestor at once
+	own = lengths[:len(openings)] + 1
+	members = nodes.get_indexer(pd.Index(
+		[name for opening, chain in zip(openings, chains) for name in [opening, *chain]],
+		dtype=object))
+	totals = np.bincount(members, weights=np.repeat(play_count, own),
+											 minlength=len(nodes))
 
-	B = nx.Graph()
-
-	# Add player nodes
-	players = data[["player_name", "player_elo"]].drop_duplicates()
-	play_count = data.groupby("player_name")["times_played"].sum()
-	B.add_nodes_from(
-			(row["player_name"], {"bipartite": 0, "type": "player", "elo": row[
-				"player_elo"], "play_count": int(play_count[row["player_name"]])})
-			for _, row in players.iterrows()
-	)
-
-	# Add opening nodes
-	openings = data["opening_name"].unique()
-	play_count = data.groupby("opening_name")["times_played"].sum()
-	elo = data.groupby("opening_name")["player_elo"].mean()
-	B.add_nodes_from(
-		(opening,
-		 {"bipartite": 1, "type": "opening", "elo": round(elo[opening], 1), 
-			"play_count": int(play_count[opening])})
-		for opening in openings
-	)
-
-	# Add edges between players and openings with weights (percentages)
-	for _, row in data.iterrows():
-		B.add_edge(row["player_name"], row["opening_name"],
-							 weight=float(row["percentage_played"]))
-
-	__add_opening_edges(B, data, weighted)
-
-	return B
-
-
-def __add_opening_edges(graph: nx.Graph, data: pd.DataFrame, weighted: bool) \
-		-> None:
-	"""
-	Adds edges between openings whose name before the ':' character matches
-	the full name of another opening node, using the provided DataFrame.
-
-	:param graph: The bipartite graph containing player and opening nodes.
-	:param data: DataFrame containing opening names.
-	:param weigthed: Boolean indicating whether to add weighted edges between 
-	openings.
-	"""
-	# Extract unique opening names from the DataFrame
-	openings = data["opening_name"].unique()
-
-	# Create a set of opening names for quick lookup
-	opening_set = set(openings)
-
-	# Iterate through openings and add edges based on the condition
-	for opening in openings:
-		if ':' in opening:
-			prefix = opening.split(':', 1)[0]  # Extract the part before ':'
-			if prefix not in opening_set:
-				# Add the prefix as a new node
-				graph.add_node(prefix, bipartite=1, type="opening")
-				opening_set.add(prefix)  # Update the set
-			# Add the edge between the opening and the prefix
-
-			# Calculate the weight as the ratio of games played in the variation to the total games in the root opening and its variations
-			total_games_prefix = data[data["opening_name"].str.startswith(prefix)][
-				"times_played"].sum()
-			variation_games = data[data["opening_name"] == opening][
-				"times_played"].sum()
-			weight = round(variation_games / total_games_prefix, 2) if total_games_prefix > 0 else 0
-			
-			graph.add_edge(opening, prefix, weight=weight)
+	parent_counts = lengths if all_ancestors else np.minimum(lengths, 1)
+	children = np.repeat(np.arange(len(nodes)), parent_counts)
+	parents = nodes.get_indexer(pd.Index(
+		[ancestor for chain, count in zip(chains, parent_counts.tolist())
+		 for ancestor in chain[:count]], dtype=object)).astype(np.int64)
+	if weighted:
+		with np.errstate(invalid="ignore", divide="ignore"):
+			weights = np.round(np.where(totals[parents] > 0,
+																	totals[children] / totals[parents], 0), 2)
+	else:
+		weights = np.ones(len(children))
+	return added, children, parents, weights
 
 
 def getPartitionSummary(graph: nx.Graph, partition: dict) -> list[dict]:
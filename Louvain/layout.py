@@ -0,0 +1,359 @@
+import logging
+
+import numpy as np
+from scipy import sparse
+
+from Louvain.compactGraph import CompactGraph
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COARSEST_SIZE = 100  # Number of nodes under which the graph is not coarsened
+MIN_SHRINK = 0.9  # Coarsening stops when a level keeps more of the nodes
+MAX_GRID = 256  # Maximum number of cells per side of the repulsion grid
+SOFTENING = 0.05  # Distance under which the repulsion stops growing
+WARM_TEMPERATURE = 1.0  # Maximum first displacement of a warm start, in edges
+
+
+def __coarsen(adjacency: sparse.csr_matrix) -> np.ndarray:
+	"""
+	Group the nodes of a level: every node points to its heaviest neighbour of
+	higher degree, and joins it unless another node points to itself. Groups are
+	stars around the nodes pointed to, collapsing e.g. the players of an opening.
+	:param adjacency: Symmetric adjacency matrix of the level.
+	:return: Group of each node, numbered from 0.
+	"""
+	n = adjacency.shape[0]
+	degrees = np.diff(adjacency.indptr)
+	sources = np.repeat(np.arange(n), degrees)
+	targets = adjacency.indices
+	higher = (degrees[targets] > degrees[sources]) | (
+			(degrees[targets] == degrees[sources]) & (targets > sources))
+	sources, targets = sources[higher], targets[higher]
+	weights = adjacency.data[higher]
+
+	# Last candidate of each node is its heaviest, then of highest degree
+	order = np.lexsort((degrees[targets], weights, sources))
+	sources, targets = sources[order], targets[order]
+	last = np.flatnonzero(np.append(sources[1:] != sources[:-1], True)) \
+		if len(sources) else np.array([], dtype=np.int64)
+	pointers = np.arange(n)
+	pointers[sources[last]] = targets[last]
+
+	pointed = np.zeros(n, dtype=bool)
+	pointed[targets[last]] = True
+	groups = np.where(pointed, np.arange(n), pointers)
+	return np.unique(groups, return_inverse=True)[1]
+
+
+def __repulsion_kernel(cells: int) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Fourier transforms of the repulsive force between cells of the grid, 1/r
+	along each axis in cell units, padded for a non-periodic convolution.
+	:param cells: Number of cells per side of the grid.
+	:return: Transforms of the x and y components of the force.
+	"""
+	offsets = np.fft.fftfreq(2 * cells, 1 / (2 * cells))
+	dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+	squares = dx ** 2 + dy ** 2
+	squares[0, 0] = np.inf
+	return np.fft.rfft2(dx / squares), np.fft.rfft2(dy / squares)
+
+
+def __grid_repulsion(
+		positions: np.ndarray, masses: np.ndarray, kernel: tuple, cells: int
+) -> np.ndarray:
+	"""
+	Approximate the repulsion of all the nodes on each other: masses are spread
+	on a grid, convolved with the repulsive force, and each node is pushed by
+	the force at its cell. Nodes sharing a cell are pushed away from their
+	centre of mass.
+	:param positions: Positions of the nodes, (n, 2).
+	:param masses: Mass of each node.
+	:param kernel: Transformed force of __repulsion_kernel.
+	:param cells: Number of cells per side of the grid.
+	:return: Repulsive force on each node, (n, 2).
+	"""
+	low = positions.min(axis=0)
+	size = max(float((positions.max(axis=0) - low).max()), 1e-9) / (cells - 1)
+	coordinates = np.minimum(((positions - low) / size + 0.5).astype(np.int64),
+													 cells - 1)
+	flat = coordinates[:, 0] * cells + coordinates[:, 1]
+
+	density = np.zeros((2 * cells, 2 * cells))
+	density[:cells, :cells] = np.bincount(
+		flat, weights=masses, minlength=cells * cells).reshape(cells, cells)
+	transform = np.fft.rfft2(density)
+	forces = np.empty_like(positions)
+	for axis in range(2):
+		field = np.fft.irfft2(transform * kernel[axis], s=density.shape)
+		forces[:, axis] = field[:cells, :cells].ravel()[flat] / size
+
+	# The rest of the cell, as one node at its centre of mass
+	cell_mass = np.bincount(flat, weights=masses, minlength=cells * cells)[flat]
+	others = cell_mass - masses
+	moments = np.stack([np.bincount(flat, weights=masses * positions[:, axis],
+																	minlength=cells * cells)[flat]
+											for axis in range(2)], axis=1)
+	crowded = others > 0
+	centres = (moments[crowded] - masses[crowded, None] * positions[crowded]) / \
+		others[crowded, None]
+	offsets = positions[crowded] - centres
+	forces[crowded] += offsets * (others[crowded] / (
+		(offsets ** 2).sum(axis=1) + SOFTENING ** 2))[:, None]
+	return forces
+
+
+def __grid_size(n: int) -> int:
+	"""
+	:param n: Number of nodes.
+	:return: Number of cells per side of the repulsion grid, about sqrt(n).
+	"""
+	return int(min(MAX_GRID, max(8, 2 ** np.ceil(np.log2(np.sqrt(n) + 1)))))
+
+
+def __attraction(
+		positions: np.ndarray, sources: np.ndarray, targets: np.ndarray,
+		weights: np.ndarray
+) -> np.ndarray:
+	"""
+	Pull of the edges on their nodes, d^2 along each edge times its weight.
+	:param positions: Positions of the nodes, (n, 2).
+	:param sources: First node of each edge.
+	:param targets: Second node of each edge.
+	:param weights: Weight of each edge.
+	:return: Attractive force on each node, (n, 2).
+	"""
+	n = len(positions)
+	deltas = positions[targets] - positions[sources]
+	pulls = deltas * (np.sqrt((deltas ** 2).sum(axis=1)) * weights)[:, None]
+	forces = np.empty_like(positions)
+	for axis in range(2):
+		forces[:, axis] = np.bincount(sources, weights=pulls[:, axis], minlength=n) \
+			- np.bincount(targets, weights=pulls[:, axis], minlength=n)
+	return forces
+
+
+def __refine(
+		adjacency: sparse.csr_matrix, positions: np.ndarray, masses: np.ndarray,
+		iterations: int, temperature: float, fixed: np.ndarray = None
+) -> np.ndarray:
+	"""
+	Move the nodes of a level with the Fruchterman-Reingold forces, the
+	attraction of the edges (d^2 along each edge, times its weight) against the
+	repulsion of all the nodes (1/d), the displacement being bounded by a
+	temperature cooling down at each step.
+	:param adjacency: Symmetric adjacency matrix of the level.
+	:param positions: Initial positions of the nodes, (n, 2), updated in place.
+	:param masses: Number of nodes of the graph grouped in each node.
+	:param iterations: Number of steps.
+	:param temperature: Maximum displacement of the first step.
+	:param fixed: Mask of the nodes which do not move (optional).
+	:return: Positions of the nodes.
+	"""
+	edges = sparse.triu(adjacency, k=1).tocoo()
+	sources, targets = edges.row, edges.col
+	weights = np.abs(edges.data)
+	cells = __grid_size(len(positions))
+	kernel = __repulsion_kernel(cells)
+	cooling = temperature / (iterations + 1)
+
+	for _ in range(iterations):
+		forces = __grid_repulsion(positions, masses, kernel, cells)
+		forces += __attraction(positions, sources, targets, weights) / \
+			masses[:, None]
+
+		if fixed is not None:
+			forces[fixed] = 0
+		lengths = np.sqrt((forces ** 2).sum(axis=1))
+		lengths[lengths == 0] = 1
+		positions += forces * (np.minimum(lengths, temperature) / lengths)[:, None]
+		temperature -= cooling
+	return positions
+
+
+def __edge_length(
+		adjacency: sparse.csr_matrix, positions: np.ndarray, known: np.ndarray
+) -> float:
+	"""
+	Typical length of the edges between positioned nodes.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param positions: Positions of the nodes, (n, 2).
+	:param known: Mask of the positioned nodes.
+	:return: Median length of their edges, 0 when they have none.
+	"""
+	edges = sparse.triu(adjacency, k=1).tocoo()
+	both = known[edges.row] & known[edges.col]
+	if not both.any():
+		return 0.0
+	deltas = positions[edges.col[both]] - positions[edges.row[both]]
+	return float(np.median(np.sqrt((deltas ** 2).sum(axis=1))))
+
+
+def warmStartPositions(
+		graph: CompactGraph, previous: dict, seed: int = None
+) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Start the layout of a graph from the positions of a previous layout: the
+	known nodes keep their position, and the new ones are placed, round after
+	round, around the mean position of their placed neighbours. New nodes linked
+	to none of them are scattered over the previous layout.
+	:param graph: The bipartite graph to lay out.
+	:param previous: Previous positions (x, y) by node name, e.g. read back from
+	an export. Nodes no longer in the graph are ignored.
+	:param seed: Seed of the placement of the new nodes.
+	:return: Positions of the nodes, (n, 2), and mask of the known nodes.
+	"""
+	rng = np.random.default_rng(seed)
+	n = graph.numberOfNodes()
+	names = [name for name in previous if name in graph.index]
+	numbers = graph.index.get_indexer(names)
+	positions = np.zeros((n, 2))
+	positions[numbers] = np.array([previous[name] for name in names],
+																dtype=np.float64).reshape(-1, 2)
+	known = np.zeros(n, dtype=bool)
+	known[numbers] = True
+	if not known.any():
+		return rng.uniform(-1, 1, (n, 2)), known
+
+	adjacency = graph.adjacency
+	links = adjacency.copy()
+	links.data[:] = 1
+	# New nodes are spread by about an edge around their neighbours
+	spread = __edge_length(adjacency, positions, known) or \
+		float(np.abs(positions[known]).max()) / np.sqrt(known.sum()) or 1.0
+	placed = known.copy()
+	while True:
+		counts = links @ placed.astype(np.float64)
+		reachable = ~placed & (counts > 0)
+		if not reachable.any():
+			break
+		sums = links[reachable] @ (positions * placed[:, None])
+		positions[reachable] = sums / counts[reachable, None] + \
+			rng.uniform(-0.5, 0.5, (reachable.sum(), 2)) * spread
+		placed |= reachable
+
+	low, high = positions[known].min(axis=0), positions[known].max(axis=0)
+	positions[~placed] = rng.uniform(low, high, ((~placed).sum(), 2))
+	logger.info(f"Warm start: kept {known.sum()} nodes, placed "
+							f"{(placed & ~known).sum()} next to their neighbours and "
+							f"{(~placed).sum()} at random")
+	return positions, known
+
+
+def __equilibrium_scale(
+		adjacency: sparse.csr_matrix, positions: np.ndarray, known: np.ndarray
+) -> float:
+	"""
+	Scale of a previous layout in the units of the forces, the one at which the
+	repulsion and the attraction of its nodes balance out (their virial, the sum
+	of the positions times the forces, is zero). The repulsion varies as 1/scale
+	and the attraction as scale^2, giving the scale in closed form.
+	:param adjacency: Symmetric adjacency matrix of the graph.
+	:param positions: Positions of the nodes, (n, 2).
+	:param known: Mask of the nodes of the previous layout.
+	:return: Factor bringing the previous positions to the units of the forces.
+	"""
+	numbers = np.flatnonzero(known)
+	centred = positions[numbers] - positions[numbers].mean(axis=0)
+	edges = sparse.triu(adjacency[numbers][:, numbers], k=1).tocoo()
+	cells = __grid_size(len(numbers))
+	repulsion = (centred * __grid_repulsion(
+		centred, np.ones(len(numbers)), __repulsion_kernel(cells), cells)).sum()
+	attraction = -(centred * __attraction(centred, edges.row, edges.col,
+																				np.abs(edges.data))).sum()
+	if repulsion <= 0 or attraction <= 0:
+		return 1.0
+	return float(np.cbrt(repulsion / attraction))
+
+
+def __warm_layout(
+		graph: CompactGraph, iterations: int, seed: int, initial: dict
+) -> dict:
+	"""
+	Lay out the new nodes of a graph around the known ones, which keep their
+	previous positions.
+	:param graph: The bipartite graph to lay out.
+	:param iterations: Number of steps.
+	:param seed: Seed of the placement of the new nodes.
+	:param initial: Previous positions (x, y) by node name.
+	:return: Positions of the nodes by name, in the units of the previous ones.
+	"""
+	positions, known = warmStartPositions(graph, initial, seed)
+	if known.all():
+		return graph.byName(positions)
+	adjacency = graph.adjacency
+
+	scale = __equilibrium_scale(adjacency, positions, known)
+	refined = __refine(adjacency, positions * scale,
+										 np.ones(graph.numberOfNodes()), iterations,
+										 WARM_TEMPERATURE, fixed=known) / scale
+	# Known nodes are given back exactly, without the rounding of the scaling
+	refined[known] = positions[known]
+	return graph.byName(refined)
+
+
+def forceLayout(
+		graph: CompactGraph, iterations: int = 50, seed: int = None,
+		initial: dict = None
+) -> dict:
+	"""
+	Computes the positions of the nodes with a multilevel force-directed layout,
+	scaling to large graphs: the graph is coarsened level by level, the coarsest
+	level is laid out, and each finer level starts from the positions of its
+	groups. Forces are vectorized over the sparse adjacency, and the repulsion is
+	approximated on a grid, so that each step is near-linear in the number of
+	nodes and edges.
+	Given the positions of a previous layout, the layout is warm-started instead:
+	the known nodes stay where they were and only the new ones move, so that a
+	few iterations are enough and successive layouts can be animated.
+	:param graph: The bipartite graph to lay out.
+	:param iterations: Number of steps at each level.
+	:param seed: Seed of the initial positions.
+	:param initial: Previous positions (x, y) by node name (optional).
+	:return: Positions of the nodes by name, in [-1, 1] like networkx layouts (in
+	the units of the previous positions for a warm start).
+	"""
+	if not graph.numberOfNodes():
+		return {}
+	if initial and any(name in graph.index for name in initial):
+		return __warm_layout(graph, iterations, seed, initial)
+	rng = np.random.default_rng(seed)
+	adjacency = graph.adjacency
+
+	# Levels of the graph, from the finest (the graph) to the coarsest
+	levels = [(adjacency, np.ones(adjacency.shape[0]))]
+	groupings = []
+	while levels[-1][0].shape[0] > COARSEST_SIZE:
+		adjacency, masses = levels[-1]
+		groups = __coarsen(adjacency)
+		count = groups.max() + 1
+		if count > MIN_SHRINK * adjacency.shape[0]:
+			break
+		members = sparse.csr_matrix(
+			(np.ones(len(groups)), (np.arange(len(groups)), groups)),
+			shape=(len(groups), count))
+		coarse = (members.T @ adjacency @ members).tocsr()
+		# Edges inside a group are dropped
+		coarse = (coarse - sparse.diags(coarse.diagonal())).tocsr()
+		coarse.eliminate_zeros()
+		groupings.append(groups)
+		levels.append((coarse, np.bincount(groups, weights=masses, minlength=count)))
+	logger.info(f"Laying out {graph.numberOfNodes()} nodes over {len(levels)} "
+							f"levels, the coarsest of {levels[-1][0].shape[0]} nodes")
+
+	adjacency, masses = levels[-1]
+	extent = np.sqrt(masses.sum())
+	positions = rng.uniform(0, extent, (adjacency.shape[0], 2))
+	positions = __refine(adjacency, positions, masses, iterations, 0.1 * extent)
+	for (adjacency, masses), groups in zip(levels[-2::-1], groupings[::-1]):
+		# Nodes start around their group, spread by their own repulsion
+		positions = positions[groups] + rng.uniform(-0.5, 0.5, (len(groups), 2))
+		positions = __refine(adjacency, positions, masses, iterations,
+												 max(1.0, 0.01 * extent))
+
+	positions -= positions.mean(axis=0)
+	positions /= max(np.abs(positions).max(), 1e-9)
+	return graph.byName(positions)
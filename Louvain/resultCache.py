@@ -0,0 +1,228 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from Louvain.compactGraph import CompactGraph
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 ** 3  # Default size of the cache directory
+EXTENSION = ".npz"
+
+
+def __encode_strings(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Pack strings into a single UTF-8 buffer.
+	:param values: Strings to pack.
+	:return: Bytes of the strings and end offset of each string in them.
+	"""
+	encoded = [str(value).encode() for value in values]
+	ends = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+															 count=len(encoded)))
+	return np.frombuffer(b"".join(encoded), dtype=np.uint8), ends
+
+
+def __decode_strings(data: np.ndarray, ends: np.ndarray) -> np.ndarray:
+	"""
+	Unpack strings packed with __encode_strings.
+	:param data: Bytes of the strings.
+	:param ends: End offset of each string.
+	:return: Object array of the strings.
+	"""
+	buffer = data.tobytes()
+	starts = np.concatenate([[0], ends[:-1]]).tolist()
+	return np.array([buffer[start:end].decode()
+									 for start, end in zip(starts, ends.tolist())], dtype=object)
+
+
+def frameToArrays(frame: pd.DataFrame, prefix: str = "") -> dict:
+	"""
+	Convert a DataFrame to arrays, the text columns being dictionary-encoded.
+	:param frame: DataFrame of numeric and text columns.
+	:param prefix: Prefix of the names of the arrays.
+	:return: Arrays of the DataFrame, by name.
+	"""
+	arrays = {}
+	names, ends = __encode_strings(frame.columns)
+	arrays[f"{prefix}columns"], arrays[f"{prefix}columns_ends"] = names, ends
+	for position, (column, values) in enumerate(frame.items()):
+		key = f"{prefix}{position}"
+		if pd.api.types.is_numeric_dtype(values.dtype) or \
+				pd.api.types.is_bool_dtype(values.dtype):
+			arrays[key] = values.to_numpy()
+		else:
+			codes, uniques = pd.factorize(values)
+			arrays[f"{key}_codes"] = codes.astype(np.int32)
+			arrays[f"{key}_strings"], arrays[f"{key}_ends"] = __encode_strings(uniques)
+	return arrays
+
+
+def arraysToFrame(arrays: dict, prefix: str = "") -> pd.DataFrame:
+	"""
+	Convert arrays written by frameToArrays back to a DataFrame.
+	:param arrays: Arrays, by name.
+	:param prefix: Prefix of the names of the arrays.
+	:return: DataFrame with the same columns and values.
+	"""
+	columns = __decode_strings(arrays[f"{prefix}columns"],
+														 arrays[f"{prefix}columns_ends"])
+	frame = {}
+	for position, column in enumerate(columns):
+		key = f"{prefix}{position}"
+		if key in arrays:
+			frame[column] = arrays[key]
+		else:
+			codes = arrays[f"{key}_codes"]
+			uniques = __decode_strings(arrays[f"{key}_strings"], arrays[f"{key}_ends"])
+			# Missing values (code -1) become None
+			frame[column] = np.append(uniques, None)[codes]
+	return pd.DataFrame(frame, columns=list(columns))
+
+
+def graphToArrays(graph: CompactGraph) -> dict:
+	"""
+	Convert a graph to arrays.
+	:param graph: The bipartite graph.
+	:return: Arrays of the graph, by name.
+	"""
+	names, ends = __encode_strings(graph.names)
+	return {"names": names, "names_ends": ends, "bipartite": graph.bipartite,
+					"elo": graph.elo, "play_count": graph.playCount,
+					"sources": graph.sources, "targets": graph.targets,
+					"weights": graph.weights}
+
+
+def arraysToGraph(arrays: dict) -> CompactGraph:
+	"""
+	Convert arrays written by graphToArrays back to a graph.
+	:param arrays: Arrays, by name.
+	:return: The bipartite graph.
+	"""
+	return CompactGraph(
+		names=__decode_strings(arrays["names"], arrays["names_ends"]),
+		bipartite=arrays["bipartite"], elo=arrays["elo"],
+		play_count=arrays["play_count"], sources=arrays["sources"],
+		targets=arrays["targets"], weights=arrays["weights"])
+
+
+class ResultCache:
+	"""
+	Content-addressed cache of the results of the stages, stored on disk as
+	NumPy archives. The key of a result is the hash of its stage, of the
+	parameters it depends on and of the key of the result it was computed from,
+	so that a change upstream invalidates all the results computed from it. The
+	least recently used results are evicted when the cache outgrows its size.
+	"""
+
+	def __init__(self, directory: str | None, max_bytes: int = DEFAULT_MAX_BYTES):
+		"""
+		:param directory: Directory of the cache, None to disable it (every result
+		is computed and nothing is stored).
+		:param max_bytes: Maximum size of the results in the directory.
+		"""
+		self.directory = directory
+		self.maxBytes = max_bytes
+		if directory is not None:
+			os.makedirs(directory, exist_ok=True)
+
+	@staticmethod
+	def key(stage: str, params: dict, upstream: str = None) -> str:
+		"""
+		Build the key of a result.
+		:param stage: Name of the stage.
+		:param params: Parameters the result depends on, JSON-serializable.
+		:param upstream: Key of the result it is computed from (optional).
+		:return: Hexadecimal key.
+		"""
+		content = json.dumps({"stage": stage, "params": params,
+													"upstream": upstream}, sort_keys=True, default=str)
+		return hashlib.sha256(content.encode()).hexdigest()
+
+	def __path(self, key: str) -> str:
+		return os.path.join(self.directory, key + EXTENSION)
+
+	def load(self, key: str) -> dict | None:
+		"""
+		Load a result, marking it as recently used.
+		:param key: Key of the result.
+		:return: Arrays of the result by name, None when not cached.
+		"""
+		if self.directory is None:
+			return None
+		path = self.__path(key)
+		try:
+			with np.load(path, allow_pickle=False) as archive:
+				arrays = {name: archive[name] for name in archive.files}
+		except FileNotFoundError:
+			return None
+		except (OSError, ValueError) as e:
+			logger.warning(f"Ignoring the unreadable cache entry {path}: {e}")
+			return None
+		os.utime(path)
+		return arrays
+
+	def save(self, key: str, arrays: dict | None) -> None:
+		"""
+		Store a result, then evict the least recently used ones beyond the size of
+		the cache.
+		:param key: Key of the result.
+		:param arrays: Arrays of the result by name, None to store nothing.
+		"""
+		if self.directory is None or arrays is None:
+			return
+		path = self.__path(key)
+		# Written aside and renamed, for a reader never to see a partial file
+		with open(f"{path}.tmp", "wb") as f:
+			np.savez(f, **arrays)
+		os.replace(f"{path}.tmp", path)
+		self.evict()
+
+	def evict(self) -> None:
+		"""
+		Remove the least recently used results until the cache fits its size.
+		"""
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(EXTENSION):
+				stat = os.stat(os.path.join(self.directory, name))
+				entries.append((stat.st_mtime, stat.st_size, name))
+		size = sum(entry[1] for entry in entries)
+		for _, entry_size, name in sorted(entries):
+			if size <= self.maxBytes:
+				break
+			os.remove(os.path.join(self.directory, name))
+			size -= entry_size
+			logger.info(f"Evicted {name} from the cache")
+
+	def getOrCompute(
+			self, stage: str, params: dict, upstream: str | None,
+			compute: Callable[[], Any], encode: Callable[[Any], dict | None],
+			decode: Callable[[dict], Any]
+	) -> tuple[str, Any]:
+		"""
+		Get a result from the cache, or compute and store it.
+		:param stage: Name of the stage.
+		:param params: Parameters the result depends on.
+		:param upstream: Key of the result it is computed from (optional).
+		:param compute: Function computing the result.
+		:param encode: Function converting the result to arrays, or to None for it
+		not to be stored (e.g. a failed fetch).
+		:param decode: Function converting the arrays back to the result.
+		:return: Key and value of the result.
+		"""
+		key = self.key(stage, params, upstream)
+		arrays = self.load(key)
+		if arrays is not None:
+			logger.info(f"Loaded the {stage} stage from the cache")
+			return key, decode(arrays)
+		value = compute()
+		self.save(key, encode(value))
+		return key, value
@@ -0,0 +1,132 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from tqdm import tqdm
+
+from DataCollection.metrics import addMetrics, collectTimes, timedCall
+from DataCollection.sharedMemory import SharedArrays, attachArrays
+from Louvain.communities import findCommunities, modularity
+from Louvain.compactGraph import CompactGraph
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO,
+										format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def __mutual_information(first: np.ndarray, second: np.ndarray) -> float:
+	"""
+	Computes the normalized mutual information of two partitions, 1 when they
+	are the same up to the numbering of the communities.
+	:param first: Community of each node in the first partition.
+	:param second: Community of each node in the second partition.
+	:return: Mutual information divided by the mean entropy of the partitions, 1
+	for partitions of no nodes.
+	"""
+	n = len(first)
+	if n == 0:
+		return 1.0
+	contingency = sparse.coo_matrix(
+		(np.ones(n), (first, second)),
+		shape=(first.max() + 1, second.max() + 1)).tocsr()
+	contingency.sum_duplicates()
+	joint = contingency.data / n
+	rows = np.asarray(contingency.sum(axis=1)).ravel() / n
+	columns = np.asarray(contingency.sum(axis=0)).ravel() / n
+	coo = contingency.tocoo()
+	information = (joint * np.log(joint / (rows[coo.row] * columns[coo.col]))).sum()
+	entropies = -(rows * np.log(rows)).sum() - (columns * np.log(columns)).sum()
+	return 1.0 if entropies <= 0 else float(2 * information / entropies)
+
+
+def __sweep_run(
+		descriptor: dict, method: str, resolution: float, seed: int,
+		parallel: bool
+) -> np.ndarray:
+	"""
+	Partition the graph published in shared memory.
+	:param descriptor: Descriptor of the shared CSR arrays of the adjacency.
+	:param method: "louvain" or "leiden".
+	:param resolution: Resolution of the modularity.
+	:param seed: Seed of the community detection.
+	:param parallel: Whether to move the nodes all at once.
+	:return: Community of each node.
+	"""
+	arrays = attachArrays(descriptor)
+	n = len(arrays["indptr"]) - 1
+	adjacency = sparse.csr_matrix(
+		(arrays["data"], arrays["indices"], arrays["indptr"]), shape=(n, n))
+	return findCommunities(adjacency, method, resolution, seed,
+												 parallel).astype(np.int32)
+
+
+def sweepCommunities(
+		graph: CompactGraph, resolutions: list[float], seeds: list[int],
+		method: str = "louvain", parallel: bool = False, max_workers: int = None
+) -> tuple[pd.DataFrame, dict]:
+	"""
+	Partitions the graph for every resolution and seed of a grid, in parallel
+	worker processes sharing the adjacency of the graph, and chooses the most
+	stable partition. The stability of a resolution is the mean normalized
+	mutual information between the partitions of its seeds, and the consensus of
+	a run its mean mutual information with the other runs of its resolution.
+	The chosen run is the one of highest consensus at the most stable
+	resolution (among the ones finding more than one community).
+	:param graph: The bipartite graph to partition.
+	:param resolutions: Resolutions of the modularity to try.
+	:param seeds: Seeds to try at every resolution.
+	:param method: "louvain" or "leiden".
+	:param parallel: Whether to move the nodes all at once in each run.
+	:param max_workers: Number of worker processes (defaults to the number of
+	CPUs).
+	:return: Report of the runs (resolution, seed, number of communities,
+	modularity, consensus, stability and whether it was chosen), and the
+	communities of the chosen run by node name.
+	"""
+	adjacency = graph.adjacency
+	runs = [(resolution, seed) for resolution in resolutions for seed in seeds]
+	logger.info(f"Sweeping {len(runs)} runs of {method} over "
+							f"{graph.numberOfNodes()} nodes")
+
+	with SharedArrays({"indptr": adjacency.indptr, "indices": adjacency.indices,
+										 "data": adjacency.data}) as shared, \
+			ProcessPoolExecutor(max_workers=max_workers) as pool:
+		partitions = list(tqdm(collectTimes(
+			pool.map(timedCall, [__sweep_run] * len(runs),
+							 [shared.descriptor] * len(runs), [method] * len(runs),
+							 *zip(*runs), [parallel] * len(runs))),
+			total=len(runs), desc="Sweeping communities"))
+		addMetrics(shared_bytes=shared.size,
+							 ipc_bytes=len(runs) * shared.descriptorSize
+							 + sum(labels.nbytes for labels in partitions))
+
+	report = pd.DataFrame(runs, columns=["resolution", "seed"])
+	report["communities"] = [int(labels.max()) + 1 if len(labels) else 0
+													 for labels in partitions]
+	report["modularity"] = [modularity(adjacency, labels, resolution)
+													for labels, (resolution, _) in zip(partitions, runs)]
+
+	# Agreement of each run with the other seeds of its resolution
+	agreements = [[] for _ in runs]
+	for first, second in combinations(range(len(runs)), 2):
+		if runs[first][0] == runs[second][0]:
+			score = __mutual_information(partitions[first], partitions[second])
+			agreements[first].append(score)
+			agreements[second].append(score)
+	report["consensus"] = [np.mean(scores) if scores else 1.0
+												 for scores in agreements]
+	report["stability"] = report.groupby("resolution")["consensus"].transform("mean")
+
+	chosen = report.assign(split=report["communities"] > 1).sort_values(
+		["split", "stability", "consensus", "modularity"], ascending=False,
+		kind="stable").index[0]
+	report["chosen"] = report.index == chosen
+	logger.info(f"Chose resolution {report.at[chosen, 'resolution']} and seed "
+							f"{report.at[chosen, 'seed']}: "
+							f"{report.at[chosen, 'communities']} communities, stability "
+							f"{report.at[chosen, 'stability']:.3f}")
+	return report, graph.byName(partitions[chosen].tolist())
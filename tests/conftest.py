@@ -0,0 +1,61 @@
+import json
+import os
+import re
+
+import pytest
+
+# Path to a JSON file of connection parameters of a test database, in which
+# the tests only create temporary tables, dropped with their connection, and
+# throwaway schemas, dropped at the end of their test
+DATABASE = os.environ.get("TEST_DATABASE_PARAMS")
+
+
+@pytest.fixture
+def databaseParams() -> dict:
+	"""
+	Read the connection parameters of the test database, skipping the test when
+	none is configured.
+	:return: Connection parameters.
+	"""
+	pytest.importorskip("psycopg")
+	if DATABASE is None:
+		pytest.skip("TEST_DATABASE_PARAMS is not set")
+	with open(DATABASE, "r") as f:
+		params = json.load(f)
+	return {key: params[key] for key in
+					["dbname", "user", "password", "host", "port"] if key in params}
+
+
+@pytest.fixture
+def connection(databaseParams):
+	"""
+	Connect to the test database.
+	:return: Connection to the database.
+	"""
+	import psycopg
+	with psycopg.connect(**databaseParams) as connection:
+		yield connection
+
+
+@pytest.fixture
+def database(connection, databaseParams) -> dict:
+	"""
+	Create the tables of createChessDatabase.sql in a throwaway schema, seen by
+	every connection made with the returned parameters, and drop it afterwards.
+	:return: Connection parameters of the database, on the schema.
+	"""
+	schema = f"test_{os.getpid()}"
+	with open(os.path.join(os.path.dirname(__file__), os.pardir, "DataCollection",
+												 "createChessDatabase.sql"), "r") as f:
+		# The owner of the tables is left to the user of the tests
+		script = re.sub(r"ALTER TABLE \w+\s+OWNER TO \w+;", "", f.read())
+	connection.execute(f"create schema {schema}")
+	connection.execute(f"set search_path to {schema}")
+	connection.execute(script)
+	connection.commit()
+	try:
+		yield {**databaseParams, "options": f"-c search_path={schema}"}
+	finally:
+		connection.rollback()
+		connection.execute(f"drop schema {schema} cascade")
+		connection.commit()
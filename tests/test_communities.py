@@ -0,0 +1,44 @@
+import networkx as nx
+import numpy as np
+import pytest
+from scipy import sparse
+
+from Louvain.communities import findCommunities, modularity
+
+
+def fixedGraph() -> nx.Graph:
+	"""
+	Build a weighted graph of a few dense groups loosely linked together.
+	:return: Graph of 55 nodes numbered from 0.
+	"""
+	rng = np.random.default_rng(0)
+	graph = nx.Graph()
+	sizes = [12, 20, 8, 15]
+	groups = np.repeat(np.arange(len(sizes)), sizes)
+	for u in range(len(groups)):
+		for v in range(u + 1, len(groups)):
+			if rng.random() < (0.6 if groups[u] == groups[v] else 0.03):
+				graph.add_edge(u, v, weight=float(rng.integers(1, 5)))
+	return graph
+
+
+@pytest.mark.parametrize("method", ["louvain", "leiden"])
+@pytest.mark.parametrize("parallel", [False, True])
+def test_modularity_like_networkx(method, parallel):
+	graph = fixedGraph()
+	adjacency = sparse.csr_matrix(nx.to_scipy_sparse_array(
+		graph, nodelist=range(graph.number_of_nodes()), weight="weight"))
+	labels = findCommunities(adjacency, method, seed=1, parallel=parallel)
+
+	communities = nx.community.louvain_communities(graph, weight="weight",
+																								 seed=1)
+	expected = nx.community.modularity(graph, communities, weight="weight")
+	found = modularity(adjacency, labels)
+	assert found == pytest.approx(nx.community.modularity(
+		graph, [set(np.flatnonzero(labels == label)) for label in
+						range(labels.max() + 1)], weight="weight"))
+	assert found >= expected - 0.01
+
+
+def test_empty_graph():
+	assert len(findCommunities(sparse.csr_matrix((0, 0)))) == 0
@@ -0,0 +1,55 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from Louvain.getData import getCompactGraph
+
+DATA = pd.DataFrame({
+	"player_name": ["a", "a", "b", "c", "c"],
+	"player_elo": [1500.0, 1500.0, 2000.0, np.nan, np.nan],
+	"opening_name": ["Sicilian Defense", "French Defense", "Sicilian Defense",
+									 "French Defense", "English Opening"],
+	"times_played": [6, 4, 10, 3, 1],
+	"percentage_played": [0.6, 0.4, 1.0, 0.75, 0.25]
+})
+
+
+def test_nodes():
+	graph = getCompactGraph(DATA, weighted=False)
+	assert graph.names.tolist() == ["a", "b", "c", "Sicilian Defense",
+																	"French Defense", "English Opening"]
+	assert graph.bipartite.tolist() == [0, 0, 0, 1, 1, 1]
+	assert graph.players.tolist() == [0, 1, 2]
+	assert graph.playCount.tolist() == [10, 10, 4, 16, 7, 1]
+	# Players keep their Elo, openings the average Elo of their rated players
+	np.testing.assert_array_equal(graph.elo,
+																[1500, 2000, np.nan, 1750, 1500, np.nan])
+	assert graph.index.get_loc("French Defense") == 4
+
+
+def test_adjacency():
+	graph = getCompactGraph(DATA, weighted=False)
+	adjacency = graph.adjacency
+	assert adjacency.shape == (6, 6) and adjacency.nnz == 2 * len(DATA)
+	assert (adjacency != adjacency.T).nnz == 0
+	assert adjacency[0, 3] == 0.6 and adjacency[4, 2] == 0.75
+	expected = nx.to_scipy_sparse_array(graph.toNetworkx(attributes=False),
+																			nodelist=range(6))
+	assert (adjacency != expected).nnz == 0
+
+
+def test_biadjacency():
+	biadjacency = getCompactGraph(DATA, weighted=False).biadjacency.toarray()
+	np.testing.assert_array_equal(biadjacency, [[0.6, 0.4, 0], [1.0, 0, 0],
+																							[0, 0.75, 0.25]])
+
+
+def test_networkx_view():
+	graph = getCompactGraph(DATA, weighted=False)
+	view = graph.toNetworkx()
+	assert view.nodes["a"] == {"bipartite": 0, "type": "player", "elo": 1500.0,
+														 "play_count": 10}
+	assert view["c"]["English Opening"]["weight"] == 0.25
+	assert graph.toNetworkx() is view
+	assert graph.byName(np.arange(6))["English Opening"] == 5
+	assert graph.byName({1: "x"}) == {"b": "x"}
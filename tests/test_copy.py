@@ -0,0 +1,54 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from DataCollection import copyToPostgres
+
+
+def createTable(connection) -> None:
+	connection.execute(
+		"create temporary table copy_test (id uuid primary key, name text, "
+		"color char(1), elo int, played timestamp)")
+
+
+def frame(ids: list) -> pd.DataFrame:
+	return pd.DataFrame({
+		"id": ids,
+		"name": ["a", None, "é"][:len(ids)],
+		"color": ["W", "B", None][:len(ids)],
+		"elo": pd.array([1500, None, 1700][:len(ids)], dtype="Int32"),
+		"played": pd.to_datetime(["2024-01-01 10:00", None, "2024-02-01 00:00"][
+															:len(ids)])})
+
+
+def test_copy_round_trip(connection):
+	createTable(connection)
+	ids = [str(uuid.UUID(int=number)) for number in range(1, 4)]
+	assert copyToPostgres(connection, "copy_test", frame(ids)) == 3
+	rows = connection.execute(
+		"select id::text, name, color, elo, played from copy_test order by id"
+	).fetchall()
+	assert [row[0] for row in rows] == ids
+	assert [row[1] for row in rows] == ["a", None, "é"]
+	assert [row[2] for row in rows] == ["W", "B", None]
+	assert [row[3] for row in rows] == [1500, None, 1700]
+	assert rows[1][4] is None and str(rows[0][4]) == "2024-01-01 10:00:00"
+
+
+def test_copy_skips_existing_rows(connection):
+	createTable(connection)
+	ids = [str(uuid.UUID(int=number)) for number in range(1, 4)]
+	copyToPostgres(connection, "copy_test", frame(ids[:2]))
+	assert copyToPostgres(connection, "copy_test", frame(ids)) == 1
+	assert connection.execute("select count(*) from copy_test").fetchone()[0] \
+		== 3
+
+
+def test_copy_subset_of_columns(connection):
+	createTable(connection)
+	assert copyToPostgres(connection, "copy_test", pd.DataFrame({
+		"id": [str(uuid.UUID(int=7))], "elo": np.array([1234], dtype=np.int32)
+	})) == 1
+	assert connection.execute("select name, elo from copy_test").fetchone() == \
+		(None, 1234)
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+from Louvain.exportGraph import exportGraph, loadPlotPositions
+from Louvain.getData import getCompactGraph
+from tests.test_getData import DATA
+
+FORMATS = ["graph.json", "graph.json.gz", "graph.json.zst", "graph.npz"]
+
+
+@pytest.fixture
+def graph():
+	"""
+	:return: Graph of two players and four openings, one added as an ancestor.
+	"""
+	return getCompactGraph(DATA, weighted=True)
+
+
+@pytest.fixture
+def positions(graph) -> dict:
+	"""
+	:return: Random positions of the nodes of the graph, by name.
+	"""
+	rng = np.random.default_rng(0)
+	return dict(zip(graph.names, map(tuple, rng.uniform(-1, 1, (6, 2)).tolist())))
+
+
+def edgeSet(edges: list[dict]) -> set:
+	"""
+	:param edges: Exported edges.
+	:return: Set of the edges, as their ends and weight.
+	"""
+	return {(frozenset((edge["source"], edge["target"])), edge["weight"])
+					for edge in edges}
+
+
+@pytest.mark.parametrize("file_name", FORMATS)
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_round_trip(tmp_path, graph, positions, file_name, partitioned):
+	if file_name.endswith(".zst"):
+		pytest.importorskip("zstandard")
+	partitions = dict(zip(graph.names, [0, 1, 0, 0, 1, 0])) if partitioned \
+		else None
+	path = str(tmp_path / file_name)
+	exportGraph(graph, positions, path, partitions)
+	# Positions are read back exactly, floats being written with repr
+	assert loadPlotPositions(path) == positions
+
+
+def test_like_exportPlotToJSON(tmp_path, graph, positions):
+	visualiseNetwork = pytest.importorskip("Louvain.visualiseNetwork")
+	partitions = dict(zip(graph.names, [0, 1, 0, 0, 1, 0]))
+	exportGraph(graph, positions, str(tmp_path / "graph.json"), partitions)
+	visualiseNetwork.exportPlotToJSON(graph.toNetworkx(), positions,
+																		str(tmp_path / "expected.json"), partitions)
+	with open(tmp_path / "graph.json", "r") as f:
+		exported = json.load(f)
+	with open(tmp_path / "expected.json", "r") as f:
+		expected = json.load(f)
+
+	assert exported["partitions"] == expected["partitions"]
+	assert exported["nodes"] == expected["nodes"]
+	# Edges are listed in another order by networkx
+	assert edgeSet(exported["edges"]) == edgeSet(expected["edges"])
+
+
+def test_unreadable_file(tmp_path):
+	with open(tmp_path / "graph.json", "w") as f:
+		f.write("{")
+	assert loadPlotPositions(str(tmp_path / "graph.json")) == {}
+	assert loadPlotPositions(str(tmp_path / "missing.npz")) == {}
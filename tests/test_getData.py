@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Louvain.getData import getCompactGraph
+
+NAJDORF = "Sicilian Defense: Najdorf Variation"
+ENGLISH_ATTACK = f"{NAJDORF}, English Attack"
+DRAGON = "Sicilian Defense: Dragon Variation"
+
+DATA = pd.DataFrame({
+	"player_name": ["a", "a", "b"],
+	"player_elo": [1500.0, 1500.0, 2000.0],
+	"opening_name": [ENGLISH_ATTACK, "Sicilian Defense", DRAGON],
+	"times_played": [6, 4, 10],
+	"percentage_played": [0.6, 0.4, 1.0]
+})
+
+
+def hierarchyEdges(graph) -> dict[tuple[str, str], float]:
+	"""
+	Get the edges between openings of a graph.
+	:param graph: Compact graph.
+	:return: Weight of each edge, by (variation, parent) names.
+	"""
+	edges = {}
+	for u, v, weight in graph.toNetworkx(attributes=False).edges(data="weight"):
+		if graph.bipartite[u] == graph.bipartite[v] == 1:
+			# Variations have longer names than the openings they come from
+			u, v = sorted((graph.names[u], graph.names[v]), key=len, reverse=True)
+			edges[(u, v)] = weight
+	return edges
+
+
+def test_missing_ancestors():
+	graph = getCompactGraph(DATA, weighted=False)
+	assert graph.names[2:].tolist() == [ENGLISH_ATTACK, "Sicilian Defense", DRAGON,
+																			NAJDORF]
+	# Added openings are not played themselves
+	assert graph.playCount.tolist() == [10, 10, 6, 4, 10, -1]
+	assert np.isnan(graph.elo[-1])
+
+
+def test_unweighted():
+	edges = hierarchyEdges(getCompactGraph(DATA, weighted=False))
+	assert edges == {(ENGLISH_ATTACK, NAJDORF): 1.0,
+									 (NAJDORF, "Sicilian Defense"): 1.0,
+									 (DRAGON, "Sicilian Defense"): 1.0}
+
+
+def test_weighted():
+	# Share of the games of the parent and its variations played in the child
+	edges = hierarchyEdges(getCompactGraph(DATA, weighted=True))
+	assert edges == {(ENGLISH_ATTACK, NAJDORF): 1.0,
+									 (NAJDORF, "Sicilian Defense"): 0.3,
+									 (DRAGON, "Sicilian Defense"): 0.5}
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_all_ancestors(weighted):
+	edges = hierarchyEdges(getCompactGraph(DATA, weighted, all_ancestors=True))
+	assert edges == {(ENGLISH_ATTACK, NAJDORF): 1.0,
+									 (ENGLISH_ATTACK, "Sicilian Defense"): 0.3 if weighted else 1.0,
+									 (NAJDORF, "Sicilian Defense"): 0.3 if weighted else 1.0,
+									 (DRAGON, "Sicilian Defense"): 0.5 if weighted else 1.0}
@@ -0,0 +1,63 @@
+import uuid
+
+import pandas as pd
+
+from DataCollection import (GAMES_NAMESPACE, OPENINGS_NAMESPACE,
+														PLAYERS_NAMESPACE, createGamesDataFrame,
+														createPlayersDataFrame, deterministicIds,
+														randomIds)
+from DataCollection.readPGN import parseCompactBlock
+from tests.test_readPGN import pgnText
+
+
+def gameInfo(games: int = 30) -> pd.DataFrame:
+	columns, _ = parseCompactBlock(pgnText(games))
+	return pd.DataFrame(columns)
+
+
+def test_deterministic_ids():
+	keys = pd.Series(["a", "b", None, "a"], index=[3, 5, 7, 9])
+	ids = deterministicIds(PLAYERS_NAMESPACE, keys)
+	assert ids.index.tolist() == [3, 5, 7, 9]
+	assert ids.tolist() == [str(uuid.uuid5(PLAYERS_NAMESPACE, "a")),
+													str(uuid.uuid5(PLAYERS_NAMESPACE, "b")), None,
+													str(uuid.uuid5(PLAYERS_NAMESPACE, "a"))]
+	assert deterministicIds(OPENINGS_NAMESPACE, keys)[3] != ids[3]
+
+
+def test_random_ids():
+	ids = randomIds(100)
+	assert len(set(ids)) == 100
+	assert all(uuid.UUID(value).version == 4 for value in ids)
+	assert all(str(uuid.UUID(value)) == value for value in ids)
+
+
+def test_player_ids_from_names():
+	players = createPlayersDataFrame(gameInfo(), pd.DataFrame(
+		{"name": [], "id": []}), deterministic_ids=True)
+	assert sorted(players["name"]) == sorted(f"p{number}" for number in range(12))
+	assert players["id"].tolist() == [str(uuid.uuid5(PLAYERS_NAMESPACE, name))
+																		for name in players["name"]]
+
+
+def test_game_ids_do_not_depend_on_chunks():
+	info = gameInfo()
+	names = [f"p{number}" for number in range(12)]
+	players = pd.DataFrame({"name": names, "id": deterministicIds(
+		PLAYERS_NAMESPACE, pd.Series(names))})
+	openings = pd.DataFrame({"name": ["Sicilian Defense"], "id": ["o0"]})
+
+	games = createGamesDataFrame(info, players, openings, deterministic_ids=True)
+	halves = pd.concat([
+		createGamesDataFrame(info.iloc[:13].reset_index(drop=True), players,
+												 openings, deterministic_ids=True),
+		createGamesDataFrame(info.iloc[13:].reset_index(drop=True), players,
+												 openings, deterministic_ids=True)], ignore_index=True)
+	assert games["id"].tolist() == halves["id"].tolist()
+	assert games["id"].nunique() == len(info)
+	assert games["id"][0] == str(uuid.uuid5(
+		GAMES_NAMESPACE, "https://lichess.org/g00000000|p0|p7|2024.01.01 00:00:00"))
+
+	# Random IDs differ from one run to the next
+	assert set(createGamesDataFrame(info, players, openings)["id"]).isdisjoint(
+		games["id"])
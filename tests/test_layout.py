@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from Louvain.compactGraph import CompactGraph
+from Louvain.layout import forceLayout, warmStartPositions
+
+
+def groupedGraph(groups: int = 4, players: int = 60, openings: int = 5,
+								 seed: int = 0) -> CompactGraph:
+	"""
+	Build a graph of groups of players playing the openings of their group only.
+	:param groups: Number of groups.
+	:param players: Number of players of each group.
+	:param openings: Number of openings of each group.
+	:param seed: Seed of the edges.
+	:return: Bipartite graph, of more nodes than the coarsest level.
+	"""
+	rng = np.random.default_rng(seed)
+	sources, targets = [], []
+	for group in range(groups):
+		for player in range(group * players, (group + 1) * players):
+			played = rng.choice(openings, 2, replace=False) + group * openings
+			sources += [player] * 2
+			targets += (groups * players + played).tolist()
+	n = groups * (players + openings)
+	return CompactGraph(
+		names=[f"p{i}" for i in range(groups * players)] +
+					[f"o{i}" for i in range(groups * openings)],
+		bipartite=np.repeat([0, 1], [groups * players, groups * openings]),
+		elo=np.full(n, 1500.0), play_count=np.ones(n), sources=sources,
+		targets=targets, weights=np.full(len(sources), 0.5))
+
+
+def test_layout():
+	graph = groupedGraph()
+	positions = forceLayout(graph, iterations=30, seed=1)
+	assert list(positions) == graph.names.tolist()
+	array = np.array(list(positions.values()))
+	assert np.isfinite(array).all()
+	assert np.abs(array).max() == pytest.approx(1)
+
+	# Groups are laid out apart from each other
+	centers = np.array([array[group * 60:(group + 1) * 60].mean(axis=0)
+											for group in range(4)])
+	spread = np.mean([np.linalg.norm(array[group * 60:(group + 1) * 60] -
+																	 centers[group], axis=1).mean()
+										for group in range(4)])
+	gaps = np.linalg.norm(centers[:, None] - centers[None], axis=2)
+	assert gaps[~np.eye(4, dtype=bool)].min() > spread
+
+
+def test_seed():
+	graph = groupedGraph()
+	first = np.array(list(forceLayout(graph, iterations=10, seed=3).values()))
+	again = np.array(list(forceLayout(graph, iterations=10, seed=3).values()))
+	other = np.array(list(forceLayout(graph, iterations=10, seed=4).values()))
+	np.testing.assert_array_equal(again, first)
+	assert not np.allclose(other, first)
+
+
+def test_empty_graph():
+	graph = CompactGraph([], [], [], [], [], [], [])
+	assert forceLayout(graph) == {}
+
+
+def test_warm_start():
+	graph = groupedGraph()
+	previous = forceLayout(groupedGraph(groups=3), iterations=10, seed=1)
+	previous["gone"] = (5.0, 5.0)
+	positions = forceLayout(graph, iterations=10, seed=1, initial=previous)
+	assert list(positions) == graph.names.tolist()
+	# Known nodes do not move, and nodes no longer in the graph are dropped
+	assert all(tuple(positions[name]) == tuple(previous[name])
+						 for name in previous if name != "gone")
+
+	# The new group is laid out within the extent of the previous layout
+	new = np.array([positions[name] for name in positions if name not in previous])
+	assert len(new) == 65 and np.isfinite(new).all()
+	assert np.abs(new).max() < 2
+
+
+def test_warm_start_positions():
+	graph = CompactGraph(
+		names=["a", "b", "c", "x", "y"], bipartite=[0, 0, 0, 1, 1],
+		elo=np.full(5, np.nan), play_count=np.ones(5), sources=[0, 1, 2],
+		targets=[3, 3, 4], weights=[1.0, 1.0, 1.0])
+	positions, known = warmStartPositions(
+		graph, {"a": (0.0, 0.0), "x": (1.0, 0.0), "z": (9.0, 9.0)}, seed=0)
+	assert known.tolist() == [True, False, False, True, False]
+	assert positions[[0, 3]].tolist() == [[0.0, 0.0], [1.0, 0.0]]
+	# b is placed around its opening x, by about an edge
+	assert np.linalg.norm(positions[1] - positions[3]) <= np.sqrt(0.5)
+	# c and y are linked to no known node, and scattered over the known ones
+	assert ((positions[[2, 4]] >= [0, 0]) & (positions[[2, 4]] <= [1, 0])).all()
+
+
+def test_warm_start_without_known_nodes():
+	graph = groupedGraph(groups=1)
+	positions, known = warmStartPositions(graph, {"gone": (0.0, 0.0)}, seed=0)
+	assert not known.any() and positions.shape == (65, 2)
+	assert (np.abs(positions) <= 1).all()
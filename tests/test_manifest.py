@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+from DataCollection import addNewPGNtoDatabase, addOpeningsToDatabase
+from DataCollection.manifest import IngestionManifest, fileFingerprint
+from DataCollection.readPGN import readPGNFiles
+from tests.test_readPGN import pgnText
+
+psycopg = pytest.importorskip("psycopg")
+
+
+@pytest.fixture
+def manifest(connection) -> IngestionManifest:
+	connection.execute(
+		"create temporary table test_manifest (path text not null, "
+		"size bigint not null, hash char(32) not null, "
+		"games bigint not null default 0, byte_offset bigint not null default 0, "
+		"offset_games bigint not null default 0, chunks int not null default 0, "
+		"completed boolean not null default false, "
+		"updated_at timestamp not null default now(), "
+		"primary key (path, size, hash))")
+	return IngestionManifest("test_manifest", "test_touched")
+
+
+@pytest.fixture
+def pgnFile(tmp_path) -> str:
+	file = str(tmp_path / "games.pgn")
+	with open(file, "wb") as f:
+		f.write(pgnText())
+	return file
+
+
+def test_fingerprint(pgnFile):
+	size, hash_ = fileFingerprint(pgnFile)
+	assert size == os.path.getsize(pgnFile) and len(hash_) == 32
+	with open(pgnFile, "ab") as f:
+		f.write(b"\n")
+	assert fileFingerprint(pgnFile) != (size, hash_)
+
+
+def test_resume(connection, manifest, pgnFile):
+	remaining, resume = manifest.pending(connection, [pgnFile])
+	assert remaining == [pgnFile] and resume == {}
+
+	# The run stops after its third chunk
+	chunks = readPGNFiles([pgnFile], 7, 2, 500)
+	loaded = [next(chunks) for _ in range(3)]
+	chunks.close()
+	for chunk in loaded:
+		manifest.checkpoint(connection, chunk.attrs)
+	connection.commit()
+
+	remaining, resume = manifest.pending(connection, [pgnFile])
+	assert remaining == [pgnFile]
+	games = resume[pgnFile][2]
+	assert games == 21
+	resumed = list(readPGNFiles([pgnFile], 7, 2, 500, resume))
+	assert resumed[0]["Site"].iloc[0] == f"https://lichess.org/g{games:08d}"
+	for chunk in resumed:
+		manifest.checkpoint(connection, chunk.attrs)
+	connection.commit()
+
+	remaining, resume = manifest.pending(connection, [pgnFile])
+	assert remaining == [] and resume == {}
+
+
+def test_changed_file_is_loaded_again(connection, manifest, pgnFile):
+	manifest.pending(connection, [pgnFile])
+	for chunk in readPGNFiles([pgnFile], 100, 2):
+		manifest.checkpoint(connection, chunk.attrs)
+	connection.commit()
+	assert manifest.pending(connection, [pgnFile]) == ([], {})
+
+	with open(pgnFile, "ab") as f:
+		f.write(pgnText(1))
+	assert manifest.pending(connection, [pgnFile]) == ([pgnFile], {})
+
+
+def test_touched_players(connection, manifest):
+	connection.execute("create temporary table test_touched (id uuid primary key)")
+	assert manifest.tracksPlayers(connection) and manifest.tracking
+	ids = ["00000000-0000-0000-0000-000000000001",
+				 "00000000-0000-0000-0000-000000000002"]
+	manifest.touch(connection, ids)
+	manifest.touch(connection, ids[:1])
+	connection.commit()
+	assert sorted(manifest.touched(connection)) == ids
+	manifest.release(connection, ids)
+	connection.commit()
+	assert manifest.touched(connection) == []
+
+
+def test_untracked_players(connection, manifest):
+	assert not manifest.tracksPlayers(connection) and not manifest.tracking
+	manifest.touch(connection, ["00000000-0000-0000-0000-000000000001"])
+	assert manifest.touched(connection) == []
+
+
+def loadGames(database: dict, pgnFile: str, tmp_path) -> None:
+	openings = tmp_path / "openings.tsv"
+	openings.write_text("eco\tname\tpgn\nB20\tSicilian Defense\t1. e4 c5\n")
+	addOpeningsToDatabase([str(openings)], database, {}, True)
+	addNewPGNtoDatabase([pgnFile], database, {}, deterministic_ids=True,
+											chunk_size=20)
+
+
+def playersWithoutElo(database: dict) -> int:
+	with psycopg.connect(**database) as connection:
+		return connection.execute(
+			"select count(*) from players where max_elo is null or "
+			"current_elo is null").fetchone()[0]
+
+
+@pytest.mark.parametrize("tracked", [True, False])
+def test_elo_of_loaded_players(database, pgnFile, tmp_path, tracked):
+	with psycopg.connect(**database) as connection:
+		if not tracked:
+			# Database created before the table of the touched players
+			connection.execute("drop table touched_players")
+	loadGames(database, pgnFile, tmp_path)
+	with psycopg.connect(**database) as connection:
+		assert connection.execute("select count(*) from games").fetchone()[0] == 60
+		assert connection.execute("select count(*) from players").fetchone()[0] == 12
+		if tracked:
+			assert connection.execute(
+				"select count(*) from touched_players").fetchone()[0] == 0
+	assert playersWithoutElo(database) == 0
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from DataCollection import createGamesDataFrame
+from DataCollection.openingTrie import OpeningTrie
+from DataCollection.readPGN import parseCompactBlock
+
+OPENINGS = pd.DataFrame({
+	"eco": ["B20", "B27", "B90", "C00", "C01"],
+	"name": ["Sicilian Defense", "Sicilian Defense: Hyperaccelerated Dragon",
+					 "Sicilian Defense: Najdorf Variation", "French Defense",
+					 "French Defense: Exchange Variation"],
+	"pgn": ["1. e4 c5", "1. e4 c5 2. Nf3 g6",
+					"1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6", "1. e4 e6",
+					"1. e4 e6 2. d4 d5 3. exd5 exd5"],
+	"id": ["o0", "o1", "o2", "o3", "o4"]
+})
+
+
+def test_deepest_opening():
+	trie = OpeningTrie(OPENINGS)
+	moves = pd.Series(["e4 c5 Nf3 g6 d4", "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6",
+										 "e4 c5 Nf3 d6 d4", "e4 e6 d4 d5 exd5 exd5 Nf3"])
+	assert trie.classify(moves).tolist() == [1, 2, 0, 4]
+
+
+def test_games_out_of_trie():
+	trie = OpeningTrie(OPENINGS)
+	moves = pd.Series(["d4 d5 c4", "e4", "", None, "e4 c6"])
+	assert trie.classify(moves).tolist() == [-1, -1, -1, -1, -1]
+
+
+def test_empty_trie():
+	trie = OpeningTrie(OPENINGS.iloc[:0])
+	assert trie.classify(pd.Series(["e4 c5"])).tolist() == [-1]
+
+
+def test_homonyms_keep_last():
+	openings = pd.concat([OPENINGS, OPENINGS.iloc[[0]]], ignore_index=True)
+	trie = OpeningTrie(openings)
+	assert trie.classify(pd.Series(["e4 c5 Nf3"])).tolist() == [len(OPENINGS)]
+
+
+def gameText(opening: str, movetext: str) -> str:
+	return ('[Event "Rated Blitz game"]\n[White "a"]\n[Black "b"]\n'
+					'[Result "1-0"]\n[UTCDate "2024.01.01"]\n[UTCTime "00:00:00"]\n'
+					'[WhiteElo "1500"]\n[BlackElo "1500"]\n[TimeControl "180+0"]\n'
+					f'[Opening "{opening}"]\n\n{movetext} 1-0\n\n')
+
+
+def test_header_then_moves():
+	text = "".join([
+		# Known name: the header wins over the moves
+		gameText("French Defense", "1. e4 c5 2. Nf3 g6"),
+		# Unknown name: the moves are classified
+		gameText("Sicilian Defense: Unknown Variation", "1. e4 c5 2. Nf3 g6"),
+		# Unknown name and moves: the family of the name
+		gameText("Sicilian Defense: Unknown Variation", "1. d4 d5"),
+		# Nothing matches
+		gameText("Unknown Opening", "1. d4 d5")])
+	columns, count = parseCompactBlock(text.encode())
+	players = pd.DataFrame({"name": ["a", "b"], "id": ["pa", "pb"]})
+	games = createGamesDataFrame(pd.DataFrame(columns), players, OPENINGS)
+	assert count == 4
+	assert games["opening"].tolist() == ["o3", "o1", "o0", None]
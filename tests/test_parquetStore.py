@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+import pytest
+
+from DataCollection.parquetStore import (UNKNOWN_MONTH, readParquetStore,
+																				 writeParquetStore)
+from DataCollection.readPGN import concatFrames, readPGNFiles
+from tests.test_readPGN import pgnText
+
+pytest.importorskip("pyarrow")
+
+
+def writePGN(path, text: bytes) -> str:
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, "wb") as f:
+		f.write(text)
+	return str(path)
+
+
+def partitions(directory) -> dict[str, list[str]]:
+	"""
+	List the month partitions of each file partition of a store.
+	"""
+	return {entry: sorted(name for name in os.listdir(os.path.join(directory,
+																																	 entry))
+												if name.startswith("month="))
+					for entry in os.listdir(directory)}
+
+
+def readAll(directory, **options) -> pd.DataFrame:
+	return concatFrames(list(readParquetStore(str(directory), 1000,
+																						**options)))
+
+
+def test_round_trip(tmp_path):
+	file = writePGN(tmp_path / "games.pgn", pgnText())
+	assert writeParquetStore([file], str(tmp_path / "store"), 7, 2) == 60
+	(months,) = partitions(tmp_path / "store").values()
+	assert months == [f"month=2024-{month:02d}" for month in range(1, 13)]
+
+	games = readAll(tmp_path / "store").sort_values("Site")
+	parsed = concatFrames(list(readPGNFiles([file], 100, 2)))
+	assert games["Site"].tolist() == parsed["Site"].tolist()
+	assert games["WhiteElo"].tolist() == parsed["WhiteElo"].tolist()
+	assert set(readAll(tmp_path / "store", columns=["Site", "Result"]).columns) \
+		== {"Site", "Result"}
+
+
+def test_invalid_dates(tmp_path):
+	text = pgnText(3).replace(b'[UTCDate "2024.02.02"]',
+														b'[UTCDate "????.??.??"]')
+	file = writePGN(tmp_path / "games.pgn", text)
+	assert writeParquetStore([file], str(tmp_path / "store"), 10, 2) == 3
+	(months,) = partitions(tmp_path / "store").values()
+	assert months == ["month=2024-01", "month=2024-03",
+										f"month={UNKNOWN_MONTH}"]
+	assert len(readAll(tmp_path / "store")) == 3
+
+
+def test_files_of_the_same_name(tmp_path):
+	first = writePGN(tmp_path / "a" / "games.pgn", pgnText(10))
+	second = writePGN(tmp_path / "b" / "games.pgn", pgnText(4))
+	store = str(tmp_path / "store")
+	assert writeParquetStore([first, second], store, 7, 2) == 14
+	assert len(partitions(store)) == 2
+	assert len(readAll(store, files=["games.pgn"])) == 14
+	assert len(readAll(store, files=[second])) == 4
+
+	# Converting a file again only replaces its own partitions
+	writePGN(tmp_path / "b" / "games.pgn", pgnText(2))
+	writeParquetStore([second], store, 7, 2)
+	assert len(readAll(store, files=[first])) == 10
+	assert len(readAll(store)) == 12
@@ -0,0 +1,95 @@
+import threading
+import uuid
+
+import numpy as np
+
+from DataCollection.playerCache import PlayerIdCache
+
+
+def playerIds(count: int, start: int = 0) -> list[str]:
+	return [str(uuid.UUID(int=number + 1)) for number in range(start,
+																													start + count)]
+
+
+def test_lookup():
+	ids = playerIds(3)
+	cache = PlayerIdCache(["a", "b", "c"], ids)
+	assert cache.contains(["b", "x", "c"]).tolist() == [True, False, True]
+	frame = cache.toDataFrame(["c", "x", "a", "c", None])
+	assert frame["name"].tolist() == ["c", "a"]
+	assert frame["id"].tolist() == [ids[2], ids[0]]
+
+
+def test_checksum_ignores_order():
+	ids = PlayerIdCache(["a", "b", "c"], playerIds(3))
+	reversed_ids = PlayerIdCache(["c", "b", "a"], playerIds(3)[::-1])
+	assert ids.watermark == reversed_ids.watermark
+	assert ids.watermark != PlayerIdCache(["a", "b", "c"],
+																				playerIds(3, 1)).watermark
+
+
+def test_pending_players(tmp_path):
+	cache = PlayerIdCache(["a"], playerIds(1))
+	watermark = cache.watermark
+	assert cache.update(["b", "c"], playerIds(2, 1), committed=False) == 2
+	assert cache.watermark == watermark and len(cache) == 3
+
+	# Only the confirmed pending player is saved and counted
+	assert cache.update(["b"], playerIds(1, 1)) == 0
+	assert cache.watermark == PlayerIdCache(["a", "b"], playerIds(2)).watermark
+	cache.save(str(tmp_path / "cache.npz"))
+	with np.load(tmp_path / "cache.npz") as data:
+		assert len(data["ids"]) == 2
+		assert (int(data["watermark"]), int(data["checksum"])) == cache.watermark
+
+
+def test_concurrent_updates():
+	cache = PlayerIdCache()
+	names = [f"p{number}" for number in range(2000)]
+	ids = playerIds(len(names))
+
+	def add(start: int) -> None:
+		for first in range(start, len(names), 20):
+			cache.update(names[first:first + 10], ids[first:first + 10],
+									 committed=False)
+			cache.update(names[first:first + 10], ids[first:first + 10])
+			cache.toDataFrame(names[:first])
+
+	threads = [threading.Thread(target=add, args=(start,))
+						 for start in (0, 10)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert len(cache) == len(names)
+	assert cache.toDataFrame(names)["id"].tolist() == ids
+	assert cache.watermark == PlayerIdCache(names, ids).watermark
+
+
+def createPlayers(connection, ids: list[str]) -> None:
+	connection.execute(
+		"create temporary table if not exists cache_players (id uuid primary key,"
+		" name text unique)")
+	connection.execute("delete from cache_players")
+	for number, player_id in enumerate(ids):
+		connection.execute("insert into cache_players values (%s, %s)",
+											 (player_id, f"p{number}"))
+
+
+def test_database_watermark(connection):
+	ids = playerIds(200)
+	createPlayers(connection, ids)
+	assert PlayerIdCache.databaseWatermark(connection, "cache_players") == \
+		PlayerIdCache([f"p{number}" for number in range(200)], ids).watermark
+
+
+def test_stale_cache(connection, tmp_path):
+	path = str(tmp_path / "cache.npz")
+	createPlayers(connection, playerIds(3))
+	PlayerIdCache.fromDatabase(connection, "cache_players").save(path)
+	assert len(PlayerIdCache.load(connection, "cache_players", path)) == 3
+
+	# Same number of players, other IDs: the cache is rebuilt
+	createPlayers(connection, playerIds(3, 10))
+	cache = PlayerIdCache.load(connection, "cache_players", path)
+	assert cache.toDataFrame(["p0"])["id"].tolist() == playerIds(1, 10)
@@ -0,0 +1,101 @@
+import os
+import re
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+PLAYERS = [str(uuid.UUID(int=number)) for number in range(1, 5)]
+OPENINGS = [str(uuid.UUID(int=number)) for number in range(101, 104)]
+
+
+@pytest.fixture
+def games(database):
+	"""
+	Fill the players and openings of a database, and connect to it.
+	:return: Connection to the database.
+	"""
+	with psycopg.connect(**database, autocommit=True) as connection:
+		for number, player in enumerate(PLAYERS):
+			connection.execute("insert into players (id, name) values (%s, %s)",
+												 (player, f"p{number}"))
+		for number, opening in enumerate(OPENINGS):
+			connection.execute(
+				"insert into openings (id, eco, name, pgn) values (%s, 'A00', %s, '')",
+				(opening, f"o{number}"))
+		yield connection
+
+
+def insertGames(connection, count: int, start: int = 0) -> None:
+	connection.execute(
+		"insert into games (id, white, black, opening, date_time) "
+		"select gen_random_uuid(), (%s::uuid[])[1 + i %% 4], "
+		"(%s::uuid[])[1 + (i + 1) %% 4], "
+		"case when i %% 5 = 0 then null else (%s::uuid[])[1 + i %% 3] end, "
+		"timestamp '2024-01-01' + i * interval '1 minute' "
+		"from generate_series(%s::int, %s::int) as i",
+		(PLAYERS, PLAYERS, OPENINGS, start + 1, start + count))
+
+
+def assertCounts(connection) -> None:
+	counts = connection.execute(
+		"select player, color, opening, n from player_opening_counts "
+		"order by 1, 2, 3").fetchall()
+	expected = connection.execute(
+		"select player, color, opening, count(*)::int from ("
+		"select white as player, 'W' as color, opening from games "
+		"where opening is not null union all "
+		"select black, 'B', opening from games where opening is not null) as g "
+		"group by 1, 2, 3 order by 1, 2, 3").fetchall()
+	assert counts == expected
+
+
+def test_inserted_and_deleted_games(games):
+	insertGames(games, 100)
+	assertCounts(games)
+	games.execute("delete from games where white = %s", (PLAYERS[0],))
+	assertCounts(games)
+
+
+def test_updated_games(games):
+	insertGames(games, 100)
+	games.execute("update games set opening = %s where black = %s",
+								(OPENINGS[2], PLAYERS[1]))
+	assertCounts(games)
+	games.execute("update games set opening = null where white = %s",
+								(PLAYERS[2],))
+	assertCounts(games)
+	# Players swapped, and updates leaving the players and openings unchanged
+	games.execute("update games set white = black, black = white "
+								"where opening = %s", (OPENINGS[0],))
+	assertCounts(games)
+	games.execute("update games set white_elo = 1500")
+	assertCounts(games)
+
+
+def test_truncated_games(games):
+	insertGames(games, 100)
+	games.execute("truncate games")
+	assert games.execute(
+		"select count(*) from player_opening_counts").fetchone()[0] == 0
+
+
+def test_migration(games):
+	insertGames(games, 50)
+	games.execute("drop table player_opening_counts cascade")
+	for trigger in ["count_inserted", "count_deleted", "count_updated"]:
+		games.execute(f"drop trigger games_{trigger}_player_openings on games")
+	games.execute("drop trigger games_clear_player_opening_counts on games")
+	with open(os.path.join(os.path.dirname(__file__), os.pardir, "DataCollection",
+												 "addPlayerOpeningCounts.sql"), "r") as f:
+		script = re.sub(r"ALTER TABLE \w+\s+OWNER TO \w+;", "", f.read())
+
+	# The existing games are counted, and the script can be run again
+	for _ in range(2):
+		games.execute(script)
+		assertCounts(games)
+	assert games.execute("select count(*) from games").fetchone()[0] == 50
+	insertGames(games, 20, 50)
+	games.execute("update games set opening = %s", (OPENINGS[1],))
+	assertCounts(games)
@@ -0,0 +1,145 @@
+import bz2
+import gzip
+import os
+
+import pandas as pd
+import pytest
+
+from DataCollection import readPGN
+from DataCollection.readPGN import concatFrames, readPGNFiles, splitPGNFile
+
+GAMES = 60
+RANGE_SIZE = 500  # Bytes, less than a game for the ranges to cut games in half
+FRAME_SIZE = 700  # Bytes of PGN text per zstd frame
+
+
+def pgnText(games: int = GAMES) -> bytes:
+	"""
+	Build the PGN text of games with varied headers and movetext.
+	:param games: Number of games.
+	:return: PGN text.
+	"""
+	openings = ["Sicilian Defense", "French Defense: Exchange Variation",
+							"Queen's Gambit Declined"]
+	lines = []
+	for game in range(games):
+		lines += [
+			'[Event "Rated Blitz game"]',
+			f'[Site "https://lichess.org/g{game:08d}"]',
+			f'[White "p{game % 7}"]',
+			f'[Black "p{game % 5 + 7}"]',
+			f'[Result "{["1-0", "0-1", "1/2-1/2"][game % 3]}"]',
+			f'[UTCDate "2024.{game % 12 + 1:02d}.{game % 28 + 1:02d}"]',
+			f'[UTCTime "{game % 24:02d}:00:00"]',
+			f'[WhiteElo "{1500 + game}"]',
+			f'[BlackElo "{1600 + game}"]',
+			f'[Opening "{openings[game % 3]}"]',
+			f'[TimeControl "{["180+0", "600+5", "-"][game % 3]}"]',
+			"",
+			"1. e4 { [%clk 0:03:00] } c5 2. Nf3 d6 3. d4 cxd4 "
+			f"{'4. Nxd4 Nf6 ' * (game % 4)}1-0",
+			""]
+	return "\n".join(lines).encode()
+
+
+@pytest.fixture(scope="module")
+def pgnFiles(tmp_path_factory) -> dict[str, str]:
+	"""
+	Write the same games in the formats read by the parser.
+	:return: Paths of the files by format.
+	"""
+	directory = tmp_path_factory.mktemp("pgn")
+	text = pgnText()
+	files = {"plain": os.path.join(directory, "games.pgn"),
+					 "gzip": os.path.join(directory, "games.pgn.gz"),
+					 "bz2": os.path.join(directory, "games.pgn.bz2")}
+	with open(files["plain"], "wb") as f:
+		f.write(text)
+	with gzip.open(files["gzip"], "wb") as f:
+		f.write(text)
+	with bz2.open(files["bz2"], "wb") as f:
+		f.write(text)
+	if readPGN.zstandard is not None:
+		# Frames of a fixed size, cutting games in half
+		files["zstd"] = os.path.join(directory, "games.pgn.zst")
+		compressor = readPGN.zstandard.ZstdCompressor()
+		with open(files["zstd"], "wb") as f:
+			for start in range(0, len(text), FRAME_SIZE):
+				f.write(compressor.compress(text[start:start + FRAME_SIZE]))
+	return files
+
+
+def readGames(file: str, chunk_size: int = 7, resume: dict = None) \
+		-> pd.DataFrame:
+	return concatFrames(list(readPGNFiles([file], chunk_size, 2, RANGE_SIZE,
+																				resume))).reset_index(drop=True)
+
+
+@pytest.fixture(autouse=True)
+def smallBlocks(monkeypatch):
+	# Compressed files are read in blocks and frame ranges smaller than a game
+	monkeypatch.setattr(readPGN, "STREAM_BLOCK_SIZE", RANGE_SIZE)
+	monkeypatch.setattr(readPGN, "ZSTD_RANGE_SIZE", FRAME_SIZE)
+
+
+def test_ranges_cut_games(pgnFiles):
+	ranges = splitPGNFile(pgnFiles["plain"], RANGE_SIZE)
+	assert len(ranges) > 1
+	assert ranges[0][0] == 0 and ranges[-1][1] == os.path.getsize(
+		pgnFiles["plain"])
+	assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+
+
+def test_plain_file(pgnFiles):
+	games = readGames(pgnFiles["plain"])
+	assert len(games) == GAMES
+	assert games["Site"].tolist() == [f"https://lichess.org/g{game:08d}"
+																		for game in range(GAMES)]
+	assert games["WhiteElo"].tolist() == [1500 + game for game in range(GAMES)]
+
+
+@pytest.mark.parametrize("range_size", [RANGE_SIZE, 10 ** 6])
+def test_range_size_does_not_change_games(pgnFiles, range_size):
+	pd.testing.assert_frame_equal(
+		concatFrames(list(readPGNFiles([pgnFiles["plain"]], 7, 2, range_size))
+								 ).reset_index(drop=True),
+		readGames(pgnFiles["plain"]))
+
+
+def test_missing_file(tmp_path):
+	assert list(readPGNFiles([str(tmp_path / "missing.pgn")], 7, 2)) == []
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "zstd"])
+def test_compressed_files(pgnFiles, compression):
+	if compression not in pgnFiles:
+		pytest.skip("zstandard is not installed")
+	assert readPGN.detectCompression(pgnFiles[compression]) == compression
+	pd.testing.assert_frame_equal(readGames(pgnFiles[compression]),
+																readGames(pgnFiles["plain"]))
+
+
+def test_multiple_zstd_frames(pgnFiles):
+	if "zstd" not in pgnFiles:
+		pytest.skip("zstandard is not installed")
+	assert len(readPGN.zstdFrameRanges(pgnFiles["zstd"])) > 1
+
+
+def test_no_offset_in_compressed_files(pgnFiles):
+	chunks = list(readPGNFiles([pgnFiles["gzip"]], 7, 2))
+	assert all(chunk.attrs["byte_offset"] == 0 for chunk in chunks)
+	assert [chunk.attrs["completed"] for chunk in chunks] == \
+		[False] * (len(chunks) - 1) + [True]
+
+
+@pytest.mark.parametrize("compression", ["plain", "gzip"])
+def test_resume(pgnFiles, compression):
+	file = pgnFiles[compression]
+	chunks = list(readPGNFiles([file], 7, 2, RANGE_SIZE))
+	position = chunks[3].attrs
+	resumed = readGames(file, resume={file: (
+		position["byte_offset"], position["offset_games"], position["games"])})
+	# The categories of the resumed games are in the order they are met
+	pd.testing.assert_frame_equal(
+		resumed, readGames(file).iloc[position["games"]:].reset_index(drop=True),
+		check_categorical=False)
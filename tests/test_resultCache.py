@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from Louvain.getData import getCompactGraph
+from Louvain.resultCache import (ResultCache, arraysToFrame, arraysToGraph,
+																 frameToArrays, graphToArrays)
+from tests.test_compactGraph import DATA
+
+
+def entrySize(tmp_path) -> int:
+	"""
+	Measure the size of a cache entry of 1000 zeros.
+	:param tmp_path: Temporary directory of the test.
+	:return: Size of the entry in bytes.
+	"""
+	cache = ResultCache(str(tmp_path / "size"))
+	cache.save("entry", {"values": np.zeros(1000)})
+	return os.path.getsize(tmp_path / "size" / "entry.npz")
+
+
+def test_round_trip(tmp_path):
+	cache = ResultCache(str(tmp_path))
+	frame = pd.DataFrame({"name": ["a", "é", None], "elo": [1500, 1600, 1700],
+												"share": [0.5, 0.25, np.nan]})
+	key = cache.key("fetch", {"color": "white"})
+	cache.save(key, frameToArrays(frame))
+	pd.testing.assert_frame_equal(arraysToFrame(cache.load(key)), frame)
+
+
+def test_graph_round_trip(tmp_path):
+	cache = ResultCache(str(tmp_path))
+	graph = getCompactGraph(DATA, weighted=False)
+	cache.save("graph", graphToArrays(graph))
+	loaded = arraysToGraph(cache.load("graph"))
+	assert loaded.names.tolist() == graph.names.tolist()
+	for attribute in ["bipartite", "elo", "playCount", "sources", "targets",
+										"weights"]:
+		np.testing.assert_array_equal(getattr(loaded, attribute),
+																	getattr(graph, attribute))
+
+
+def test_get_or_compute(tmp_path):
+	cache = ResultCache(str(tmp_path))
+	calls = []
+
+	def compute() -> np.ndarray:
+		calls.append(1)
+		return np.arange(5)
+
+	for _ in range(2):
+		key, value = cache.getOrCompute("layout", {"seed": 1}, None, compute,
+																		lambda labels: {"labels": labels},
+																		lambda arrays: arrays["labels"])
+		assert value.tolist() == [0, 1, 2, 3, 4]
+	assert len(calls) == 1
+
+
+def test_invalidation(tmp_path):
+	cache = ResultCache(str(tmp_path))
+	upstream = cache.key("fetch", {"color": "white"})
+	key = cache.key("layout", {"seed": 1}, upstream)
+	cache.save(key, {"positions": np.ones((3, 2))})
+
+	# A change of the parameters or upstream gives another key
+	assert cache.key("layout", {"seed": 1}, upstream) == key
+	assert cache.key("layout", {"seed": 2}, upstream) != key
+	changed = cache.key("fetch", {"color": "black"})
+	assert cache.load(cache.key("layout", {"seed": 1}, changed)) is None
+
+
+def test_unreadable_entry(tmp_path):
+	cache = ResultCache(str(tmp_path))
+	with open(tmp_path / "broken.npz", "wb") as f:
+		f.write(b"not an archive")
+	assert cache.load("broken") is None
+
+
+def test_lru_eviction(tmp_path):
+	size = entrySize(tmp_path)
+	cache = ResultCache(str(tmp_path / "cache"), max_bytes=2 * size)
+	for age, key in enumerate(["a", "b"]):
+		cache.save(key, {"values": np.zeros(1000)})
+		os.utime(tmp_path / "cache" / f"{key}.npz", (1000 + age, 1000 + age))
+
+	# Loading "a" makes "b" the least recently used
+	assert cache.load("a") is not None
+	cache.save("c", {"values": np.zeros(1000)})
+	assert sorted(os.listdir(tmp_path / "cache")) == ["a.npz", "c.npz"]
+
+
+def test_disabled():
+	cache = ResultCache(None)
+	cache.save("a", {"values": np.zeros(3)})
+	assert cache.load("a") is None
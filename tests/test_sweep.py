@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from Louvain import sweep
+from Louvain.compactGraph import CompactGraph
+from Louvain.sweep import sweepCommunities
+from tests.test_layout import groupedGraph
+
+mutualInformation = sweep.__mutual_information
+
+
+def test_mutual_information():
+	first = np.array([0, 0, 1, 1, 2, 2])
+	assert mutualInformation(first, np.array([2, 2, 0, 0, 1, 1])) == \
+		pytest.approx(1)
+	assert mutualInformation(np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1])) == \
+		pytest.approx(0)
+	assert 0 < mutualInformation(first, np.array([0, 0, 0, 0, 1, 1])) < 1
+	# Single communities, and no nodes at all, agree
+	assert mutualInformation(np.zeros(3, dtype=int), np.zeros(3, dtype=int)) == 1
+	assert mutualInformation(np.array([], dtype=int), np.array([], dtype=int)) == 1
+
+
+def test_sweep():
+	graph = groupedGraph(groups=3, players=20, openings=3)
+	report, communities = sweepCommunities(graph, [0.5, 1.0], [1, 2, 3],
+																				 max_workers=2)
+	assert report[["resolution", "seed"]].values.tolist() == \
+		[[0.5, 1], [0.5, 2], [0.5, 3], [1.0, 1], [1.0, 2], [1.0, 3]]
+	assert report["chosen"].sum() == 1
+	assert report["consensus"].between(0, 1 + 1e-9).all()
+	# Stability is the mean consensus of the seeds of a resolution
+	assert report["stability"].tolist() == pytest.approx(
+		report.groupby("resolution")["consensus"].transform("mean").tolist())
+
+	chosen = report[report["chosen"]].iloc[0]
+	assert chosen["stability"] == report["stability"].max()
+	assert list(communities) == graph.names.tolist()
+	assert len(set(communities.values())) == chosen["communities"] > 1
+
+
+def test_empty_graph():
+	graph = CompactGraph([], [], [], [], [], [], [])
+	report, communities = sweepCommunities(graph, [1.0], [1, 2], max_workers=2)
+	assert report["communities"].tolist() == [0, 0]
+	assert report["consensus"].tolist() == [1.0, 1.0]
+	assert communities == {}